@@ -0,0 +1,22 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # The cached responses would leak between the tests, as the data version
+    # is only bumped on commit.
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    # The caches keyed by the data version and the response cache require a
+    # cache shared by the processes, which the local memory cache of the tests
+    # is not.
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
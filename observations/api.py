@@ -13,6 +13,7 @@ from services.api import (
     UnitSerializer,
     UnitViewSet,
 )
+from services.api_pagination import CursorPaginationMixin
 
 from . import models
 from .serializers import ObservablePropertySerializer, ObservationSerializer
@@ -21,7 +22,9 @@ logger = logging.getLogger(__name__)
 
 
 @extend_schema(exclude=True)
-class ObservationViewSet(JSONAPIViewSetMixin, viewsets.ModelViewSet):
+class ObservationViewSet(
+    CursorPaginationMixin, JSONAPIViewSetMixin, viewsets.ModelViewSet
+):
     queryset = models.Observation.objects.all()
     serializer_class = ObservationSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -8,6 +8,7 @@ function stage_0 {
     ./manage.py geo_import finland --municipalities
     # Statistical districts
     ./manage.py update_statistical_districts
+    ./manage.py update_simplified_division_geometries
 }
 
 function stage_1 {
@@ -23,7 +24,8 @@ function stage_1 {
     ./manage.py update_vantaa_parking_areas
     ./manage.py update_vantaa_parking_payzones
     ./manage.py update_vantaa_nature_reserves
-    ./manage.py index_search_columns
+    ./manage.py update_simplified_division_geometries
+    ./manage.py index_search_columns --bulk
 }
 
 function stage_2 {
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
 
+from services.api_cache import invalidate_response_cache
 from services.models import (
     Announcement,
     ErrorMessage,
@@ -14,6 +15,12 @@ class NotificationAdmin(TranslationAdmin):
     list_display = ("title", "active", "content")
     list_display_links = ("title", "content")
     list_filter = ("active",)
+    actions = ["purge_response_cache"]
+
+    @admin.action(description="Purge all the cached API responses")
+    def purge_response_cache(self, request, queryset):
+        invalidate_response_cache()
+        self.message_user(request, "The cached API responses were purged.")
 
 
 @admin.register(FeedbackMapping)
@@ -1,17 +1,19 @@
+import json
 import logging
 import re
 import uuid
+from collections.abc import Mapping
 
 from django.conf import settings
-from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.db.models.functions import Centroid, Distance, Transform
 from django.contrib.gis.gdal import SpatialReference
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
 from django.core.exceptions import ValidationError
-from django.db.models import F, Prefetch, Q, Subquery
-from django.http import Http404
+from django.db.models import Exists, F, OuterRef, Prefetch, Q, Subquery
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
-from django.template.loader import render_to_string
+from django.template.loader import get_template, render_to_string
 from django.utils import timezone, translation
 from django.utils.module_loading import import_string
 from django_filters.rest_framework import DjangoFilterBackend
@@ -23,16 +25,25 @@ from drf_spectacular.utils import (
 from modeltranslation.translator import NotRegistered, translator
 from mptt.utils import drilldown_tree_for_node
 from munigeo import api as munigeo_api
-from munigeo.models import AdministrativeDivision, Municipality
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionGeometry,
+    Municipality,
+)
 from rest_framework import generics, renderers, serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.fields import SerializerMethodField
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.utils.encoders import JSONEncoder
 
 from observations.models import Observation
 from services.accessibility import RULES
+from services.api_cache import ResponseCacheMixin, cache_response
+from services.api_conditional import ConditionalGetMixin
+from services.api_pagination import CursorPaginationMixin
+from services.fast_serializer import FastUnitSerializer, get_field_plan
 from services.models import (
     Announcement,
     Department,
@@ -47,7 +58,15 @@ from services.models import (
     UnitConnection,
     UnitEntrance,
     UnitIdentifier,
+    UnitMobilityServiceNodeAncestor,
     UnitServiceDetails,
+    UnitServiceNodeAncestor,
+)
+from services.models.hierarchy import get_tree_snapshot
+from services.models.simplified_division_geometry import (
+    SIMPLIFIED_BOUNDARY_TOLERANCES,
+    get_simplified_boundary_field,
+    get_zoom_tolerance,
 )
 from services.models.unit import ORGANIZER_TYPES, PROVIDER_TYPES
 from services.open_api_parameters import (
@@ -56,10 +75,13 @@ from services.open_api_parameters import (
     BBOX_PARAMETER,
     BUILDING_NUMBER_PARAMETER,
     CITY_AS_DEPARTMENT_PARAMETER,
+    COUNT_PARAMETER,
     DATE_PARAMETER,
     DISTANCE_PARAMETER,
     DIVISION_TYPE_PARAMETER,
     GEOMETRY_PARAMETER,
+    GEOMETRY_PRECISION_PARAMETER,
+    GEOMETRY_TOLERANCE_PARAMETER,
     ID_PARAMETER,
     INPUT_PARAMETER,
     LATITUDE_PARAMETER,
@@ -72,14 +94,26 @@ from services.open_api_parameters import (
     ORGANIZATION_PARAMETER,
     ORGANIZATION_TYPE_PARAMETER,
     ORIGIN_ID_PARAMETER,
+    PAGINATION_PARAMETER,
     PROVIDER_TYPE_NOT_PARAMETER,
     PROVIDER_TYPE_PARAMETER,
+    SIMPLIFY_PARAMETER,
     STREET_PARAMETER,
     UNIT_GEOMETRY_3D_PARAMETER,
     UNIT_GEOMETRY_PARAMETER,
+    ZOOM_PARAMETER,
 )
 from services.utils import check_valid_concrete_field, strtobool
 from services.utils.geocode_address import geocode_address
+from services.utils.geometry import (
+    annotate_geojson,
+    annotate_transformed_geometries,
+    geometry_to_json,
+    get_geojson_name,
+    get_geometry,
+    get_geometry_json,
+    get_transformed_name,
+)
 from services.utils.height_profile_geom import multilinestring_to_linestring_features
 
 if settings.REST_FRAMEWORK and settings.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"]:
@@ -112,6 +146,9 @@ def register_view(klass, name, basename=None):
 
 LANGUAGES = [x[0] for x in settings.LANGUAGES]
 
+FULL_BOUNDARY_FIELD = "geometry__boundary"
+MAX_ZOOM = 30
+
 logger = logging.getLogger(__name__)
 
 
@@ -264,12 +301,39 @@ def root_services(services):
     )
 
 
-def root_service_nodes(services, model):
-    # check this
+def root_service_nodes(services, model, snapshot=None):
+    """
+    Ids of the roots of the trees of `services`, resolved from the tree
+    snapshot of `model`, which can be given when resolving repeatedly.
+    """
     tree_ids = {s.tree_id for s in services}
-    return map(
-        lambda x: x.id, model.objects.filter(level=0).filter(tree_id__in=tree_ids)
-    )
+    if snapshot is None:
+        snapshot = get_tree_snapshot(model)
+    if not tree_ids <= snapshot.root_ids.keys():
+        # A tree created after the snapshot was taken.
+        return map(
+            lambda x: x.id, model.objects.filter(level=0).filter(tree_id__in=tree_ids)
+        )
+    return (snapshot.root_ids[tree_id] for tree_id in tree_ids)
+
+
+def get_node_ancestors(nodes, queryset):
+    """
+    Ancestors of `nodes` from the parent to the root, by the node ids. The
+    ancestors are resolved from the tree snapshot and fetched from `queryset`
+    with a single query. The nodes missing from the snapshot are left out.
+    """
+    snapshot = get_tree_snapshot(queryset.model)
+    ancestor_ids = {}
+    for node in nodes:
+        ids = snapshot.get_ancestor_ids(node.id)
+        if ids is not None:
+            ancestor_ids[node.id] = ids
+    ancestors = queryset.in_bulk({id for ids in ancestor_ids.values() for id in ids})
+    return {
+        node_id: [ancestors[id] for id in ids if id in ancestors]
+        for node_id, ids in ancestor_ids.items()
+    }
 
 
 def resolve_divisions(divisions):
@@ -287,9 +351,7 @@ def resolve_divisions(divisions):
             arr = division_path.split("/")
             muni_ocd_id = make_muni_ocd_id(arr.pop(0), "/".join(arr))
         try:
-            div = AdministrativeDivision.objects.select_related("geometry").get(
-                ocd_id=muni_ocd_id
-            )
+            div = AdministrativeDivision.objects.get(ocd_id=muni_ocd_id)
         except AdministrativeDivision.DoesNotExist:
             raise ParseError(
                 f"administrative division with OCD ID '{muni_ocd_id}' not found"
@@ -298,6 +360,100 @@ def resolve_divisions(divisions):
     return div_list
 
 
+def within_divisions(divisions, field="location"):
+    """
+    Returns a condition matching the objects whose `field` is within any of
+    the divisions. The boundaries are compared in the database, without
+    loading them.
+    """
+    return Exists(
+        AdministrativeDivisionGeometry.objects.filter(
+            division__in=divisions, boundary__contains=OuterRef(field)
+        )
+    )
+
+
+def get_boundary_field(query_params):
+    """
+    Returns the field path of the division boundaries to serialize, the
+    precomputed boundary simplified the most within the tolerance in meters
+    given by the simplify parameter, or a pixel of the zoom parameter's zoom
+    level. Without either the boundaries are not simplified.
+    """
+    if "simplify" in query_params:
+        try:
+            tolerance = float(query_params["simplify"])
+        except ValueError:
+            tolerance = -1
+        if not 0 <= tolerance < float("inf"):
+            raise ParseError("'simplify' needs to be a non-negative number")
+    elif "zoom" in query_params:
+        try:
+            zoom = int(query_params["zoom"])
+        except ValueError:
+            zoom = -1
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ParseError(f"'zoom' needs to be an integer between 0 and {MAX_ZOOM}")
+        tolerance = get_zoom_tolerance(zoom)
+    else:
+        return FULL_BOUNDARY_FIELD
+    field_name = get_simplified_boundary_field(tolerance)
+    if field_name is None:
+        return FULL_BOUNDARY_FIELD
+    return f"simplified_geometry__{field_name}"
+
+
+def get_geojson_options(query_params):
+    """
+    Returns the (precision, tolerance) of the GeoJSON generated by the
+    database, or None if neither geometry_precision nor geometry_tolerance
+    is given.
+    """
+    precision = query_params.get("geometry_precision")
+    tolerance = query_params.get("geometry_tolerance")
+    if precision is None and tolerance is None:
+        return None
+    if precision is not None:
+        try:
+            precision = int(precision)
+        except ValueError:
+            precision = -1
+        if precision < 0:
+            raise ParseError("'geometry_precision' needs to be a non-negative integer")
+    if tolerance is not None:
+        try:
+            tolerance = float(tolerance)
+        except ValueError:
+            tolerance = -1
+        if not 0 <= tolerance < float("inf"):
+            raise ParseError("'geometry_tolerance' needs to be a non-negative number")
+    return precision, tolerance
+
+
+class TransformedGeoModelSerializer(munigeo_api.GeoModelSerializer):
+    """
+    GeoModelSerializer serializing the geometries transformed or converted to
+    GeoJSON in the database, see annotate_transformed_geometries and
+    annotate_geojson, when the object has been annotated.
+    """
+
+    def get_geo_field_names(self):
+        return self.geo_fields
+
+    def to_representation(self, obj):
+        self.srs = self.context.get("srs", munigeo_api.DEFAULT_SRS)
+        # Skip the geometry conversion of GeoModelSerializer.
+        ret = super(munigeo_api.GeoModelSerializer, self).to_representation(obj)
+        if obj is None:
+            return ret
+        for field_name in self.get_geo_field_names():
+            if isinstance(obj, Mapping):
+                ret[field_name] = obj
+                continue
+            ret[field_name] = get_geometry_json(obj, field_name, self.srs)
+        return ret
+
+
 class JSONAPISerializer(serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -362,16 +518,14 @@ class ServiceNodeSerializer(
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._tree_snapshot = None
+        self._ancestor_serializer = None
 
     def to_representation(self, obj):
         ret = super().to_representation(obj)
         include_fields = self.context.get("include", [])
         if "ancestors" in include_fields:
-            ancestors = obj.get_ancestors(ascending=True)
-            ser = ServiceNodeSerializer(
-                ancestors, many=True, context={"only": ["name"]}
-            )
-            ret["ancestors"] = ser.data
+            ret["ancestors"] = self.serialize_ancestors(obj)
         if "related_services" in include_fields:
             services = obj.related_services
             ser = ServiceSerializer(services, many=True, context={})
@@ -389,8 +543,20 @@ class ServiceNodeSerializer(
         ret["unit_count"]["total"] = total
         return ret
 
+    def serialize_ancestors(self, obj):
+        # The ancestors of the whole page are fetched at once by the view.
+        ancestors = self.context.get("ancestors", {}).get(obj.id)
+        if ancestors is None:
+            ancestors = obj.get_ancestors(ascending=True)
+        if self._ancestor_serializer is None:
+            self._ancestor_serializer = type(self)(context={"only": ["name"]})
+        return [self._ancestor_serializer.to_representation(x) for x in ancestors]
+
     def root_service_nodes(self, obj):
-        return next(root_service_nodes([obj], ServiceNode))
+        # The snapshot is resolved once per serializer, not once per node.
+        if self._tree_snapshot is None:
+            self._tree_snapshot = get_tree_snapshot(self.Meta.model)
+        return next(root_service_nodes([obj], self.Meta.model, self._tree_snapshot))
 
     def unit_count_per_municipality(self, obj):
         return {
@@ -420,9 +586,7 @@ class MobilitySerializer(ServiceNodeSerializer):
         ret = super(ServiceNodeSerializer, self).to_representation(obj)
         include_fields = self.context.get("include", [])
         if "ancestors" in include_fields:
-            ancestors = obj.get_ancestors(ascending=True)
-            ser = MobilitySerializer(ancestors, many=True, context={"only": ["name"]})
-            ret["ancestors"] = ser.data
+            ret["ancestors"] = self.serialize_ancestors(obj)
         only_fields = self.context.get("only", [])
         if "parent" in only_fields:
             ret["parent"] = obj.parent_id
@@ -444,9 +608,6 @@ class MobilitySerializer(ServiceNodeSerializer):
 
         return ret
 
-    def root_service_nodes(self, obj):
-        return next(root_service_nodes([obj], MobilityServiceNode))
-
     class Meta:
         model = MobilityServiceNode
         exclude = ("service_reference",)
@@ -483,7 +644,7 @@ class ServiceSerializer(ServicesTranslatedModelSerializer, JSONAPISerializer):
             div_list = resolve_divisions(divisions)
             for div in div_list:
                 ret["unit_count_per_division"][div.name] = Unit.objects.filter(
-                    services=obj.pk, location__within=div.geometry.boundary
+                    within_divisions([div]), services=obj.pk
                 ).count()
 
         return ret
@@ -592,9 +753,10 @@ class JSONAPIViewSet(JSONAPIViewSetMixin, viewsets.ReadOnlyModelViewSet):
 
 
 @extend_schema(parameters=[ORGANIZATION_TYPE_PARAMETER, LEVEL_INTEGER_PARAMETER])
-class DepartmentViewSet(JSONAPIViewSet):
+class DepartmentViewSet(ConditionalGetMixin, ResponseCacheMixin, JSONAPIViewSet):
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
+    response_cache_namespace = "department"
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -610,6 +772,7 @@ class DepartmentViewSet(JSONAPIViewSet):
             queryset = queryset.filter(level=level)
         return queryset.order_by("id")
 
+    @cache_response
     def retrieve(self, request, pk=None):
         try:
             uuid.UUID(pk)
@@ -745,18 +908,30 @@ class UnitIdentifierSerializer(serializers.ModelSerializer):
 
 
 @extend_schema(parameters=[ID_PARAMETER, ANCESTOR_ID_PARAMETER])
-class ServiceNodeViewSet(JSONAPIViewSet, viewsets.ReadOnlyModelViewSet):
+class ServiceNodeViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    JSONAPIViewSet,
+    viewsets.ReadOnlyModelViewSet,
+):
     queryset = ServiceNode.objects.all()
     serializer_class = ServiceNodeSerializer
+    response_cache_namespace = "service_node"
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ["level", "parent"]
+    # The relations serialized for the ancestors, which are serialized with
+    # only the name.
+    ancestor_prefetch_fields = ("related_services", "unit_counts__division")
+    prefetch_fields = ancestor_prefetch_fields + ("keywords",)
 
     def get_queryset(self):
+        model = self.queryset.model
         queryset = (
             super()
             .get_queryset()
             .prefetch_related(
-                "keywords", "related_services", "unit_counts", "unit_counts__division"
+                *self.prefetch_fields,
+                Prefetch("children", queryset=model.objects.only("id", "parent")),
             )
         )
         query_params = self.request.query_params
@@ -768,6 +943,16 @@ class ServiceNodeViewSet(JSONAPIViewSet, viewsets.ReadOnlyModelViewSet):
             queryset = queryset.by_ancestor(val)
         return queryset
 
+    def get_serializer(self, *args, **kwargs):
+        if args and "ancestors" in self.include_fields:
+            nodes = args[0] if kwargs.get("many") else [args[0]]
+            context = kwargs.setdefault("context", self.get_serializer_context())
+            ancestors = self.queryset.model.objects.prefetch_related(
+                *self.ancestor_prefetch_fields
+            )
+            context["ancestors"] = get_node_ancestors(nodes, ancestors)
+        return super().get_serializer(*args, **kwargs)
+
 
 register_view(ServiceNodeViewSet, "service_node")
 
@@ -776,26 +961,24 @@ register_view(ServiceNodeViewSet, "service_node")
 class MobilityViewSet(ServiceNodeViewSet):
     queryset = MobilityServiceNode.objects.all()
     serializer_class = MobilitySerializer
-
-    def get_queryset(self):
-        queryset = super(ServiceNodeViewSet, self).get_queryset()
-        query_params = self.request.query_params
-        if "id" in query_params:
-            id_list = query_params["id"].split(",")
-            queryset = queryset.filter(id__in=id_list)
-        if "ancestor" in query_params:
-            val = query_params["ancestor"]
-            queryset = queryset.by_ancestor(val)
-        return queryset
+    response_cache_namespace = "mobility"
+    ancestor_prefetch_fields = ("unit_counts__division",)
+    prefetch_fields = ancestor_prefetch_fields
 
 
 register_view(MobilityViewSet, "mobility")
 
 
 @extend_schema(parameters=[ID_PARAMETER])
-class ServiceViewSet(JSONAPIViewSet, viewsets.ReadOnlyModelViewSet):
+class ServiceViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    JSONAPIViewSet,
+    viewsets.ReadOnlyModelViewSet,
+):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
+    response_cache_namespace = "service"
 
     def get_serializer_context(self):
         ret = super().get_serializer_context()
@@ -821,7 +1004,7 @@ register_view(ServiceViewSet, "service")
 
 
 class UnitSerializer(
-    ServicesTranslatedModelSerializer, munigeo_api.GeoModelSerializer, JSONAPISerializer
+    ServicesTranslatedModelSerializer, TransformedGeoModelSerializer, JSONAPISerializer
 ):
     connections = UnitConnectionSerializer(many=True)
     entrances = UnitEntranceSerializer(many=True)
@@ -845,12 +1028,24 @@ class UnitSerializer(
             if "unit" in ser.child.fields:
                 del ser.child.fields["unit"]
 
-        self._root_node_cache = {}
+        self._service_node_snapshot = None
         self._department_serializer = None
         self._department_cache = {}
         self._service_details_serializer = None
         self._connection_serializer = None
 
+    def get_geo_field_names(self):
+        if "request" not in self.context:
+            return self.geo_fields
+        # geometry and geometry_3d are serialized only when requested.
+        qparams = self.context["request"].query_params
+        return [
+            field_name
+            for field_name in self.geo_fields
+            if field_name not in ("geometry", "geometry_3d")
+            or qparams.get(field_name, "").lower() in ("true", "1")
+        ]
+
     def handle_extension_translations(self, extensions):
         if extensions is None or len(extensions) == 0:
             return extensions
@@ -908,6 +1103,18 @@ class UnitSerializer(
             )
         return obj.picture_url
 
+    def _get_root_service_node_id(self, service_node):
+        # Resolved from the process-wide tree snapshot, as otherwise this
+        # would generate multiple db queries for every single unit.
+        if self._service_node_snapshot is None:
+            self._service_node_snapshot = get_tree_snapshot(ServiceNode)
+        tree_id = service_node._mpttfield("tree_id")  # Forget your privacy!
+        root_id = self._service_node_snapshot.root_ids.get(tree_id)
+        if root_id is None:
+            # A tree created after the snapshot was taken.
+            root_id = service_node.get_root().id
+        return root_id
+
     def _get_department_serializer(self):
         if self._department_serializer is None:
             self._department_serializer = DepartmentSerializer(context=self.context)
@@ -944,22 +1151,13 @@ class UnitSerializer(
         if "service_nodes" in include_fields:
             service_nodes_json = []
             for s in obj.service_nodes.all():
-                # Optimization:
-                # Store root nodes by tree_id in a dict because otherwise
-                # this would generate multiple db queries for every single unit
-                tree_id = s._mpttfield("tree_id")  # Forget your privacy!
-                root_node = self._root_node_cache.get(tree_id)
-                if root_node is None:
-                    root_node = s.get_root()
-                    self._root_node_cache[tree_id] = root_node
-
                 name = {}
                 for lang in LANGUAGES:
                     name[lang] = getattr(s, f"name_{lang}")
                 data = {
                     "id": s.id,
                     "name": name,
-                    "root": root_node.id,
+                    "root": self._get_root_service_node_id(s),
                     "service_reference": s.service_reference,
                 }
                 # if s.identical_to:
@@ -1009,23 +1207,10 @@ class UnitSerializer(
         if "request" not in self.context:
             return ret
         qparams = self.context["request"].query_params
-        if qparams.get("geometry", "").lower() in ("true", "1"):
-            geom = obj.geometry  # TODO: different geom types
-            if geom and obj.geometry != obj.location:
-                ret["geometry"] = munigeo_api.geom_to_json(geom, self.srs)
-        elif "geometry" in ret:
-            del ret["geometry"]
-
-        if qparams.get("geometry_3d", "").lower() in ("true", "1"):
-            geom = obj.geometry_3d
-            if geom:
-                ret["geometry_3d"] = munigeo_api.geom_to_json(geom, self.srs)
-        elif "geometry_3d" in ret:
-            del ret["geometry_3d"]
-
         if qparams.get("heightprofilegeom", "").lower() in ("true", "1"):
-            if obj.geometry_3d:
-                geometry = munigeo_api.geom_to_json(obj.geometry_3d, self.srs)
+            geom = get_geometry(obj, "geometry_3d")
+            if geom:
+                geometry = geometry_to_json(geom, self.srs)
                 ret["height_profile_geom"] = multilinestring_to_linestring_features(
                     geometry.get("coordinates")
                 )
@@ -1072,6 +1257,53 @@ def get_fields(place, lang_code, fields):
     return place
 
 
+def get_kml_language(request):
+    lang_code = request.query_params.get("language", LANGUAGES[0])
+    if lang_code not in LANGUAGES:
+        raise ParseError(
+            f"Invalid language supplied. Supported languages: {','.join(LANGUAGES)}"
+        )
+    return lang_code
+
+
+def stream_kml(places, lang_code):
+    """
+    Yields the KML document of the given serialized units a placemark at a
+    time.
+    """
+    placemark_template = get_template("kml_placemark.xml")
+    yield render_to_string("kml_header.xml", {"lang_code": lang_code})
+    for place in places:
+        place = get_fields(place, lang_code, settings.KML_TRANSLATABLE_FIELDS)
+        yield placemark_template.render({"place": place})
+    yield render_to_string("kml_footer.xml")
+
+
+def unit_to_feature(unit):
+    properties = dict(unit)
+    geometry = properties.pop("location", None)
+    return {
+        "type": "Feature",
+        "id": properties.get("id"),
+        "geometry": geometry,
+        "properties": properties,
+    }
+
+
+def stream_geojson(units):
+    """
+    Yields the GeoJSON FeatureCollection of the given serialized units a
+    feature at a time.
+    """
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ""
+    for unit in units:
+        feature = json.dumps(unit_to_feature(unit), cls=JSONEncoder, ensure_ascii=False)
+        yield separator + feature
+        separator = ", "
+    yield "]}"
+
+
 class KmlRenderer(renderers.BaseRenderer):
     media_type = "application/vnd.google-earth.kml+xml"
     format = "kml"
@@ -1081,13 +1313,7 @@ class KmlRenderer(renderers.BaseRenderer):
         if response is not None and response.status_code >= 400:
             return render_to_string("kml.xml", {"places": [], "lang_code": ""})
         resp = {}
-        lang_code = renderer_context["view"].request.query_params.get(
-            "language", LANGUAGES[0]
-        )
-        if lang_code not in LANGUAGES:
-            raise ParseError(
-                f"Invalid language supplied. Supported languages: {','.join(LANGUAGES)}"
-            )
+        lang_code = get_kml_language(renderer_context["view"].request)
         resp["lang_code"] = lang_code
         places = data.get("results", [data])
         resp["places"] = [
@@ -1097,6 +1323,22 @@ class KmlRenderer(renderers.BaseRenderer):
         return render_to_string("kml.xml", resp)
 
 
+class GeoJSONRenderer(renderers.JSONRenderer):
+    """
+    Renders a unit as a GeoJSON Feature. The unit list is streamed as a
+    FeatureCollection by UnitViewSet.
+    """
+
+    media_type = "application/geo+json"
+    format = "geojson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = renderer_context.get("response") if renderer_context else None
+        if data and (response is None or response.status_code < 400):
+            data = unit_to_feature(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
 @extend_schema(
     parameters=[
         ACCESSIBILITY_DESCRIPTION_PARAMETER,
@@ -1109,15 +1351,27 @@ class KmlRenderer(renderers.BaseRenderer):
         LEVEL_PARAMETER,
         UNIT_GEOMETRY_PARAMETER,
         UNIT_GEOMETRY_3D_PARAMETER,
+        GEOMETRY_PRECISION_PARAMETER,
+        GEOMETRY_TOLERANCE_PARAMETER,
         BBOX_PARAMETER,
+        PAGINATION_PARAMETER,
+        COUNT_PARAMETER,
     ]
 )
 class UnitViewSet(
-    munigeo_api.GeoModelAPIView, JSONAPIViewSet, viewsets.ReadOnlyModelViewSet
+    ConditionalGetMixin,
+    CursorPaginationMixin,
+    munigeo_api.GeoModelAPIView,
+    JSONAPIViewSet,
+    viewsets.ReadOnlyModelViewSet,
 ):
     queryset = Unit.objects.filter(public=True, is_active=True)
     serializer_class = UnitSerializer
-    renderer_classes = DEFAULT_RENDERERS + [KmlRenderer]
+    # The counts of the filtered lists are cached by the pagination.
+    cache_count = True
+    # The expired observations are left out by the time of the request.
+    time_dependent_includes = ("observations",)
+    renderer_classes = DEFAULT_RENDERERS + [KmlRenderer, GeoJSONRenderer]
     filter_backends = (DjangoFilterBackend,)
 
     only_field_dependencies = {
@@ -1175,6 +1429,65 @@ class UnitViewSet(
             queryset = queryset.prefetch_related("service_details")
             queryset = queryset.prefetch_related("service_details__service")
 
+        queryset = self.filter_units(queryset)
+
+        if "observations" in self.include_fields:
+            now = timezone.now()
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "observation_set",
+                    queryset=Observation.objects.filter(
+                        Q(property__expiration=None)
+                        | Q(time__gt=now - F("property__expiration"))
+                    ).select_related("property"),
+                )
+            )
+        prefetch_fields = set()
+        for field in "connections", "accessibility_properties", "keywords":
+            if self._should_prefetch_field(field):
+                prefetch_fields.add(field)
+        for field in (
+            "entrances",
+            "identifiers",
+            "services",
+            "service_nodes",
+            "mobility_service_nodes",
+            "related_units",
+        ):
+            if not self.only_fields or field in self.only_fields:
+                prefetch_fields.add(field)
+        if "service_nodes" in self.include_fields:
+            prefetch_fields.add("service_nodes")
+        for field in sorted(prefetch_fields):
+            queryset = queryset.prefetch_related(field)
+
+        # Transform the geometries of all the units in the query instead of
+        # one by one in the serializer.
+        geometry_fields = self._get_geometry_fields()
+        geojson_options = get_geojson_options(self.request.query_params)
+        if geojson_options and "geometry" in geometry_fields:
+            # The possibly large geometries are converted to GeoJSON by the
+            # database and not loaded at all.
+            precision, tolerance = geojson_options
+            queryset = annotate_geojson(
+                queryset, ["geometry"], self.srs, precision, tolerance
+            )
+            geometry_fields.remove("geometry")
+        queryset = annotate_transformed_geometries(queryset, geometry_fields, self.srs)
+        deferred_fields = [
+            field
+            for field in ("location", "geometry", "geometry_3d")
+            if field not in geometry_fields
+            or get_transformed_name(field) in queryset.query.annotations
+        ]
+        queryset = queryset.defer(*deferred_fields)
+
+        return queryset
+
+    def filter_units(self, queryset):
+        """
+        Filters the units by the query parameters of the request.
+        """
         filters = self.request.query_params
         if "id" in filters:
             id_list = filters["id"].split(",")
@@ -1250,14 +1563,13 @@ class UnitViewSet(
         if level and level != "all":
             level_specs = settings.LEVELS.get(level)
 
-        def service_nodes_by_ancestors(service_node_ids, node_model=ServiceNode):
-            srv_list = {int(srv_id) for srv_id in service_node_ids}
-            srv_list |= set(
-                node_model.objects.all()
-                .by_ancestors(service_node_ids)
-                .values_list("id", flat=True)
+        def in_service_node_subtrees(service_node_ids):
+            # Units of the service nodes or any of their descendants.
+            return Exists(
+                UnitServiceNodeAncestor.objects.filter(
+                    unit=OuterRef("pk"), service_node__in=service_node_ids
+                )
             )
-            return list(srv_list)
 
         mobility_service_nodes = filters.get("mobility_node", None)
         service_nodes = filters.get("service_node", None)
@@ -1276,12 +1588,14 @@ class UnitViewSet(
                 mobility_service_nodes.split(",")
             )
         if mobility_service_node_ids:
-            matching_unit_ids = Unit.objects.filter(
-                mobility_service_nodes__in=service_nodes_by_ancestors(
-                    mobility_service_node_ids, node_model=MobilityServiceNode
+            queryset = queryset.filter(
+                Exists(
+                    UnitMobilityServiceNodeAncestor.objects.filter(
+                        unit=OuterRef("pk"),
+                        mobility_service_node__in=mobility_service_node_ids,
+                    )
                 )
-            ).values("id")
-            queryset = queryset.filter(id__in=Subquery(matching_unit_ids))
+            )
 
         service_node_ids = None
         if service_nodes:
@@ -1291,10 +1605,7 @@ class UnitViewSet(
             if level_specs["type"] == "include":
                 service_node_ids = level_specs["service_nodes"]
         if service_node_ids:
-            matching_unit_ids = Unit.objects.filter(
-                service_nodes__in=service_nodes_by_ancestors(service_node_ids)
-            ).values("id")
-            queryset = queryset.filter(id__in=Subquery(matching_unit_ids))
+            queryset = queryset.filter(in_service_node_subtrees(service_node_ids))
 
         service_node_ids = None
         val = filters.get("exclude_service_nodes", None)
@@ -1305,10 +1616,7 @@ class UnitViewSet(
             if level_specs["type"] == "exclude":
                 service_node_ids = level_specs["service_nodes"]
         if service_node_ids:
-            excluded_unit_ids = Unit.objects.filter(
-                service_nodes__in=service_nodes_by_ancestors(service_node_ids)
-            ).values("id")
-            queryset = queryset.exclude(id__in=Subquery(excluded_unit_ids))
+            queryset = queryset.exclude(in_service_node_subtrees(service_node_ids))
 
         services = filters.get("service")
         if services is not None:
@@ -1334,13 +1642,7 @@ class UnitViewSet(
             # division=helsinki/kaupunginosa:kallio,vantaa/äänestysalue:5
             d_list = filters["division"].lower().split(",")
             div_list = resolve_divisions(d_list)
-
-            if div_list:
-                mp = div_list.pop(0).geometry.boundary
-                for div in div_list:
-                    mp += div.geometry.boundary
-
-            queryset = queryset.filter(location__within=mp)
+            queryset = queryset.filter(within_divisions(div_list))
 
         if "lat" in filters and "lon" in filters:
             try:
@@ -1388,11 +1690,13 @@ class UnitViewSet(
                     service_ids.append(value)
                 elif key == "service_node":
                     servicenode_ids.append(value)
-            matching_unit_ids = Unit.objects.filter(
-                Q(services__in=service_ids)
-                | Q(service_nodes__in=service_nodes_by_ancestors(servicenode_ids))
-            ).values("id")
-            queryset = queryset.filter(id__in=Subquery(matching_unit_ids))
+            matching_unit_ids = Unit.objects.filter(services__in=service_ids).values(
+                "id"
+            )
+            queryset = queryset.filter(
+                Q(id__in=Subquery(matching_unit_ids))
+                | in_service_node_subtrees(servicenode_ids)
+            )
 
         if "address" in filters:
             language = filters["language"] if "language" in filters else "fi"
@@ -1427,38 +1731,23 @@ class UnitViewSet(
                 )
             )
 
-        if "observations" in self.include_fields:
-            now = timezone.now()
-            queryset = queryset.prefetch_related(
-                Prefetch(
-                    "observation_set",
-                    queryset=Observation.objects.filter(
-                        Q(property__expiration=None)
-                        | Q(time__gt=now - F("property__expiration"))
-                    ).select_related("property"),
-                )
-            )
-        prefetch_fields = set()
-        for field in "connections", "accessibility_properties", "keywords":
-            if self._should_prefetch_field(field):
-                prefetch_fields.add(field)
-        for field in (
-            "entrances",
-            "identifiers",
-            "services",
-            "service_nodes",
-            "mobility_service_nodes",
-            "related_units",
-        ):
-            if not self.only_fields or field in self.only_fields:
-                prefetch_fields.add(field)
-        if "service_nodes" in self.include_fields:
-            prefetch_fields.add("service_nodes")
-        for field in sorted(prefetch_fields):
-            queryset = queryset.prefetch_related(field)
-
         return queryset
 
+    def _get_geometry_fields(self):
+        """The geometry fields the units are serialized with."""
+        query_params = self.request.query_params
+        fields = []
+        if not self.only_fields or "location" in self.only_fields:
+            fields.append("location")
+        if query_params.get("geometry", "").lower() in ("true", "1"):
+            fields.append("geometry")
+        if any(
+            query_params.get(param, "").lower() in ("true", "1")
+            for param in ("geometry_3d", "heightprofilegeom")
+        ):
+            fields.append("geometry_3d")
+        return fields
+
     def _should_prefetch_field(self, field_name):
         # These fields are included by default,
         # and only omitted if not part of an 'only' query param
@@ -1506,10 +1795,68 @@ class UnitViewSet(
         return Response(serializer.data)
 
     def list(self, request, **kwargs):
+        if isinstance(request.accepted_renderer, KmlRenderer | GeoJSONRenderer):
+            # The parameters are validated by building the queryset before the
+            # streamed response starts, as an error cannot change its status.
+            queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(request.accepted_renderer, KmlRenderer):
+            lang_code = get_kml_language(request)
+            response = StreamingHttpResponse(
+                stream_kml(self._stream_units(queryset), lang_code),
+                content_type=KmlRenderer.media_type,
+            )
+            response["Content-Disposition"] = "attachment; filename=palvelukartta.kml"
+            return response
+        if isinstance(request.accepted_renderer, GeoJSONRenderer):
+            return StreamingHttpResponse(
+                stream_geojson(self._stream_units(queryset)),
+                content_type=GeoJSONRenderer.media_type,
+            )
+        if self._use_fast_serializer():
+            response = self._fast_list()
+            if response is not None:
+                return response
         response = super().list(request)
         response.add_post_render_callback(self._add_content_disposition_header)
         return response
 
+    def _use_fast_serializer(self):
+        value = self.request.query_params.get("fast_serializer")
+        if value is None:
+            return settings.UNIT_FAST_SERIALIZER
+        try:
+            return strtobool(value)
+        except ValueError:
+            raise ParseError("'fast_serializer' needs to be a boolean")
+
+    def _fast_list(self):
+        """
+        Returns the unit list serialized with the fast serializer, or None if
+        the requested fields are not supported by it.
+        """
+        serializer = self.get_serializer()
+        plan = get_field_plan(serializer)
+        if plan is None:
+            return None
+        queryset = self.filter_queryset(self.get_queryset())
+        fast_serializer = FastUnitSerializer(plan, serializer, queryset)
+        rows = fast_serializer.get_values_queryset(queryset)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response([fast_serializer.to_representation(row) for row in rows])
+        data = [fast_serializer.to_representation(row) for row in page]
+        return self.get_paginated_response(data)
+
+    def _stream_units(self, queryset):
+        """
+        Yields all the serialized units of the queryset without pagination. The
+        units are fetched with a server-side cursor and prefetched in chunks,
+        so only a chunk of them is held in memory at a time.
+        """
+        serializer = self.get_serializer()
+        for unit in queryset.iterator(chunk_size=settings.UNIT_STREAMING_CHUNK_SIZE):
+            yield serializer.to_representation(unit)
+
     @action(detail=True, methods=["get"], url_path="picture")
     def picture(self, request, pk=None):
         unit = self._get_unit(pk)
@@ -1583,12 +1930,20 @@ register_view(
 @extend_schema_serializer(deprecate_fields=["service_point_id"])
 class AdministrativeDivisionSerializer(munigeo_api.AdministrativeDivisionSerializer):
     def to_representation(self, obj):
-        ret = super().to_representation(obj)
+        # Skip the boundary conversion of munigeo's serializer, the boundary
+        # is transformed by AdministrativeDivisionViewSet in the query.
+        ret = super(
+            munigeo_api.AdministrativeDivisionSerializer, self
+        ).to_representation(obj)
 
         if "request" not in self.context:
             return ret
 
         query_params = self.context["request"].query_params
+        if query_params.get("geometry", "").lower() in ("true", "1"):
+            boundary_field = self.context.get("boundary_field", FULL_BOUNDARY_FIELD)
+            ret["boundary"] = get_geometry_json(obj, boundary_field, self.srs)
+        ret["type"] = obj.type.type
         unit_include = query_params.get("unit_include", None)
 
         if (service_point_id := ret["service_point_id"]) and unit_include:
@@ -1612,9 +1967,12 @@ class AdministrativeDivisionSerializer(munigeo_api.AdministrativeDivisionSeriali
             ]
 
         include_fields = query_params.get("include", [])
-        if "centroid" in include_fields and obj.geometry:
-            centroid = obj.geometry.boundary.centroid
-            ret["centroid"] = munigeo_api.geom_to_json(centroid, self.srs)
+        if "centroid" in include_fields:
+            centroid = getattr(obj, "transformed_centroid", None)
+            if centroid is None and getattr(obj, "geometry", None):
+                centroid = obj.geometry.boundary.centroid
+            if centroid is not None:
+                ret["centroid"] = geometry_to_json(centroid, self.srs)
 
         return ret
 
@@ -1627,6 +1985,10 @@ class AdministrativeDivisionSerializer(munigeo_api.AdministrativeDivisionSeriali
         INPUT_PARAMETER,
         OCD_ID_PARAMETER,
         GEOMETRY_PARAMETER,
+        GEOMETRY_PRECISION_PARAMETER,
+        GEOMETRY_TOLERANCE_PARAMETER,
+        SIMPLIFY_PARAMETER,
+        ZOOM_PARAMETER,
         ORIGIN_ID_PARAMETER,
         MUNICIPALITY_PARAMETER,
         DATE_PARAMETER,
@@ -1635,6 +1997,16 @@ class AdministrativeDivisionSerializer(munigeo_api.AdministrativeDivisionSeriali
 class AdministrativeDivisionViewSet(munigeo_api.AdministrativeDivisionViewSet):
     serializer_class = AdministrativeDivisionSerializer
 
+    def initial(self, request, *args, **kwargs):
+        ret = super().initial(request, *args, **kwargs)
+        self.boundary_field = get_boundary_field(request.query_params)
+        return ret
+
+    def get_serializer_context(self):
+        ret = super().get_serializer_context()
+        ret["boundary_field"] = self.boundary_field
+        return ret
+
     def get_queryset(self):
         queryset = super().get_queryset()
         filters = self.request.query_params
@@ -1651,6 +2023,43 @@ class AdministrativeDivisionViewSet(munigeo_api.AdministrativeDivisionViewSet):
                 )
                 queryset = queryset.filter(geometry__boundary__contains=point)
 
+        if filters.get("geometry", "").lower() in ("true", "1"):
+            boundary_field = self.boundary_field
+            geojson_options = get_geojson_options(filters)
+            if geojson_options:
+                precision, tolerance = geojson_options
+                queryset = annotate_geojson(
+                    queryset, [boundary_field], self.srs, precision, tolerance
+                )
+            else:
+                queryset = annotate_transformed_geometries(
+                    queryset, [boundary_field], self.srs
+                )
+            annotated = {
+                get_geojson_name(boundary_field),
+                get_transformed_name(boundary_field),
+            } & queryset.query.annotations.keys()
+            deferred_fields = []
+            if boundary_field != FULL_BOUNDARY_FIELD:
+                deferred_fields.append(FULL_BOUNDARY_FIELD)
+                if not annotated:
+                    # Only the simplified boundary in use is loaded.
+                    queryset = queryset.select_related("simplified_geometry")
+                    deferred_fields += [
+                        f"simplified_geometry__{field_name}"
+                        for field_name in SIMPLIFIED_BOUNDARY_TOLERANCES
+                        if f"simplified_geometry__{field_name}" != boundary_field
+                    ]
+            if annotated:
+                deferred_fields.append(boundary_field)
+            queryset = queryset.defer(*deferred_fields)
+        if "centroid" in filters.get("include", ""):
+            queryset = queryset.annotate(
+                transformed_centroid=Transform(
+                    Centroid("geometry__boundary"), self.srs.srid
+                )
+            )
+
         return queryset.order_by("id")
 
 
@@ -1666,16 +2075,18 @@ register_view(AdministrativeDivisionViewSet, "administrative_division")
         LONGITUDE_PARAMETER,
         DISTANCE_PARAMETER,
         BBOX_PARAMETER,
+        PAGINATION_PARAMETER,
+        COUNT_PARAMETER,
     ],
 )
-class AddressViewSet(munigeo_api.AddressViewSet):
+class AddressViewSet(CursorPaginationMixin, munigeo_api.AddressViewSet):
     serializer_class = munigeo_api.AddressSerializer
 
 
 register_view(AddressViewSet, "address")
 
 
-class OutdoorSportsMapUsageViewSet(viewsets.ReadOnlyModelViewSet):
+class OutdoorSportsMapUsageViewSet(ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         query_params = self.request.query_params
@@ -1710,6 +2121,7 @@ class AnnouncementSerializer(ServicesTranslatedModelSerializer, JSONAPISerialize
 class AnnouncementViewSet(OutdoorSportsMapUsageViewSet):
     queryset = Announcement.objects.filter(active=True)
     serializer_class = AnnouncementSerializer
+    response_cache_namespace = "announcement"
 
     @action(detail=True, methods=["get"], url_path="picture")
     def picture(self, request, pk=None):
@@ -1741,6 +2153,7 @@ class ErrorMessageSerializer(ServicesTranslatedModelSerializer, JSONAPISerialize
 class ErrorMessageViewSet(OutdoorSportsMapUsageViewSet):
     queryset = ErrorMessage.objects.filter(active=True)
     serializer_class = ErrorMessageSerializer
+    response_cache_namespace = "error_message"
 
     @action(detail=True, methods=["get"], url_path="picture")
     def picture(self, request, pk=None):
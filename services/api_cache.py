@@ -0,0 +1,170 @@
+"""
+Shared cache of the responses of the read-only API viewsets.
+
+The responses are cached by the namespace of the viewset, the path, the
+normalized query parameters and the Accept header. Every namespace has a
+generation which is a part of the keys, thus invalidating a namespace only
+invalidates the responses of the viewsets of the namespace. The namespaces
+are invalidated when their data is saved, at the end of the import commands
+and with the purge_response_cache command or admin action. The responses are
+cached only when the cache is shared by the processes.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from services.utils import is_cache_shared
+
+RESPONSE_CACHE_KEY_PREFIX = "response"
+RESPONSE_CACHE_GENERATION_KEY_PREFIX = "response_generation"
+RESPONSE_CACHE_NAMESPACES = (
+    "announcement",
+    "department",
+    "error_message",
+    "mobility",
+    "service",
+    "service_node",
+)
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def is_response_cache_enabled():
+    # The invalidations would not reach the other processes of a local cache.
+    return settings.RESPONSE_CACHE_TIMEOUT > 0 and is_cache_shared(
+        settings.RESPONSE_CACHE_ALIAS
+    )
+
+
+def get_generation(namespace):
+    """
+    Returns the generation of the namespace. The initial generation is a
+    timestamp, so that a generation lost from the cache never returns to a
+    previously used value.
+    """
+    response_cache = get_response_cache()
+    key = f"{RESPONSE_CACHE_GENERATION_KEY_PREFIX}:{namespace}"
+    generation = response_cache.get(key)
+    if generation is None:
+        response_cache.add(key, time.time_ns(), timeout=None)
+        generation = response_cache.get(key)
+    return generation
+
+
+def invalidate_response_cache(*namespaces):
+    """
+    Invalidates the cached responses of the given namespaces, or of all the
+    namespaces if none is given.
+    """
+    response_cache = get_response_cache()
+    for namespace in namespaces or RESPONSE_CACHE_NAMESPACES:
+        if namespace not in RESPONSE_CACHE_NAMESPACES:
+            raise ValueError(f"Unknown response cache namespace '{namespace}'")
+        key = f"{RESPONSE_CACHE_GENERATION_KEY_PREFIX}:{namespace}"
+        try:
+            response_cache.incr(key)
+        except ValueError:
+            # The generation is not in the cache.
+            response_cache.set(key, time.time_ns(), timeout=None)
+
+
+def normalize_query_params(query_params):
+    return [
+        (key, [value.strip() for value in query_params.getlist(key)])
+        for key in sorted(query_params.keys())
+    ]
+
+
+def get_response_cache_key(request, namespace):
+    """
+    Returns the cache key of the response to the request. Host is a part of
+    the key as the paginated responses contain absolute URLs.
+    """
+    key = json.dumps(
+        [
+            request.build_absolute_uri(request.path),
+            normalize_query_params(request.query_params),
+            request.headers.get("Accept", ""),
+        ]
+    )
+    return (
+        f"{RESPONSE_CACHE_KEY_PREFIX}:{namespace}:{get_generation(namespace)}:"
+        f"{hashlib.sha256(key.encode()).hexdigest()}"
+    )
+
+
+def cache_response(view_method):
+    """
+    Decorator caching the successful responses of a viewset method in the
+    namespace given by the response_cache_namespace of the viewset.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not is_response_cache_enabled():
+            return view_method(self, request, *args, **kwargs)
+        response_cache = get_response_cache()
+        cache_key = get_response_cache_key(request, self.response_cache_namespace)
+        data = response_cache.get(cache_key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set(
+                cache_key, response.data, settings.RESPONSE_CACHE_TIMEOUT
+            )
+        response["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
+
+
+class ResponseCacheMixin:
+    """
+    Viewset mixin caching the responses of the list and the detail views in
+    the shared response cache.
+    """
+
+    response_cache_namespace = None
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class ResponseCacheInvalidationQueue(threading.local):
+    """
+    Namespaces to invalidate when the current transaction is committed, so
+    that the responses cached before the commit are not left valid.
+    """
+
+    def __init__(self):
+        self.pending = set()
+
+    def add(self, *namespaces):
+        self.pending.update(namespaces)
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        pending, self.pending = self.pending, set()
+        if pending:
+            invalidate_response_cache(*sorted(pending))
+
+
+response_cache_invalidation_queue = ResponseCacheInvalidationQueue()
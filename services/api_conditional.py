@@ -0,0 +1,68 @@
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from services.utils import get_data_modified_time, get_data_version, is_cache_shared
+
+CONDITIONAL_METHODS = ("GET", "HEAD")
+
+
+def get_etag(request):
+    """
+    Returns the entity tag of the response to the request with the current
+    data version. The tag changes with the data version, the path, the query
+    and the requested media type.
+    """
+    key = json.dumps(
+        [
+            get_data_version(),
+            request.get_full_path(),
+            request.headers.get("Accept", ""),
+        ]
+    )
+    return quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+
+
+class ConditionalGetMixin:
+    """
+    View mixin answering GET requests with If-None-Match or If-Modified-Since
+    headers matching the current data version with 304 Not Modified, before
+    the request is handled and without querying the database. The responses
+    are given ETag and Last-Modified headers of the data version.
+
+    The data version is kept in the default cache, thus the requests are
+    handled unconditionally when the cache is not shared by the processes.
+    So are the requests including the fields of time_dependent_includes,
+    which change with the time without a change of the data version.
+    """
+
+    time_dependent_includes = ()
+
+    def is_conditional(self, request):
+        if request.method not in CONDITIONAL_METHODS or not is_cache_shared():
+            return False
+        include = request.GET.get("include", "")
+        return not any(
+            field.strip() in self.time_dependent_includes
+            for field in include.split(",")
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return super().dispatch(request, *args, **kwargs)
+        # The validators are resolved before the response, thus a change of
+        # the data during the request does not leave the response fresh.
+        etag = get_etag(request)
+        last_modified = get_data_modified_time()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        response.headers.setdefault("ETag", etag)
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+        return response
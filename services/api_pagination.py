@@ -1,14 +1,164 @@
+import hashlib
+import json
 import re
+from functools import partial
 
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.contrib.gis.measure import Distance
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from services.utils import get_data_version, is_cache_shared, strtobool
 
 KML_REGEXP = re.compile(settings.KML_REGEXP)
 
+PAGINATION_MODES = ("page", "cursor")
+
+COUNT_CACHE_KEY_PREFIX = "count"
+# Parameters not affecting the objects of the list.
+NON_FILTER_PARAMS = {"page", "page_size", "count", "pagination", "format"}
+# Comma separated filters whose order does not affect the objects.
+LIST_FILTER_PARAMS = {"id", "municipality", "service", "service_node", "division"}
+# The planner estimates of small lists are the least accurate and counting
+# them is cheap, thus the lists estimated to be smaller are counted.
+EXACT_COUNT_THRESHOLD = 1000
+
+
+def normalize_filter_params(query_params):
+    params = []
+    for key in sorted(query_params.keys()):
+        if key in NON_FILTER_PARAMS:
+            continue
+        values = [value.strip() for value in query_params.getlist(key)]
+        if key in LIST_FILTER_PARAMS:
+            values = [
+                ",".join(sorted(item.strip() for item in value.split(",")))
+                for value in values
+            ]
+        params.append((key, values))
+    return params
+
+
+def is_count_cache_enabled():
+    # The data version keying the counts is not shared by a local cache.
+    return settings.COUNT_CACHE_TIMEOUT > 0 and is_cache_shared()
+
+
+def get_count_cache_key(request):
+    key = json.dumps(
+        [
+            get_data_version(),
+            request.path,
+            normalize_filter_params(request.query_params),
+        ]
+    )
+    return f"{COUNT_CACHE_KEY_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def estimate_count(queryset):
+    """
+    Returns the number of the objects of the queryset estimated by the query
+    planner, without running the query.
+    """
+    plan = json.loads(queryset.explain(format="json"))
+    # The plan is wrapped in a list by some of the database drivers.
+    if isinstance(plan, list):
+        plan = plan[0]
+    return int(plan["Plan"]["Plan Rows"])
+
+
+class UncountedPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class UncountedPaginator(DjangoPaginator):
+    """
+    Paginator that does not count the objects. A page is fetched with one
+    extra object to find out whether there is a next page.
+    """
+
+    # Only known up to the page after the fetched one.
+    _known_pages = 1
+
+    @cached_property
+    def count(self):
+        return None
+
+    @property
+    def num_pages(self):
+        return self._known_pages
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage("That page contains no results")
+        has_next = len(object_list) > self.per_page
+        self._known_pages = number + 1 if has_next else number
+        return UncountedPage(object_list[: self.per_page], number, self, has_next)
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """
+    Paginator caching the count of the objects with the given key.
+    """
+
+    def __init__(self, *args, cache_key, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = super().count
+            cache.set(self.cache_key, count, settings.COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Paginator using the planner estimate of the count of the objects, unless
+    the estimate is below EXACT_COUNT_THRESHOLD or the objects are not a
+    queryset. The pages near the end of the list may be empty or missing if
+    the estimate is off.
+    """
+
+    @cached_property
+    def count(self):
+        # E.g. the chained querysets of the search have no plan to estimate.
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        estimate = estimate_count(self.object_list)
+        if estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
 
 class Pagination(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 1000
+    count_query_param = "count"
 
     def get_page_size(self, request):
         if hasattr(request, "accepted_media_type") and re.match(
@@ -16,3 +166,88 @@ class Pagination(PageNumberPagination):
         ):
             return 30000
         return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count_mode = self.get_count_mode(request)
+        if count_mode == "estimate":
+            self.django_paginator_class = EstimatedCountPaginator
+        elif count_mode == "none":
+            # The count of the objects is null in the response.
+            self.django_paginator_class = UncountedPaginator
+            if request.query_params.get(self.page_query_param) in (
+                self.last_page_strings
+            ):
+                raise NotFound("The last page is not known without the count.")
+        elif getattr(view, "cache_count", False) and is_count_cache_enabled():
+            self.django_paginator_class = partial(
+                CachedCountPaginator, cache_key=get_count_cache_key(request)
+            )
+        else:
+            self.django_paginator_class = DjangoPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_mode(self, request):
+        """
+        Returns "exact", "estimate" or "none" by the count parameter.
+        """
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return "exact"
+        if value.lower() == "estimate":
+            return "estimate"
+        try:
+            return "exact" if strtobool(value) else "none"
+        except ValueError:
+            raise ParseError(
+                f"'{self.count_query_param}' needs to be a boolean or 'estimate'"
+            )
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered by the id, or by the distance and the id when
+    the queryset is annotated with the distance to a point. The objects are
+    not counted and a page never has an offset of more than the ties of the
+    distance.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        if "distance" in queryset.query.annotations:
+            return ("distance", "id")
+        return ("id",)
+
+    def _get_position_from_instance(self, instance, ordering):
+        field_name = ordering[0].lstrip("-")
+        if isinstance(instance, dict):
+            value = instance[field_name]
+        else:
+            value = getattr(instance, field_name)
+        if isinstance(value, Distance):
+            value = value.m
+        return str(value)
+
+
+class CursorPaginationMixin:
+    """
+    Viewset mixin paginating the list with IdCursorPagination when requested
+    with pagination=cursor, instead of with the default page numbers.
+    """
+
+    pagination_query_param = "pagination"
+
+    @property
+    def paginator(self):
+        request = getattr(self, "request", None)
+        if not hasattr(self, "_paginator") and request is not None:
+            mode = request.query_params.get(self.pagination_query_param, "page")
+            if mode not in PAGINATION_MODES:
+                raise ParseError(
+                    f"'{self.pagination_query_param}' must be one of "
+                    + ", ".join(PAGINATION_MODES)
+                )
+            if mode == "cursor":
+                self._paginator = IdCursorPagination()
+        return super().paginator
@@ -0,0 +1,363 @@
+"""
+Fast path of the unit list serialization.
+
+UnitSerializer goes through the DRF field machinery, the translated field
+loops and the munigeo geometry conversion for every unit. The fast path
+fetches only the columns of the requested fields with values() and converts
+them with a field plan compiled from a UnitSerializer instance, producing the
+same data as the serializer, key order included.
+
+Fields the plan does not support, i.e. the nested and many-to-many fields,
+the include parameter and the height profile, make the plan unavailable and
+the units are serialized with UnitSerializer.
+"""
+
+import json
+import operator
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from munigeo import api as munigeo_api
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.reverse import reverse
+
+from services.models.unit import ORGANIZER_TYPES, PROVIDER_TYPES
+from services.utils.geometry import (
+    geometry_to_json,
+    get_geojson_name,
+    get_transformed_name,
+)
+
+LANGUAGES = [x[0] for x in settings.LANGUAGES]
+
+# Fields whose to_representation returns the column values as they are.
+IDENTITY_FIELD_TYPES = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+DEFAULT_KEEP_FIELDS = ["accessibility_shortcoming_count"]
+
+FIELD_PLAN_CACHE_SIZE = 128
+
+# The compiled field plans in the order of their use, see get_field_plan.
+_field_plans = OrderedDict()
+_field_plans_lock = threading.Lock()
+
+
+class UnsupportedFieldError(Exception):
+    pass
+
+
+def _is_true(query_params, name):
+    return query_params.get(name, "").lower() in ("true", "1")
+
+
+def _get_choice_labels(choices):
+    labels = {}
+    for key, label in choices:
+        labels.setdefault(key, label)
+    return labels
+
+
+PROVIDER_TYPE_LABELS = _get_choice_labels(PROVIDER_TYPES)
+ORGANIZER_TYPE_LABELS = _get_choice_labels(ORGANIZER_TYPES)
+
+
+def _department_uuid(field):
+    column = f"{field}__uuid"
+    return [column], operator.itemgetter(column)
+
+
+def _choice_label(column, labels):
+    return [column], lambda row: labels.get(row[column])
+
+
+def _contract_type():
+    columns = ["displayed_service_owner_type"] + [
+        f"displayed_service_owner_{lang}" for lang in ("fi", "sv", "en")
+    ]
+
+    def convert(row):
+        key = row["displayed_service_owner_type"]
+        if not key:
+            return None
+        description = {
+            lang: row[f"displayed_service_owner_{lang}"] for lang in ("fi", "sv", "en")
+        }
+        return {"id": key, "description": description}
+
+    return columns, convert
+
+
+# The method fields of UnitSerializer by the field name and the method name,
+# as (columns, converter) pairs. picture_url depends on the request and is
+# bound separately.
+METHOD_FIELDS = {
+    ("department", "department_uuid"): lambda: _department_uuid("department"),
+    ("root_department", "root_department_uuid"): lambda: _department_uuid(
+        "root_department"
+    ),
+    ("provider_type", "get_provider_type"): lambda: _choice_label(
+        "provider_type", PROVIDER_TYPE_LABELS
+    ),
+    ("organizer_type", "get_organizer_type"): lambda: _choice_label(
+        "organizer_type", ORGANIZER_TYPE_LABELS
+    ),
+    ("contract_type", "get_contract_type"): _contract_type,
+}
+
+
+def _translated_converter(field_name):
+    columns = [(lang, f"{field_name}_{lang}") for lang in LANGUAGES]
+
+    def convert(row):
+        translations = {
+            lang: row[column] for lang, column in columns if row[column] is not None
+        }
+        return translations or None
+
+    return [column for _, column in columns], convert
+
+
+def _column_converter(column, field):
+    if type(field) in IDENTITY_FIELD_TYPES:
+        return operator.itemgetter(column)
+    to_representation = field.to_representation
+
+    def convert(row):
+        value = row[column]
+        return None if value is None else to_representation(value)
+
+    return convert
+
+
+def _get_model_field(model, field):
+    try:
+        return model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        raise UnsupportedFieldError(field.field_name)
+
+
+class UnitFieldPlan:
+    """
+    The columns and the converters of the fields of a UnitSerializer
+    instance, in the order the serializer outputs them.
+    """
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        self.columns = {"id"}
+        self.converters = []
+        for field_name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field_name in serializer.translated_fields:
+                columns, converter = _translated_converter(field_name)
+            elif isinstance(field, serializers.SerializerMethodField):
+                if field_name == "picture_url" and field.method_name == (
+                    "get_picture_url"
+                ):
+                    columns, converter = ["picture_url"], None
+                else:
+                    factory = METHOD_FIELDS.get((field_name, field.method_name))
+                    if factory is None:
+                        raise UnsupportedFieldError(field_name)
+                    columns, converter = factory()
+            elif isinstance(field, PrimaryKeyRelatedField):
+                model_field = _get_model_field(model, field)
+                if field.pk_field is not None or model_field.many_to_many:
+                    raise UnsupportedFieldError(field_name)
+                columns = [model_field.attname]
+                converter = operator.itemgetter(model_field.attname)
+            elif isinstance(
+                field,
+                (
+                    serializers.BaseSerializer,
+                    serializers.ManyRelatedField,
+                    serializers.RelatedField,
+                    # Serializes the model instance instead of the value.
+                    serializers.ModelField,
+                ),
+            ):
+                raise UnsupportedFieldError(field_name)
+            else:
+                model_field = _get_model_field(model, field)
+                if model_field.is_relation or not model_field.concrete:
+                    raise UnsupportedFieldError(field_name)
+                columns = [field.source]
+                converter = _column_converter(field.source, field)
+            self.columns.update(columns)
+            self.converters.append((field_name, converter))
+        self.geo_fields = list(serializer.geo_fields)
+        self.shortcoming_count = _has_shortcoming_count(serializer)
+
+
+def _has_shortcoming_count(serializer):
+    return "accessibility_shortcoming_count" in getattr(
+        serializer, "keep_fields", DEFAULT_KEEP_FIELDS
+    )
+
+
+def get_field_plan(serializer):
+    """
+    Returns the field plan of the serializer, or None if the fields of the
+    serializer are not supported by the fast path. The plans are compiled once
+    per combination of the serializer fields, and at most FIELD_PLAN_CACHE_SIZE
+    plans are kept as the only parameter can select any subset of the fields.
+    """
+    context = serializer.context
+    if context.get("include"):
+        return None
+    query_params = context["request"].query_params
+    if _is_true(query_params, "heightprofilegeom"):
+        return None
+    key = (tuple(serializer.fields), _has_shortcoming_count(serializer))
+    with _field_plans_lock:
+        if key in _field_plans:
+            _field_plans.move_to_end(key)
+            return _field_plans[key]
+    try:
+        plan = UnitFieldPlan(serializer)
+    except UnsupportedFieldError:
+        plan = None
+    with _field_plans_lock:
+        _field_plans[key] = plan
+        while len(_field_plans) > FIELD_PLAN_CACHE_SIZE:
+            _field_plans.popitem(last=False)
+    return plan
+
+
+class FastUnitSerializer:
+    """
+    Serializes the rows of a values() queryset of units like the serializer
+    the field plan was compiled from.
+    """
+
+    def __init__(self, plan, serializer, queryset):
+        self.plan = plan
+        self.serializer = serializer
+        self.request = serializer.context["request"]
+        self.srs = serializer.context.get("srs", munigeo_api.DEFAULT_SRS)
+        query_params = self.request.query_params
+        self.geometry = _is_true(query_params, "geometry")
+        self.geometry_3d = _is_true(query_params, "geometry_3d")
+        self.accessibility_description = _is_true(
+            query_params, "accessibility_description"
+        )
+        self.distance = "distance" in queryset.query.annotations
+        # geometry and geometry_3d are serialized only when requested.
+        self.geo_fields = [
+            field_name
+            for field_name in plan.geo_fields
+            if field_name not in ("geometry", "geometry_3d")
+            or getattr(self, field_name)
+        ]
+        # The geometries transformed or converted to GeoJSON in the query by
+        # UnitViewSet.
+        annotations = queryset.query.annotations
+        self.geo_columns = {}
+        self.geojson_fields = set()
+        for field_name in self.geo_fields:
+            column = get_geojson_name(field_name)
+            if column in annotations:
+                self.geojson_fields.add(field_name)
+            else:
+                column = get_transformed_name(field_name)
+                if column not in annotations:
+                    column = field_name
+            self.geo_columns[field_name] = column
+        self._extensions_cache = {}
+
+    def get_columns(self):
+        columns = set(self.plan.columns)
+        if self.plan.shortcoming_count or self.accessibility_description:
+            columns.add("accessibility_shortcomings__pk")
+        if self.plan.shortcoming_count:
+            columns.add("accessibility_shortcomings__accessibility_shortcoming_count")
+        if self.accessibility_description:
+            columns.add("accessibility_shortcomings__accessibility_description")
+        columns.update(self.geo_columns.values())
+        if "root_service_nodes" in self.plan.columns:
+            columns.add("root_service_nodes")
+        if self.distance:
+            columns.add("distance")
+        return sorted(columns)
+
+    def get_values_queryset(self, queryset):
+        return queryset.prefetch_related(None).values(*self.get_columns())
+
+    def _geom_to_json(self, geom):
+        return geometry_to_json(geom, self.srs)
+
+    def _get_picture_url(self, row):
+        if settings.PICTURE_URL_REWRITE_ENABLED and row["picture_url"]:
+            return self.request.build_absolute_uri(
+                reverse("unit-picture", kwargs={"pk": row["id"]})
+            )
+        return row["picture_url"]
+
+    def _translate_extensions(self, extensions):
+        if not extensions:
+            return self.serializer.handle_extension_translations(extensions)
+        key = tuple(extensions.items())
+        try:
+            cached = self._extensions_cache.get(key)
+        except TypeError:
+            return self.serializer.handle_extension_translations(extensions)
+        if cached is None:
+            cached = self.serializer.handle_extension_translations(extensions)
+            self._extensions_cache[key] = cached
+        return dict(cached)
+
+    def _get_shortcomings_value(self, row, field_name, default):
+        if row["accessibility_shortcomings__pk"] is None:
+            # The default of a missing UnitAccessibilityShortcomings.
+            return default()
+        return row[f"accessibility_shortcomings__{field_name}"]
+
+    def to_representation(self, row):
+        ret = {}
+        for field_name, converter in self.plan.converters:
+            if converter is None:
+                ret[field_name] = self._get_picture_url(row)
+            else:
+                ret[field_name] = converter(row)
+        for field_name, column in self.geo_columns.items():
+            geom = row[column]
+            if geom is None:
+                ret[field_name] = None
+            elif field_name in self.geojson_fields:
+                ret[field_name] = json.loads(geom)
+            else:
+                ret[field_name] = self._geom_to_json(geom)
+
+        if self.distance and row["distance"]:
+            ret["distance"] = row["distance"].m
+
+        if "root_service_nodes" in ret:
+            root_service_nodes = row["root_service_nodes"]
+            if root_service_nodes is None or root_service_nodes == "":
+                ret["root_service_nodes"] = None
+            else:
+                ret["root_service_nodes"] = [
+                    int(x) for x in root_service_nodes.split(",")
+                ]
+
+        if "extensions" in ret:
+            ret["extensions"] = self._translate_extensions(ret["extensions"])
+
+        if self.plan.shortcoming_count:
+            ret["accessibility_shortcoming_count"] = self._get_shortcomings_value(
+                row, "accessibility_shortcoming_count", dict
+            )
+
+        if self.accessibility_description:
+            ret["accessibility_description"] = self._get_shortcomings_value(
+                row, "accessibility_description", list
+            )
+        return ret
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Case, When
+from munigeo.models import Address
+
+from services.models import Service, Unit
+from services.search.utils import get_preserved_order
+
+MODELS = {"unit": Unit, "service": Service, "address": Address}
+
+
+def get_case_when_order(ids):
+    """
+    The Case expression with a When branch per id, previously used by
+    get_preserved_order.
+    """
+    return Case(*[When(id=id, then=pos) for pos, id in enumerate(ids)])
+
+
+def explain(qs):
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return plan[0]["Planning Time"], plan[0]["Execution Time"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the planning and execution times of ordering the search results"
+        " by a list of ids with a Case expression and with array_position."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            choices=MODELS.keys(),
+            default="address",
+            help="The model whose ids are ordered, defaults to address",
+        )
+        parser.add_argument(
+            "--sizes",
+            type=lambda value: [int(size) for size in value.split(",")],
+            default=[10, 1000, 10000],
+            help="Comma separated numbers of ids, defaults to 10,1000,10000",
+        )
+
+    def handle(self, *args, **options):
+        model = MODELS[options["model"]]
+        self.stdout.write(
+            f"{'ids':>8} {'ordering':<16} {'planning ms':>12} {'execution ms':>13}"
+        )
+        for size in options["sizes"]:
+            # Reverse the ids so that the ordering differs from the id order.
+            ids = model.objects.order_by("-id").values_list("id", flat=True)
+            ids = list(ids[:size])
+            if len(ids) < size:
+                self.stderr.write(f"Only {len(ids)} {model.__name__} ids available.")
+            for name, ordering in [
+                ("case_when", get_case_when_order(ids)),
+                ("array_position", get_preserved_order(ids)),
+            ]:
+                qs = model.objects.filter(id__in=ids).order_by(ordering)
+                planning_time, execution_time = explain(qs)
+                self.stdout.write(
+                    f"{len(ids):>8} {name:<16} {planning_time:>12.2f}"
+                    f" {execution_time:>13.2f}"
+                )
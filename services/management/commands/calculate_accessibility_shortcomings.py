@@ -3,6 +3,7 @@ from tqdm import tqdm
 
 from services.models import AccessibilityVariable, Unit, UnitAccessibilityShortcomings
 from services.utils import AccessibilityShortcomingCalculator as Calculator
+from services.utils import bump_data_version
 
 
 class Command(BaseCommand):
@@ -42,6 +43,8 @@ class Command(BaseCommand):
                 progress_bar.update(1)
         if progress_bar:
             progress_bar.close()
+        # The shortcomings are not saved through the units.
+        bump_data_version()
 
     def print_rules(self):
         def print_rule(rule, indent=""):
@@ -4,6 +4,8 @@ from django.core.management.base import BaseCommand
 from munigeo.models import Address, AdministrativeDivision
 
 from services.models import Service, ServiceNode, Unit
+from services.search.index import empty_search_index
+from services.utils import bump_data_version
 
 logger = logging.getLogger("services.management")
 
@@ -21,3 +23,6 @@ class Command(BaseCommand):
                 )
                 key = f"search_column_{lang}"
                 model.objects.update(**{key: None})
+        logger.info("Emptying search index...")
+        empty_search_index()
+        bump_data_version()
@@ -1,17 +1,26 @@
 import logging
+import time
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from itertools import batched
 
 from django.contrib.postgres.search import SearchVector
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from munigeo.models import Address, AdministrativeDivision
 
-from services.models import Service, ServiceNode, Unit
+from services.models import HyphenatedWord, Service, ServiceNode, Unit
 from services.search.constants import HYPHENATE_ADDRESSES_MODIFIED_WITHIN_DAYS
-from services.search.utils import get_foreign_key_attr, hyphenate
+from services.search.hyphenation import HyphenationPool, get_words
+from services.search.hyphenation_cache import hyphenation_cache
+from services.search.index import rebuild_search_index
+from services.search.utils import get_foreign_key_attr
+from services.utils import bump_data_version
 
 logger = logging.getLogger("services.management")
 
+DEFAULT_BATCH_SIZE = 1000
+
 
 def get_search_column(model, lang):
     """
@@ -30,6 +39,35 @@ def get_search_column(model, lang):
     return search_column
 
 
+def get_syllables_queryset(
+    model, hyphenate_all_addresses=False, hyphenate_addresses_from=None
+):
+    """
+    Returns the queryset of rows whose syllables are generated. Unless all
+    addresses are hyphenated, only recently modified addresses are included.
+    """
+    if model.__name__ == "Address" and not hyphenate_all_addresses:
+        if not hyphenate_addresses_from:
+            hyphenate_addresses_from = Address.objects.latest(
+                "modified_at"
+            ).modified_at - timedelta(days=HYPHENATE_ADDRESSES_MODIFIED_WITHIN_DAYS)
+        return model.objects.filter(modified_at__gte=hyphenate_addresses_from)
+    return model.objects.all()
+
+
+def get_syllables(words, hyphenated):
+    """
+    Returns the syllables of the compound words, hyphenated is a dict of
+    the words and their syllables.
+    """
+    syllables_fi = []
+    for word in words:
+        syllables = hyphenated[word]
+        if len(syllables) > 1:
+            syllables_fi.extend(syllables)
+    return syllables_fi
+
+
 def generate_syllables(
     model, hyphenate_all_addresses=False, hyphenate_addresses_from=None
 ):
@@ -42,34 +80,65 @@ def generate_syllables(
     num_populated = 0
     if model.__name__ == "Address" and not hyphenate_all_addresses:
         save_kwargs["skip_modified_at"] = True
-        if not hyphenate_addresses_from:
-            hyphenate_addresses_from = Address.objects.latest(
-                "modified_at"
-            ).modified_at - timedelta(days=HYPHENATE_ADDRESSES_MODIFIED_WITHIN_DAYS)
-        qs = model.objects.filter(modified_at__gte=hyphenate_addresses_from)
-    else:
-        qs = model.objects.all()
+    qs = get_syllables_queryset(
+        model, hyphenate_all_addresses, hyphenate_addresses_from
+    )
     for row in qs.iterator(chunk_size=10000):
-        row.syllables_fi = []
-        for column in model.get_syllable_fi_columns():
-            row_content = get_foreign_key_attr(row, column)
-            if row_content:
-                # Rows might be of type str or Array, if str
-                # cast to array by splitting.
-                if isinstance(row_content, str):
-                    row_content = row_content.split()
-                for word in row_content:
-                    syllables = hyphenate(word)
-                    if len(syllables) > 1:
-                        for s in syllables:
-                            row.syllables_fi.append(s)
-            row.save(**save_kwargs)
-            num_populated += 1
+        words = get_words(
+            get_foreign_key_attr(row, column)
+            for column in model.get_syllable_fi_columns()
+        )
+        row.syllables_fi = get_syllables(words, hyphenation_cache.hyphenate(words))
+        row.save(**save_kwargs)
+        num_populated += 1
     # Enable sending of signals
     model._meta.auto_created = False
     return num_populated
 
 
+def generate_syllables_bulk(
+    model,
+    hyphenate_all_addresses=False,
+    hyphenate_addresses_from=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    pool=None,
+):
+    """
+    Generates syllables for the given model in batches. Only the syllable
+    columns are read and the syllables are written with one bulk_update per
+    batch, thus no signals are sent and modified_at timestamps are not touched.
+    The words of a batch missing from the hyphenation cache are hyphenated with
+    the given HyphenationPool.
+    """
+    if pool is None:
+        with HyphenationPool(processes=1) as pool:
+            return generate_syllables_bulk(
+                model,
+                hyphenate_all_addresses,
+                hyphenate_addresses_from,
+                batch_size,
+                pool,
+            )
+    columns = model.get_syllable_fi_columns()
+    qs = get_syllables_queryset(
+        model, hyphenate_all_addresses, hyphenate_addresses_from
+    )
+    rows = qs.order_by().values_list("id", *columns).iterator(chunk_size=batch_size)
+    num_populated = 0
+    for batch in batched(rows, batch_size):
+        words = [get_words(row[1:]) for row in batch]
+        hyphenated = hyphenation_cache.hyphenate(
+            (word for row_words in words for word in row_words), pool.hyphenate
+        )
+        objs = [
+            model(id=row[0], syllables_fi=get_syllables(row_words, hyphenated))
+            for row, row_words in zip(batch, words, strict=True)
+        ]
+        model.objects.bulk_update(objs, ["syllables_fi"], batch_size=batch_size)
+        num_populated += len(objs)
+    return num_populated
+
+
 def index_servicenodes(lang):
     """
     Index ServiceNodes which service_reference is null
@@ -116,9 +185,49 @@ class Command(BaseCommand):
             help="Hyphenate all addresses",
         )
 
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Generate the syllables in batches and index the ServiceNodes with"
+            " a single UPDATE, without sending signals. Recommended for full"
+            " reindexing.",
+        )
+
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Number of rows per batch in bulk mode, default {DEFAULT_BATCH_SIZE}",
+        )
+
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Number of hyphenation worker processes in bulk mode, defaults to"
+            " the number of CPUs",
+        )
+
+    def log_step(self, name, func, *args, **kwargs):
+        """
+        Runs func and logs the number of rows it processed and the time it took.
+        """
+        start_time = time.monotonic()
+        num_rows = func(*args, **kwargs)
+        elapsed = time.monotonic() - start_time
+        rate = num_rows / elapsed if elapsed else 0
+        logger.info(f"{name}: {num_rows} rows in {elapsed:.2f}s ({rate:.0f} rows/s)")
+        self.timings[name] = elapsed
+        return num_rows
+
     def handle(self, *args, **options):
         hyphenate_all_addresses = options.get("hyphenate_all_addresses", False)
         hyphenate_addresses_from = options.get("hyphenate_addresses_from", None)
+        bulk = options.get("bulk", False)
+        batch_size = options.get("batch_size", DEFAULT_BATCH_SIZE)
+        processes = options.get("processes", None)
+        self.timings = {}
+        start_time = time.monotonic()
 
         if hyphenate_addresses_from:
             try:
@@ -132,39 +241,73 @@ class Command(BaseCommand):
             # Only generate syllables for the finnish language
             if lang == "fi":
                 logger.info(f"Generating syllables for language: {lang}.")
-                logger.info(f"Syllables generated for {generate_syllables(Unit)} Units")
-                num_populated = generate_syllables(
-                    Address,
-                    hyphenate_all_addresses=hyphenate_all_addresses,
-                    hyphenate_addresses_from=hyphenate_addresses_from,
+                num_deleted, _ = HyphenatedWord.objects.exclude(
+                    dictionary_version=hyphenation_cache.dictionary_version
+                ).delete()
+                if num_deleted:
+                    logger.info(
+                        f"Deleted {num_deleted} hyphenated words of previous"
+                        " Voikko dictionary versions."
+                    )
+                # Only the bulk mode hyphenates in the worker processes.
+                pool_context = (
+                    HyphenationPool(processes=processes) if bulk else nullcontext()
                 )
-                logger.info(f"Syllables generated for {num_populated} Addresses")
-                logger.info(
-                    f"Syllables generated for {generate_syllables(Service)} Services"
+                with pool_context as pool:
+                    for model in [Unit, Address, Service, ServiceNode]:
+                        kwargs = {}
+                        if model == Address:
+                            kwargs = {
+                                "hyphenate_all_addresses": hyphenate_all_addresses,
+                                "hyphenate_addresses_from": hyphenate_addresses_from,
+                            }
+                        if bulk:
+                            self.log_step(
+                                f"{model.__name__} syllables",
+                                generate_syllables_bulk,
+                                model,
+                                batch_size=batch_size,
+                                pool=pool,
+                                **kwargs,
+                            )
+                        else:
+                            self.log_step(
+                                f"{model.__name__} syllables",
+                                generate_syllables,
+                                model,
+                                **kwargs,
+                            )
+
+            for model in [Unit, Service, AdministrativeDivision, Address]:
+                self.log_step(
+                    f"{lang} {model.__name__} search columns",
+                    model.objects.update,
+                    **{key: get_search_column(model, lang)},
                 )
-                logger.info(
-                    f"Syllables generated for"
-                    f" {generate_syllables(ServiceNode)} ServiceNodes"
+            if bulk:
+                self.log_step(
+                    f"{lang} ServiceNode search columns",
+                    ServiceNode.objects.filter(service_reference__isnull=True).update,
+                    **{key: get_search_column(ServiceNode, lang)},
                 )
-
-            logger.info(
-                f"{lang} Units indexed:"
-                f" {Unit.objects.update(**{key: get_search_column(Unit, lang)})}"
-            )
-            logger.info(
-                f"{lang} Services indexed:"
-                f" {Service.objects.update(**{key: get_search_column(Service, lang)})}"
-            )
-            logger.info(f"{lang} ServiceNodes indexed: {index_servicenodes(lang)}")
-            logger.info(
-                "{lang} AdministrativeDivisions indexed: {divisions}".format(
-                    lang=lang,
-                    divisions=AdministrativeDivision.objects.update(
-                        **{key: get_search_column(AdministrativeDivision, lang)}
-                    ),
+            else:
+                self.log_step(
+                    f"{lang} ServiceNode search columns", index_servicenodes, lang
                 )
+
+        start_index_time = time.monotonic()
+        for type_name, num_indexed in rebuild_search_index().items():
+            logger.info(f"{type_name} search_index rows: {num_indexed}")
+        self.timings["search_index"] = time.monotonic() - start_index_time
+        bump_data_version()
+
+        logger.info(
+            f"Indexing search columns took {time.monotonic() - start_time:.2f}s,"
+            " slowest steps: "
+            + ", ".join(
+                f"{name} {elapsed:.2f}s"
+                for name, elapsed in sorted(
+                    self.timings.items(), key=lambda item: item[1], reverse=True
+                )[:3]
             )
-            logger.info(
-                f"{lang} Addresses indexed:"
-                f" {Address.objects.update(**{key: get_search_column(Address, lang)})}"
-            )
+        )
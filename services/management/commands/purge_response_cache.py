@@ -0,0 +1,22 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from services.api_cache import RESPONSE_CACHE_NAMESPACES, invalidate_response_cache
+
+logger = logging.getLogger("services.management")
+
+
+class Command(BaseCommand):
+    help = (
+        "Purges the cached API responses of the given namespaces, or of all the"
+        " namespaces if none is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("namespaces", nargs="*", choices=RESPONSE_CACHE_NAMESPACES)
+
+    def handle(self, *args, **options):
+        namespaces = options["namespaces"] or RESPONSE_CACHE_NAMESPACES
+        invalidate_response_cache(*namespaces)
+        logger.info(f"Purged the cached responses of {', '.join(namespaces)}.")
@@ -8,6 +8,7 @@ from django import db
 from munigeo.importer.sync import ModelSyncher
 from munigeo.models import AdministrativeDivision, AdministrativeDivisionType
 
+from services.api_cache import response_cache_invalidation_queue
 from services.management.commands.services_import.keyword import KeywordHandler
 from services.models import (
     Department,
@@ -303,6 +304,13 @@ def update_node_counts(node_model, node_count_model):
             )
         )
     save_objects(objects_to_save)
+    # The counts are not saved through the node models, whose saves invalidate
+    # the cached responses. The responses are invalidated once the counts are
+    # committed, so that the old counts are not cached again before it.
+    if node_model == MobilityServiceNode:
+        response_cache_invalidation_queue.add("mobility")
+    else:
+        response_cache_invalidation_queue.add("service_node")
     return tree
 
 
@@ -347,6 +355,7 @@ def update_service_counts():
                     division_type=municipality_type,
                 )
                 o.save()
+    response_cache_invalidation_queue.add("service")
 
 
 @db.transaction.atomic
@@ -386,6 +395,7 @@ def update_service_organization_counts():
                     count=count,
                 )
                 o.save()
+    response_cache_invalidation_queue.add("service")
 
 
 @db.transaction.atomic
@@ -9,6 +9,7 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils.translation import activate, get_language
 
+from services.api_cache import invalidate_response_cache
 from services.management.commands.services_import.aliases import import_aliases
 from services.management.commands.services_import.departments import import_departments
 from services.management.commands.services_import.entrances import import_entrances
@@ -26,6 +27,10 @@ from services.management.commands.services_import.services import (
     update_service_root_service_nodes,
 )
 from services.management.commands.services_import.units import import_units
+from services.models import MobilityServiceNode, ServiceNode
+from services.models.unit_node_ancestor import update_unit_node_ancestors
+from services.search.reindex_queue import reindex_queue
+from services.utils import bump_data_version
 
 URL_BASE = "https://www.hel.fi/palvelukarttaws/rest/v4/"
 GK25_SRID = 3879
@@ -44,6 +49,12 @@ class Command(BaseCommand):
         "unit_properties",
     ]
     supported_languages = [lang[0] for lang in settings.LANGUAGES]
+    # The namespaces of the cached responses invalidated by the importers.
+    response_cache_namespaces = {
+        "departments": ("department",),
+        "services": ("service", "service_node"),
+        "units": ("service", "service_node", "mobility"),
+    }
 
     def __init__(self):
         super().__init__()
@@ -148,6 +159,7 @@ class Command(BaseCommand):
     def import_units(self, pk=None):
         if pk is not None:
             import_units(fetch_only_id=pk)
+            self.update_unit_node_ancestors()
             return
         import_units()
         update_service_node_counts()
@@ -156,11 +168,24 @@ class Command(BaseCommand):
         update_service_organization_counts()
         update_mobility_service_nodes()
         update_mobility_service_node_counts()
+        self.update_unit_node_ancestors()
+
+    def update_unit_node_ancestors(
+        self, node_models=(ServiceNode, MobilityServiceNode)
+    ):
+        for node_model in node_models:
+            deleted_count, inserted_count = update_unit_node_ancestors(node_model)
+            self.logger.info(
+                f"Unit {node_model.__name__} ancestors updated, "
+                f"{deleted_count} deleted and {inserted_count} inserted."
+            )
 
     @db.transaction.atomic
     def import_services(self):
         import_services(logger=self.logger, noop=False, importer=self)
         update_service_root_service_nodes()
+        # The moved service nodes change the subtrees the units are in.
+        self.update_unit_node_ancestors([ServiceNode])
 
     def handle(self, **options):
         self.options = options
@@ -178,21 +203,31 @@ class Command(BaseCommand):
         activate(settings.LANGUAGES[0][0])
 
         import_count = 0
-        for imp in self.importer_types:
-            if imp not in self.options["import_types"]:
-                continue
-            method = getattr(self, f"import_{imp}")
-            if self.verbosity:
-                print(f"Importing {imp}...")  # noqa: T201
-            if "id" in options and options.get("id"):
-                method(pk=options["id"])
-            else:
-                method()
-            import_count += 1
+        response_cache_namespaces = set()
+        # Reindex the search columns of the saved objects once at the end.
+        with reindex_queue.deferred():
+            for imp in self.importer_types:
+                if imp not in self.options["import_types"]:
+                    continue
+                method = getattr(self, f"import_{imp}")
+                if self.verbosity:
+                    print(f"Importing {imp}...")  # noqa: T201
+                if "id" in options and options.get("id"):
+                    method(pk=options["id"])
+                else:
+                    method()
+                import_count += 1
+                response_cache_namespaces.update(
+                    self.response_cache_namespaces.get(imp, ())
+                )
 
         # if self.services_changed:
         #     self.update_root_services()
 
         if not import_count:
             sys.stderr.write("Nothing to import.\n")
+        else:
+            bump_data_version()
+        if response_cache_namespaces:
+            invalidate_response_cache(*sorted(response_cache_namespaces))
         activate(old_lang)
@@ -3,6 +3,11 @@ from time import time
 
 from django.core.management.base import BaseCommand
 
+from services.api_cache import invalidate_response_cache
+from services.models import MobilityServiceNode
+from services.models.unit_node_ancestor import update_unit_node_ancestors
+from services.utils import bump_data_version
+
 from .services_import.services import update_mobility_service_nodes
 
 logger = logging.getLogger("services.management")
@@ -13,6 +18,9 @@ class Command(BaseCommand):
         logger.info("Updating mobility service nodes...")
         start_time = time()
         service_node_count = update_mobility_service_nodes()
+        update_unit_node_ancestors(MobilityServiceNode)
+        bump_data_version()
+        invalidate_response_cache("mobility")
         logger.info(
             f"{service_node_count} mobility service nodes updated "
             f"in {time() - start_time:.0f} seconds."
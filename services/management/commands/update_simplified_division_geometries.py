@@ -0,0 +1,28 @@
+import logging
+from time import time
+
+from django.core.management.base import BaseCommand
+
+from services.models.simplified_division_geometry import (
+    update_simplified_division_geometries,
+)
+from services.utils import bump_data_version
+
+logger = logging.getLogger("services.management")
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerates the simplified boundaries of all the administrative divisions,"
+        " e.g. after the divisions have been imported with geo_import."
+    )
+
+    def handle(self, *args, **kwargs):
+        logger.info("Updating simplified division geometries...")
+        start_time = time()
+        deleted_count, updated_count = update_simplified_division_geometries()
+        bump_data_version()
+        logger.info(
+            f"{updated_count} simplified division geometries updated and"
+            f" {deleted_count} deleted in {time() - start_time:.0f} seconds."
+        )
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Replace the UNION based search_view with a real search_index table. The
+    table has its own GIN index per language and is kept up to date by the
+    post_save signals and the index_search_columns management command.
+    """
+
+    dependencies = [
+        ("services", "0121_make_requeststatistic_timeframe_unique"),
+    ]
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE TABLE search_index (
+                id text PRIMARY KEY,
+                name_fi text,
+                name_sv text,
+                name_en text,
+                search_column_fi tsvector,
+                search_column_sv tsvector,
+                search_column_en tsvector,
+                type_name text NOT NULL
+            );
+            CREATE INDEX search_index_search_column_fi_idx ON search_index USING GIN (search_column_fi);
+            CREATE INDEX search_index_search_column_sv_idx ON search_index USING GIN (search_column_sv);
+            CREATE INDEX search_index_search_column_en_idx ON search_index USING GIN (search_column_en);
+            CREATE INDEX search_index_type_name_idx ON search_index (type_name);
+            INSERT INTO search_index SELECT * FROM search_view;
+            DROP VIEW search_view;
+            """,
+            reverse_sql="""
+            CREATE OR REPLACE VIEW search_view as
+            SELECT concat('unit_', services_unit.id) AS id, name_fi, name_sv, name_en, search_column_fi, search_column_sv, search_column_en, 'Unit'::text AS type_name from services_unit where services_unit.is_active = true
+            UNION
+            SELECT concat('service_', id) AS id, name_fi, name_sv, name_en, search_column_fi, search_column_sv, search_column_en, 'Service'::text AS type_name from services_service
+            UNION
+            SELECT concat('servicenode_', string_agg(id::text, '_')) AS ids, name_fi, name_sv, name_en, search_column_fi, search_column_sv, search_column_en, 'ServiceNode'::text AS type_name from services_servicenode group by 2,3,4,5,6,7,8
+            UNION
+            SELECT concat('administrativedivision_', id) AS id,  name_fi, name_sv, name_en, search_column_fi, search_column_sv, search_column_en, 'AdministrativeDivision'::text AS type_name from munigeo_administrativedivision
+            UNION
+            SELECT concat('address_', id) AS id,  full_name_fi as name_fi, full_name_sv as name_sv, full_name_en as name_en, search_column_fi, search_column_sv, search_column_en, 'Address'::text AS type_name from munigeo_address;
+            DROP TABLE search_index;
+            """,
+        ),
+    ]
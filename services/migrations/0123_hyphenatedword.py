@@ -0,0 +1,47 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0122_create_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HyphenatedWord",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("word", models.CharField(max_length=255, verbose_name="Word")),
+                (
+                    "dictionary_version",
+                    models.CharField(max_length=255, verbose_name="Dictionary version"),
+                ),
+                (
+                    "syllables",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.TextField(), default=list, size=None
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Hyphenated word",
+                "verbose_name_plural": "Hyphenated words",
+                "ordering": ["-id"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dictionary_version", "word"),
+                        name="unique_hyphenated_word_per_dictionary_version",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Add trigram indexes for the names used by the trigram fallback of the
+    search, which were not indexed by 0092_add_trigram_indexes. The GIN
+    indexes serve the % similarity filter, not the ordering by the <->
+    distance, which only GiST indexes could serve.
+    """
+
+    dependencies = [
+        ("services", "0123_hyphenatedword"),
+    ]
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE INDEX IF NOT EXISTS address_full_name_fi_trgm_idx ON munigeo_address USING GIN (full_name_fi gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS address_full_name_sv_trgm_idx ON munigeo_address USING GIN (full_name_sv gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS address_full_name_en_trgm_idx ON munigeo_address USING GIN (full_name_en gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS administrativedivision_name_fi_trgm_idx ON munigeo_administrativedivision USING GIN (name_fi gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS administrativedivision_name_sv_trgm_idx ON munigeo_administrativedivision USING GIN (name_sv gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS administrativedivision_name_en_trgm_idx ON munigeo_administrativedivision USING GIN (name_en gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS servicenode_name_fi_trgm_idx ON services_servicenode USING GIN (name_fi gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS servicenode_name_sv_trgm_idx ON services_servicenode USING GIN (name_sv gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS servicenode_name_en_trgm_idx ON services_servicenode USING GIN (name_en gin_trgm_ops);
+            """,
+            reverse_sql="""
+            DROP INDEX IF EXISTS address_full_name_fi_trgm_idx;
+            DROP INDEX IF EXISTS address_full_name_sv_trgm_idx;
+            DROP INDEX IF EXISTS address_full_name_en_trgm_idx;
+            DROP INDEX IF EXISTS administrativedivision_name_fi_trgm_idx;
+            DROP INDEX IF EXISTS administrativedivision_name_sv_trgm_idx;
+            DROP INDEX IF EXISTS administrativedivision_name_en_trgm_idx;
+            DROP INDEX IF EXISTS servicenode_name_fi_trgm_idx;
+            DROP INDEX IF EXISTS servicenode_name_sv_trgm_idx;
+            DROP INDEX IF EXISTS servicenode_name_en_trgm_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,119 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+POPULATE_ANCESTORS = """
+    INSERT INTO {table} (unit_id, {ancestor_column})
+    SELECT DISTINCT unit_node.unit_id, ancestor.id
+    FROM {unit_nodes} AS unit_node
+    JOIN {node} AS node ON node.id = unit_node.{node_column}
+    JOIN {node} AS ancestor
+        ON ancestor.tree_id = node.tree_id
+        AND node.lft BETWEEN ancestor.lft AND ancestor.rght
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0124_add_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UnitServiceNodeAncestor",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "service_node",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="services.servicenode",
+                    ),
+                ),
+                (
+                    "unit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="service_node_ancestors",
+                        to="services.unit",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("service_node", "unit"),
+                        name="unique_unit_service_node_ancestor",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="UnitMobilityServiceNodeAncestor",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "mobility_service_node",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="services.mobilityservicenode",
+                    ),
+                ),
+                (
+                    "unit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mobility_service_node_ancestors",
+                        to="services.unit",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("mobility_service_node", "unit"),
+                        name="unique_unit_mobility_service_node_ancestor",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            POPULATE_ANCESTORS.format(
+                table="services_unitservicenodeancestor",
+                ancestor_column="service_node_id",
+                unit_nodes="services_unit_service_nodes",
+                node_column="servicenode_id",
+                node="services_servicenode",
+            ),
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            POPULATE_ANCESTORS.format(
+                table="services_unitmobilityservicenodeancestor",
+                ancestor_column="mobility_service_node_id",
+                unit_nodes="services_unit_mobility_service_nodes",
+                node_column="mobilityservicenode_id",
+                node="services_mobilityservicenode",
+            ),
+            migrations.RunSQL.noop,
+        ),
+    ]
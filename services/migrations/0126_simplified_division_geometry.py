@@ -0,0 +1,51 @@
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+POPULATE_SIMPLIFIED_GEOMETRIES = """
+    INSERT INTO services_simplifieddivisiongeometry
+        (division_id, boundary_10, boundary_50, boundary_250)
+    SELECT division_id,
+        ST_Multi(ST_SimplifyPreserveTopology(boundary, 10)),
+        ST_Multi(ST_SimplifyPreserveTopology(boundary, 50)),
+        ST_Multi(ST_SimplifyPreserveTopology(boundary, 250))
+    FROM munigeo_administrativedivisiongeometry
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("munigeo", "0014_increase_origin_id_length"),
+        ("services", "0125_unit_node_ancestors"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimplifiedDivisionGeometry",
+            fields=[
+                (
+                    "division",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="simplified_geometry",
+                        serialize=False,
+                        to="munigeo.administrativedivision",
+                    ),
+                ),
+                (
+                    "boundary_10",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(srid=3067),
+                ),
+                (
+                    "boundary_50",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(srid=3067),
+                ),
+                (
+                    "boundary_250",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(srid=3067),
+                ),
+            ],
+        ),
+        migrations.RunSQL(POPULATE_SIMPLIFIED_GEOMETRIES, migrations.RunSQL.noop),
+    ]
@@ -4,10 +4,11 @@ from .feedback import FeedbackMapping
 from .keyword import Keyword
 from .mobility import MobilityServiceNode
 from .notification import Announcement, ErrorMessage
-from .search_rule import ExclusionRule, ExclusionWord
+from .search_rule import ExclusionRule, ExclusionWord, HyphenatedWord
 from .service import Service, UnitServiceDetails
 from .service_mapping import ServiceMapping
 from .service_node import ServiceNode
+from .simplified_division_geometry import SimplifiedDivisionGeometry
 from .statistic import RequestStatistic
 from .unit import Unit
 from .unit_accessibility_property import UnitAccessibilityProperty
@@ -22,6 +23,10 @@ from .unit_count import (
 )
 from .unit_entrance import UnitEntrance
 from .unit_identifier import UnitIdentifier
+from .unit_node_ancestor import (
+    UnitMobilityServiceNodeAncestor,
+    UnitServiceNodeAncestor,
+)
 
 __all__ = [
     "AccessibilityVariable",
@@ -33,10 +38,12 @@ __all__ = [
     "ErrorMessage",
     "ExclusionRule",
     "ExclusionWord",
+    "HyphenatedWord",
     "Service",
     "UnitServiceDetails",
     "ServiceMapping",
     "ServiceNode",
+    "SimplifiedDivisionGeometry",
     "RequestStatistic",
     "Unit",
     "UnitAccessibilityProperty",
@@ -49,4 +56,6 @@ __all__ = [
     "ServiceUnitCount",
     "UnitEntrance",
     "UnitIdentifier",
+    "UnitMobilityServiceNodeAncestor",
+    "UnitServiceNodeAncestor",
 ]
@@ -1,18 +1,110 @@
-from django.db.models import Max, Q, QuerySet
+import threading
+import time
+
+from django.db.models import Exists, Model, OuterRef, QuerySet
 from mptt.models import TreeManager
 
+from services.utils.data_version import get_data_version
+
+# Seconds a tree snapshot is used at most, bounds the staleness when the data
+# version is not shared between the processes, e.g. with the locmem cache.
+TREE_SNAPSHOT_MAX_AGE = 300
+
+
+class TreeSnapshot:
+    """
+    In-process snapshot of the tree ids and the parents of all the nodes of a
+    tree model.
+    """
+
+    def __init__(self, model):
+        rows = model.objects.values_list(
+            "id", "tree_id", "lft", model._mptt_meta.parent_attr
+        )
+        self.model = model
+        self.tree_ids = {}
+        self.parent_ids = {}
+        # The ids of the root nodes by the tree ids.
+        self.root_ids = {}
+        for id, tree_id, lft, parent_id in rows:
+            self.tree_ids[id] = tree_id
+            self.parent_ids[id] = parent_id
+            if lft == 1:
+                self.root_ids[tree_id] = id
+        self._roots = None
+        self.data_version = get_data_version()
+        self.created_at = time.monotonic()
+
+    def is_stale(self):
+        return (
+            time.monotonic() - self.created_at > TREE_SNAPSHOT_MAX_AGE
+            or self.data_version != get_data_version()
+        )
+
+    def get_root_id(self, node_id):
+        """
+        Returns the id of the root of the tree of the node, or None if the node
+        is unknown.
+        """
+        tree_id = self.tree_ids.get(int(node_id))
+        if tree_id is None:
+            return None
+        return self.root_ids.get(tree_id)
+
+    def get_ancestor_ids(self, node_id):
+        """
+        Returns the ids of the ancestors of the node from the parent to the
+        root, like get_ancestors(ascending=True), or None if the node is
+        unknown.
+        """
+        node_id = int(node_id)
+        if node_id not in self.parent_ids:
+            return None
+        ancestor_ids = []
+        parent_id = self.parent_ids[node_id]
+        while parent_id is not None:
+            ancestor_ids.append(parent_id)
+            parent_id = self.parent_ids.get(parent_id)
+        return ancestor_ids
+
+    def get_roots(self):
+        """
+        Returns the root nodes by the tree ids. The nodes are loaded with a
+        single query when first needed.
+        """
+        if self._roots is None:
+            roots = self.model.objects.filter(pk__in=self.root_ids.values())
+            self._roots = {root.tree_id: root for root in roots}
+        return self._roots
+
+
+_tree_snapshots = {}
+_tree_snapshots_lock = threading.Lock()
+
+
+def get_tree_snapshot(model):
+    """
+    Returns the snapshot of the tree model, creating it if it does not exist
+    or if the data version has changed since it was created.
+    """
+    snapshot = _tree_snapshots.get(model)
+    if snapshot is None or snapshot.is_stale():
+        with _tree_snapshots_lock:
+            snapshot = _tree_snapshots.get(model)
+            if snapshot is None or snapshot.is_stale():
+                snapshot = TreeSnapshot(model)
+                _tree_snapshots[model] = snapshot
+    return snapshot
+
+
+def clear_tree_snapshot(model):
+    _tree_snapshots.pop(model, None)
+
 
 class CustomTreeManager(TreeManager):
     def get_queryset(self):
         return TreeQuerySet(self.model, using=self._db)
 
-    def determine_max_level(self):
-        max_level = self.all().aggregate(max_level=Max("level"))["max_level"]
-        if max_level is None:
-            # Harrison-Stetson method
-            return 10
-        return max_level
-
 
 class TreeQuerySet(QuerySet):
     def by_ancestor(self, ancestor):
@@ -20,14 +112,18 @@ class TreeQuerySet(QuerySet):
 
     def by_ancestors(self, ancestors):
         """Descendants of any of `ancestors`, resolved in a single query."""
-        ancestors = list(ancestors)
-        if not ancestors:
+        ancestor_ids = [
+            ancestor.pk if isinstance(ancestor, Model) else ancestor
+            for ancestor in ancestors
+        ]
+        if not ancestor_ids:
             return self.none()
-        manager = self.model.objects
-        max_level = manager.determine_max_level()
-        qs = Q()
-        # Construct an OR'd queryset for each level of parenthood.
-        for i in range(max_level):
-            key = "__".join(["parent"] * (i + 1)) + "__in"
-            qs |= Q(**{key: ancestors})
-        return self.filter(qs)
+        # A node is a descendant of the nodes of the same tree whose
+        # (lft, rght) interval contains its own.
+        matching_ancestors = self.model._default_manager.filter(
+            pk__in=ancestor_ids,
+            tree_id=OuterRef("tree_id"),
+            lft__lt=OuterRef("lft"),
+            rght__gt=OuterRef("rght"),
+        )
+        return self.filter(Exists(matching_ancestors))
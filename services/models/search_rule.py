@@ -1,3 +1,4 @@
+from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -26,3 +27,30 @@ class ExclusionWord(models.Model):
 
     def __str__(self):
         return self.word
+
+
+class HyphenatedWord(models.Model):
+    """
+    Syllables of a word hyphenated with the given version of the Voikko
+    dictionary. Used as a persistent cache of the hyphenation.
+    """
+
+    word = models.CharField(max_length=255, verbose_name=_("Word"))
+    dictionary_version = models.CharField(
+        max_length=255, verbose_name=_("Dictionary version")
+    )
+    syllables = ArrayField(models.TextField(), default=list)
+
+    class Meta:
+        ordering = ["-id"]
+        verbose_name = _("Hyphenated word")
+        verbose_name_plural = _("Hyphenated words")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dictionary_version", "word"],
+                name="unique_hyphenated_word_per_dictionary_version",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.word} : {'-'.join(self.syllables)}"
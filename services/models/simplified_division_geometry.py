@@ -0,0 +1,114 @@
+from django.contrib.gis.db import models
+from django.db import connection, transaction
+from munigeo.models import AdministrativeDivision, AdministrativeDivisionGeometry
+from psycopg import sql
+
+from .unit import PROJECTION_SRID
+
+# The tolerances, in meters, the boundaries are simplified with, by the
+# fields storing them.
+SIMPLIFIED_BOUNDARY_TOLERANCES = {
+    "boundary_10": 10,
+    "boundary_50": 50,
+    "boundary_250": 250,
+}
+
+# Meters per pixel of the zoom level 0 Web Mercator tiles at the latitude
+# of 60 degrees.
+ZOOM_0_PIXEL_SIZE = 78271.5
+
+
+class SimplifiedDivisionGeometry(models.Model):
+    """
+    Boundaries of an administrative division simplified with the tolerances
+    of SIMPLIFIED_BOUNDARY_TOLERANCES, stored alongside the full resolution
+    AdministrativeDivisionGeometry. Refreshed with the
+    update_simplified_division_geometries command after the imports changing
+    the geometries.
+    """
+
+    division = models.OneToOneField(
+        AdministrativeDivision,
+        primary_key=True,
+        related_name="simplified_geometry",
+        on_delete=models.CASCADE,
+    )
+    boundary_10 = models.MultiPolygonField(srid=PROJECTION_SRID)
+    boundary_50 = models.MultiPolygonField(srid=PROJECTION_SRID)
+    boundary_250 = models.MultiPolygonField(srid=PROJECTION_SRID)
+
+
+def get_simplified_boundary_field(tolerance):
+    """
+    Returns the field of the boundary simplified with the largest tolerance
+    not exceeding `tolerance`, or None if there is no such field.
+    """
+    field_name = None
+    # The tolerances are in ascending order.
+    for name, field_tolerance in SIMPLIFIED_BOUNDARY_TOLERANCES.items():
+        if field_tolerance <= tolerance:
+            field_name = name
+    return field_name
+
+
+def get_zoom_tolerance(zoom):
+    """
+    Returns the simplification tolerance, a pixel, of the map zoom level.
+    """
+    return ZOOM_0_PIXEL_SIZE / 2**zoom
+
+
+@transaction.atomic
+def update_simplified_division_geometries(division_ids=None):
+    """
+    Refreshes the simplified boundaries of the administrative divisions, only
+    of the given divisions if division_ids is given. Returns the numbers of
+    deleted and updated rows.
+    """
+    params = []
+    geometry_filter = delete_filter = sql.SQL("")
+    if division_ids is not None:
+        params = [list(division_ids)]
+        geometry_filter = sql.SQL("WHERE division_geometry.division_id = ANY(%s)")
+        delete_filter = sql.SQL("AND simplified.division_id = ANY(%s)")
+    identifiers = {
+        "table": sql.Identifier(SimplifiedDivisionGeometry._meta.db_table),
+        "geometry_table": sql.Identifier(AdministrativeDivisionGeometry._meta.db_table),
+        "columns": sql.SQL(", ").join(
+            sql.Identifier(name) for name in SIMPLIFIED_BOUNDARY_TOLERANCES
+        ),
+        "simplified_boundaries": sql.SQL(", ").join(
+            sql.SQL(
+                "ST_Multi(ST_SimplifyPreserveTopology(division_geometry.boundary, {}))"
+            ).format(sql.Literal(tolerance))
+            for tolerance in SIMPLIFIED_BOUNDARY_TOLERANCES.values()
+        ),
+        "updates": sql.SQL(", ").join(
+            sql.SQL("{name} = EXCLUDED.{name}").format(name=sql.Identifier(name))
+            for name in SIMPLIFIED_BOUNDARY_TOLERANCES
+        ),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("""
+                DELETE FROM {table} AS simplified
+                WHERE NOT EXISTS (
+                    SELECT FROM {geometry_table} AS division_geometry
+                    WHERE division_geometry.division_id = simplified.division_id
+                ) {delete_filter}
+            """).format(delete_filter=delete_filter, **identifiers),
+            params,
+        )
+        deleted_count = cursor.rowcount
+        cursor.execute(
+            sql.SQL("""
+                INSERT INTO {table} (division_id, {columns})
+                SELECT division_geometry.division_id, {simplified_boundaries}
+                FROM {geometry_table} AS division_geometry
+                {geometry_filter}
+                ON CONFLICT (division_id) DO UPDATE SET {updates}
+            """).format(geometry_filter=geometry_filter, **identifiers),
+            params,
+        )
+        updated_count = cursor.rowcount
+    return deleted_count, updated_count
@@ -0,0 +1,124 @@
+from django.db import connection, models, transaction
+from psycopg import sql
+
+from .mobility import MobilityServiceNode
+from .service_node import ServiceNode
+from .unit import Unit
+
+
+class UnitServiceNodeAncestor(models.Model):
+    """
+    Denormalized membership of the units in the service node subtrees, a row
+    for each service node of a unit and each of their ancestors. Refreshed
+    with update_unit_node_ancestors() after the units have been imported.
+    """
+
+    unit = models.ForeignKey(
+        Unit, related_name="service_node_ancestors", on_delete=models.CASCADE
+    )
+    service_node = models.ForeignKey(
+        ServiceNode, db_index=False, related_name="+", on_delete=models.CASCADE
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["service_node", "unit"],
+                name="unique_unit_service_node_ancestor",
+            )
+        ]
+
+
+class UnitMobilityServiceNodeAncestor(models.Model):
+    """
+    Denormalized membership of the units in the mobility service node
+    subtrees, see UnitServiceNodeAncestor.
+    """
+
+    unit = models.ForeignKey(
+        Unit, related_name="mobility_service_node_ancestors", on_delete=models.CASCADE
+    )
+    mobility_service_node = models.ForeignKey(
+        MobilityServiceNode,
+        db_index=False,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["mobility_service_node", "unit"],
+                name="unique_unit_mobility_service_node_ancestor",
+            )
+        ]
+
+
+@transaction.atomic
+def update_unit_node_ancestors(node_model, unit_ids=None):
+    """
+    Refreshes the membership of the units in the subtrees of the service nodes
+    or the mobility service nodes, only of the given units if unit_ids is
+    given. Only the changed rows are deleted and inserted. Returns the numbers
+    of deleted and inserted rows.
+    """
+    if node_model == MobilityServiceNode:
+        ancestor_model = UnitMobilityServiceNodeAncestor
+        unit_nodes_field = Unit.mobility_service_nodes.field
+        ancestor_column = "mobility_service_node_id"
+    else:
+        ancestor_model = UnitServiceNodeAncestor
+        unit_nodes_field = Unit.service_nodes.field
+        ancestor_column = "service_node_id"
+    params = []
+    membership_filter = delete_filter = sql.SQL("")
+    if unit_ids is not None:
+        params = [list(unit_ids)]
+        membership_filter = sql.SQL("WHERE unit_node.{unit_column} = ANY(%s)")
+        delete_filter = sql.SQL("AND unit_ancestor.unit_id = ANY(%s)")
+    # The service nodes of the units and all their ancestors.
+    membership = sql.SQL("""
+        SELECT unit_node.{unit_column} AS unit_id, ancestor.id AS node_id
+        FROM {unit_nodes} AS unit_node
+        JOIN {node} AS node ON node.id = unit_node.{node_column}
+        JOIN {node} AS ancestor
+            ON ancestor.tree_id = node.tree_id
+            AND node.lft BETWEEN ancestor.lft AND ancestor.rght
+        {membership_filter}
+    """)
+    identifiers = {
+        "table": sql.Identifier(ancestor_model._meta.db_table),
+        "ancestor_column": sql.Identifier(ancestor_column),
+        "unit_nodes": sql.Identifier(unit_nodes_field.m2m_db_table()),
+        "unit_column": sql.Identifier(unit_nodes_field.m2m_column_name()),
+        "node_column": sql.Identifier(unit_nodes_field.m2m_reverse_name()),
+        "node": sql.Identifier(node_model._meta.db_table),
+    }
+    membership = membership.format(
+        membership_filter=membership_filter.format(**identifiers), **identifiers
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("""
+                DELETE FROM {table} AS unit_ancestor
+                WHERE NOT EXISTS (
+                    SELECT FROM ({membership}) AS membership
+                    WHERE membership.unit_id = unit_ancestor.unit_id
+                        AND membership.node_id = unit_ancestor.{ancestor_column}
+                ) {delete_filter}
+            """).format(
+                membership=membership, delete_filter=delete_filter, **identifiers
+            ),
+            params * 2,
+        )
+        deleted_count = cursor.rowcount
+        cursor.execute(
+            sql.SQL("""
+                INSERT INTO {table} (unit_id, {ancestor_column})
+                SELECT DISTINCT unit_id, node_id FROM ({membership}) AS membership
+                ON CONFLICT DO NOTHING
+            """).format(membership=membership, **identifiers),
+            params,
+        )
+        inserted_count = cursor.rowcount
+    return deleted_count, inserted_count
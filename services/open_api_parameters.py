@@ -52,6 +52,16 @@ DATE_PARAMETER = (
     ),
 )
 
+COUNT_PARAMETER = OpenApiParameter(
+    name="count",
+    location=OpenApiParameter.QUERY,
+    description="If false, the objects are not counted and the count of the page"
+    " numbered list is null. If 'estimate', the count of a large list is the"
+    " estimate of the database.",
+    required=False,
+    type=str,
+)
+
 DISTANCE_PARAMETER = OpenApiParameter(
     name="distance",
     location=OpenApiParameter.QUERY,
@@ -79,6 +89,43 @@ GEOMETRY_PARAMETER = OpenApiParameter(
     type=bool,
 )
 
+GEOMETRY_PRECISION_PARAMETER = OpenApiParameter(
+    name="geometry_precision",
+    location=OpenApiParameter.QUERY,
+    description="Maximum number of decimal digits of the geometry coordinates. If"
+    " given the geometry is converted to GeoJSON by the database.",
+    required=False,
+    type=int,
+)
+
+GEOMETRY_TOLERANCE_PARAMETER = OpenApiParameter(
+    name="geometry_tolerance",
+    location=OpenApiParameter.QUERY,
+    description="Simplify the geometry with the given tolerance in meters, preserving"
+    " its topology. If given the geometry is converted to GeoJSON by the database.",
+    required=False,
+    type=float,
+)
+
+SIMPLIFY_PARAMETER = OpenApiParameter(
+    name="simplify",
+    location=OpenApiParameter.QUERY,
+    description="Display the boundary precomputed with the largest simplification"
+    " tolerance not exceeding the given one in meters. The tolerances are 10, 50 and"
+    " 250 meters.",
+    required=False,
+    type=float,
+)
+
+ZOOM_PARAMETER = OpenApiParameter(
+    name="zoom",
+    location=OpenApiParameter.QUERY,
+    description="Display the boundary precomputed with the largest simplification"
+    " tolerance not exceeding a pixel of the given map zoom level.",
+    required=False,
+    type=int,
+)
+
 ID_PARAMETER = OpenApiParameter(
     name="id",
     location=OpenApiParameter.QUERY,
@@ -177,6 +224,17 @@ ORIGIN_ID_PARAMETER = OpenApiParameter(
     type=str,
 )
 
+PAGINATION_PARAMETER = OpenApiParameter(
+    name="pagination",
+    location=OpenApiParameter.QUERY,
+    description="'page' for the default page numbers or 'cursor' for cursor"
+    " pagination, ordered by the ID or by the distance if given. The cursor"
+    " paginated list is not counted.",
+    required=False,
+    type=str,
+    enum=["page", "cursor"],
+)
+
 PROVIDER_TYPE_NOT_PARAMETER = OpenApiParameter(
     name="provider_type__not",
     location=OpenApiParameter.QUERY,
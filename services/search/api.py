@@ -8,22 +8,26 @@ for every language of type SearchVector. These are also defined as a Gindex.
   get_search_column_indexing where the name, configuration(language) and weight of the
   columns that will be indexed are defined. This function is used by the indexing script
   and signals when the search_column is populated.
-- A view called search_view is created. It contains the search_columns of the models
-and a couple auxiliary columns: id. type_name and name. This view is created by a
-raw SQL migration 008X_create_search_view.py.
-- The search if performed by querying the views search_columns.
+- A table called search_index contains the search_columns of the models
+and a couple auxiliary columns: id. type_name and name. The table has its own GIN
+indexes per language and is created by the raw SQL migration
+0122_create_search_index.py. It is maintained by services/search/index.py.
+- The search if performed by querying the search_index tables search_columns.
 - For models included in the search a post_save signal is connected and the
-  search_column is updated when they are saved.
-- The search_columns can be manually updated with  the index_search_columns
-and emptied with the empty_search_columns management script.
+  search_column and the search_index row are updated when they are saved.
+- The search_columns and the search_index can be manually updated with the
+index_search_columns and emptied with the empty_search_columns management script.
+- The responses are cached by the normalized query parameters and the data
+version, which is bumped when the search columns are updated, see cache.py.
 """
 
 import logging
 import re
-from itertools import chain
 
+from django.conf import settings
 from django.contrib.gis.gdal import SpatialReference
 from django.contrib.gis.geos import GEOSGeometry
+from django.core.cache import cache
 from django.db import connection, reset_queries
 from django.db.models import Count
 from drf_spectacular.utils import OpenApiParameter, extend_schema
@@ -41,6 +45,7 @@ from services.api import (
     UnitConnectionSerializer,
     UnitSerializer,
 )
+from services.api_conditional import ConditionalGetMixin
 from services.models import (
     Department,
     ExclusionRule,
@@ -50,7 +55,17 @@ from services.models import (
     UnitAccessibilityShortcomings,
 )
 from services.utils import strtobool
+from services.utils.geometry import (
+    annotate_transformed_geometries,
+    geometry_to_json,
+    get_geometry,
+)
 
+from .cache import (
+    get_search_cache_key,
+    is_search_cache_enabled,
+    record_search_cache_access,
+)
 from .constants import (
     DEFAULT_MODEL_LIMIT_VALUE,
     DEFAULT_RANK_THRESHOLD,
@@ -59,12 +74,18 @@ from .constants import (
     DEFAULT_TRIGRAM_THRESHOLD,
     LANGUAGES,
     QUERY_PARAM_TYPE_NAMES,
+    SEARCHABLE_MODEL_TYPE_NAMES,
 )
 from .utils import (
+    NaturalSort,
+    QuerySetChain,
     get_all_ids_from_sql_results,
     get_preserved_order,
+    get_root_service_nodes,
     get_service_node_results,
+    get_service_node_unit_counts,
     get_trigram_results,
+    get_unit_geometry_fields,
     has_exclusion_word_in_query,
     set_address_fields,
     set_service_node_unit_count,
@@ -102,7 +123,7 @@ class SearchSerializer(serializers.Serializer):
             raise ParseError(f"Entity unit does not contain a {include_field} field.")
         value = getattr(obj, include_field, None)
         if isinstance(value, GEOSGeometry):
-            value = munigeo_api.geom_to_json(value, DEFAULT_SRS)
+            value = geometry_to_json(value, DEFAULT_SRS)
         representation[include_field] = value
 
     def _handle_unit_include_field(self, obj, include_field, representation):
@@ -115,20 +136,14 @@ class SearchSerializer(serializers.Serializer):
         elif "municipality" in include_field:
             representation["municipality"] = obj.municipality.id
         elif "geometry_3d" in include_field:
-            if obj.geometry_3d:
-                representation["geometry_3d"] = munigeo_api.geom_to_json(
-                    obj.geometry_3d, DEFAULT_SRS
-                )
+            if geom := get_geometry(obj, "geometry_3d"):
+                representation["geometry_3d"] = geometry_to_json(geom, DEFAULT_SRS)
         elif "geometry" in include_field:
-            if obj.geometry:
-                representation["geometry"] = munigeo_api.geom_to_json(
-                    obj.geometry, DEFAULT_SRS
-                )
+            if geom := get_geometry(obj, "geometry"):
+                representation["geometry"] = geometry_to_json(geom, DEFAULT_SRS)
         elif "location" in include_field:
-            if obj.location:
-                representation["location"] = munigeo_api.geom_to_json(
-                    obj.location, DEFAULT_SRS
-                )
+            if geom := get_geometry(obj, "location"):
+                representation["location"] = geometry_to_json(geom, DEFAULT_SRS)
         else:
             self._serialize_generic_field(obj, include_field, representation)
 
@@ -151,8 +166,18 @@ class SearchSerializer(serializers.Serializer):
         if object_type == "servicenode":
             ids = self.context["service_node_ids"][str(obj.id)]
             representation["ids"] = ids
-            set_service_node_unit_count(ids, representation)
-            root_service_node = ServiceNode.get_root_service_node(obj)
+            # The unit counts and root service nodes are precomputed for all the
+            # results by the view, fall back to computing them one by one.
+            unit_counts = self.context.get("service_node_unit_counts", {})
+            if str(obj.id) in unit_counts:
+                representation["unit_count"] = unit_counts[str(obj.id)]
+            else:
+                set_service_node_unit_count(ids, representation)
+            root_service_nodes = self.context.get("root_service_nodes", {})
+            if obj.id in root_service_nodes:
+                root_service_node = root_service_nodes[obj.id]
+            else:
+                root_service_node = ServiceNode.get_root_service_node(obj)
             representation["root_service_node"] = RootServiceNodeSerializer(
                 root_service_node
             ).data
@@ -206,22 +231,18 @@ class SearchSerializer(serializers.Serializer):
             ).data
 
         if self.context["geometry"]:
-            if getattr(obj, "geometry", None) is not None:
-                if isinstance(obj, AdministrativeDivision):
-                    geometry = obj.geometry.boundary
-                else:
-                    geometry = obj.geometry
-                representation["geometry"] = munigeo_api.geom_to_json(
-                    geometry, DEFAULT_SRS
-                )
+            if isinstance(obj, AdministrativeDivision):
+                geometry = get_geometry(obj, "geometry__boundary")
+            else:
+                geometry = get_geometry(obj, "geometry")
+            if geometry is not None:
+                representation["geometry"] = geometry_to_json(geometry, DEFAULT_SRS)
             else:
                 representation["geometry"] = None
 
         if object_type == "unit" or object_type == "address":
-            if obj.location:
-                representation["location"] = munigeo_api.geom_to_json(
-                    obj.location, DEFAULT_SRS
-                )
+            if geom := get_geometry(obj, "location"):
+                representation["location"] = geometry_to_json(geom, DEFAULT_SRS)
 
         for include in self.context["include"]:
             try:
@@ -454,10 +475,28 @@ def build_search_query(query: str):
     description="Search for units, services, service nodes, addresses and"
     " administrative divisions.",
 )
-class SearchViewSet(GenericAPIView):
+class SearchViewSet(ConditionalGetMixin, GenericAPIView):
     queryset = Unit.objects.all()
 
     def get(self, request):
+        if not is_search_cache_enabled():
+            return self.search(request)
+        cache_key = get_search_cache_key(request)
+        data = cache.get(cache_key)
+        record_search_cache_access(hit=data is not None)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        response = self.search(request)
+        if response.status_code == status.HTTP_200_OK:
+            # The results are a ReturnList referring to the serializer, cache
+            # them as a plain list.
+            data = dict(response.data, results=list(response.data["results"]))
+            cache.set(cache_key, data, settings.SEARCH_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def search(self, request):
         model_limits = {}
         show_only_address = False
         units_order_list = []
@@ -595,6 +634,12 @@ class SearchViewSet(GenericAPIView):
                 search_fn = "websearch_to_tsquery"
                 search_query_str += f" {exclusions}"
 
+        # Only the requested types are searched.
+        type_names = [
+            type_name
+            for type_name in SEARCHABLE_MODEL_TYPE_NAMES
+            if type_name.lower() in types
+        ]
         # This is ~100 times faster than using Django's SearchRank and allows searching
         # using wildcard "|*" and by ranking gives better results, e.g. extra fields
         # weight is counted.
@@ -603,9 +648,10 @@ class SearchViewSet(GenericAPIView):
                 SELECT * FROM (
                     SELECT id, type_name, {name_col},
                         ts_rank_cd({search_col}, search_query)
-                    AS rank FROM search_view,
+                    AS rank FROM search_index,
                         {search_fn}({config_lang}, %s) search_query
                     WHERE search_query @@ {search_col_where}
+                        AND type_name = ANY(%s)
                     ORDER BY rank DESC LIMIT %s
                 ) AS sub_query WHERE sub_query.rank >= %s
             """).format(
@@ -615,15 +661,21 @@ class SearchViewSet(GenericAPIView):
                 search_fn=sql.Identifier(search_fn),
                 config_lang=sql.Literal(config_language),
             )
-            query_params = [search_query_str, sql_query_limit, rank_threshold]
+            query_params = [
+                search_query_str,
+                type_names,
+                sql_query_limit,
+                rank_threshold,
+            ]
         else:
             query = sql.SQL("""
                 SELECT * FROM (
                     SELECT id, type_name, {name_col},
                         ts_rank_cd({search_col}, search_query)
-                    AS rank FROM search_view,
+                    AS rank FROM search_index,
                         {search_fn}({config_lang}, %s) search_query
                     WHERE search_query @@ {search_col_where}
+                        AND type_name = ANY(%s)
                     ORDER BY rank DESC
                 ) AS sub_query WHERE sub_query.rank >= %s
             """).format(
@@ -633,7 +685,7 @@ class SearchViewSet(GenericAPIView):
                 search_fn=sql.Identifier(search_fn),
                 config_lang=sql.Literal(config_language),
             )
-            query_params = [search_query_str, rank_threshold]
+            query_params = [search_query_str, type_names, rank_threshold]
 
         cursor = connection.cursor()
         try:
@@ -653,9 +705,8 @@ class SearchViewSet(GenericAPIView):
         address_ids = all_ids["Address"]
 
         if "service" in types:
-            preserved = get_preserved_order(service_ids)
-            services_qs = Service.objects.filter(id__in=service_ids).order_by(preserved)
-            if not services_qs and "service" in use_trigram:
+            services_qs = Service.objects.filter(id__in=service_ids)
+            if not (service_ids and services_qs.exists()) and "service" in use_trigram:
                 services_qs = get_trigram_results(
                     Service,
                     "services_service",
@@ -663,21 +714,16 @@ class SearchViewSet(GenericAPIView):
                     q_val,
                     threshold=trigram_threshold,
                 )
-
-            services_qs = services_qs.annotate(num_units=Count("units")).order_by(
-                "-num_units"
-            )
-            # order_by() call makes duplicate rows appear distinct. This is solved by
-            # fetching the ids and filtering a new queryset using them
-            ids = list(services_qs.values_list("id", flat=True))
-            # remove duplicates from list
-            ids = list(dict.fromkeys(ids))
-            preserved = get_preserved_order(ids)
-            services_qs = Service.objects.filter(id__in=ids).order_by(preserved)
-            services_qs = services_qs.prefetch_related(
-                "unit_counts", "unit_count_organizations"
+                service_ids = list(services_qs.values_list("id", flat=True))
+
+            # Order by the number of units, services with as many units are
+            # ordered by rank.
+            services_qs = (
+                services_qs.annotate(num_units=Count("units"))
+                .order_by("-num_units", get_preserved_order(service_ids))
+                .prefetch_related("unit_counts", "unit_count_organizations")
+                .select_related("root_service_node")
             )
-            services_qs = services_qs.select_related("root_service_node")
             services_qs = services_qs[: model_limits["service"]]
         else:
             services_qs = Service.objects.none()
@@ -686,12 +732,14 @@ class SearchViewSet(GenericAPIView):
             if unit_ids:
                 preserved = get_preserved_order(unit_ids)
                 units_qs = Unit.objects.filter(id__in=unit_ids).order_by(preserved)
+                units_found = units_qs.exists()
             else:
                 units_qs = Unit.objects.none()
+                units_found = False
 
-            if not units_qs.exists():
+            if not units_found:
                 show_only_address = True
-            if not units_qs and "unit" in use_trigram:
+            if not units_found and "unit" in use_trigram:
                 units_qs = get_trigram_results(
                     Unit,
                     "services_unit",
@@ -733,10 +781,18 @@ class SearchViewSet(GenericAPIView):
                 units_qs = units_qs.filter(**bbox_filter)
 
             if units_order_list:
+                # The primary key makes the order of the units with as many
+                # services deterministic, the pages are fetched separately.
                 units_qs = units_qs.annotate(num_services=Count("services")).order_by(
-                    *units_order_list
+                    *units_order_list, "pk"
                 )
 
+            # Transform the geometries of all the units in the query.
+            units_qs = annotate_transformed_geometries(
+                units_qs,
+                get_unit_geometry_fields(show_geometry, include_fields),
+                DEFAULT_SRS,
+            )
             units_qs = units_qs[: model_limits["unit"]]
         else:
             units_qs = Unit.objects.none()
@@ -744,11 +800,11 @@ class SearchViewSet(GenericAPIView):
         if "administrativedivision" in types:
             administrative_divisions_qs = AdministrativeDivision.objects.filter(
                 id__in=administrative_division_ids
+            ).order_by(get_preserved_order(administrative_division_ids))
+            divisions_found = (
+                administrative_division_ids and administrative_divisions_qs.exists()
             )
-            if (
-                not administrative_divisions_qs
-                and "administrativedivision" in use_trigram
-            ):
+            if not divisions_found and "administrativedivision" in use_trigram:
                 administrative_divisions_qs = get_trigram_results(
                     AdministrativeDivision,
                     "munigeo_administrativedivision",
@@ -756,6 +812,10 @@ class SearchViewSet(GenericAPIView):
                     q_val,
                     threshold=trigram_threshold,
                 )
+            if show_geometry:
+                administrative_divisions_qs = annotate_transformed_geometries(
+                    administrative_divisions_qs, ["geometry__boundary"], DEFAULT_SRS
+                )
             administrative_divisions_qs = administrative_divisions_qs[
                 : model_limits["administrativedivision"]
             ]
@@ -763,8 +823,14 @@ class SearchViewSet(GenericAPIView):
             administrative_divisions_qs = AdministrativeDivision.objects.none()
         if "servicenode" in types:
             query_ids = [id[0] for id in service_node_ids.values()]
-            service_nodes_qs = ServiceNode.objects.filter(id__in=query_ids)
-            if not service_nodes_qs and "servicenode" in use_trigram:
+            # The names are not unique, pk keeps the pages of the chain stable.
+            service_nodes_qs = ServiceNode.objects.filter(id__in=query_ids).order_by(
+                "name", "pk"
+            )
+            if (
+                not (query_ids and service_nodes_qs.exists())
+                and "servicenode" in use_trigram
+            ):
                 service_nodes_qs = get_trigram_results(
                     ServiceNode,
                     "services_servicenode",
@@ -778,7 +844,7 @@ class SearchViewSet(GenericAPIView):
 
         if "address" in types:
             addresses_qs = Address.objects.filter(id__in=address_ids)
-            if not addresses_qs and "address" in use_trigram:
+            if not (address_ids and addresses_qs.exists()) and "address" in use_trigram:
                 addresses_qs = get_trigram_results(
                     Address,
                     "munigeo_address",
@@ -794,28 +860,21 @@ class SearchViewSet(GenericAPIView):
                     addresses_qs = addresses_qs.filter(
                         municipality_id__in=municipalities
                     )
-            addresses_qs = addresses_qs[: model_limits["address"]]
             # Use naturalsort function that is migrated to munigeo to
             # sort the addresses.
-            if len(addresses_qs) > 0:
-                ids = [addr.id for addr in addresses_qs]
-                address_query = sql.SQL("""
-                    SELECT id FROM munigeo_address
-                    WHERE id = ANY(%s)
-                    ORDER BY naturalsort({full_name_col}) ASC
-                """).format(full_name_col=sql.Identifier(f"full_name_{language_short}"))
-                cursor = connection.cursor()
-                cursor.execute(address_query, [ids])
-                addresses = cursor.fetchall()
-                # addresses are in format e.g. [(12755,), (4067,)], extract ids
-                ids = [str(a[0]) for a in addresses]
-                preserved = get_preserved_order(ids)
-                addresses_qs = Address.objects.filter(id__in=ids).order_by(preserved)
-                # if no units has been found without trigram search and addresses are
-                # found, do not return any units, thus they might
-                # confuse in the results.
-                if addresses_qs.exists() and show_only_address:
-                    units_qs = Unit.objects.none()
+            addresses_qs = addresses_qs.select_related("street__municipality")
+            addresses_qs = addresses_qs.order_by(
+                NaturalSort(f"full_name_{language_short}"), "pk"
+            )
+            addresses_qs = annotate_transformed_geometries(
+                addresses_qs, ["location"], DEFAULT_SRS
+            )
+            addresses_qs = addresses_qs[: model_limits["address"]]
+            # if no units has been found without trigram search and addresses are
+            # found, do not return any units, thus they might
+            # confuse in the results.
+            if show_only_address and addresses_qs.exists():
+                units_qs = Unit.objects.none()
         else:
             addresses_qs = Address.objects.none()
 
@@ -828,21 +887,30 @@ class SearchViewSet(GenericAPIView):
             )
             reset_queries()
 
-        queryset = list(
-            chain(
-                units_qs,
-                services_qs,
-                service_nodes_qs,
-                administrative_divisions_qs,
-                addresses_qs,
-            )
+        # Only the slices of the querysets on the requested page are fetched.
+        queryset = QuerySetChain(
+            units_qs,
+            services_qs,
+            service_nodes_qs,
+            administrative_divisions_qs,
+            addresses_qs,
         )
         page = self.paginate_queryset(queryset)
+        # Compute the unit counts and root service nodes of all the service
+        # nodes in the page at once, instead of a few queries per service node.
+        page_service_nodes = [obj for obj in page if isinstance(obj, ServiceNode)]
         serializer = SearchSerializer(
             page,
             many=True,
             context={
                 "service_node_ids": service_node_ids,
+                "service_node_unit_counts": get_service_node_unit_counts(
+                    {
+                        str(obj.id): service_node_ids[str(obj.id)]
+                        for obj in page_service_nodes
+                    }
+                ),
+                "root_service_nodes": get_root_service_nodes(page_service_nodes),
                 "include": include_fields,
                 "geometry": show_geometry,
             },
@@ -0,0 +1,84 @@
+"""
+Cache of the responses of the search endpoint.
+
+The responses are cached by the normalized query parameters and the data
+version, thus bumping the data version invalidates all the cached responses.
+The cache is only enabled with a shared default cache.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from services.utils import get_data_version, is_cache_shared
+
+logger = logging.getLogger("services.search")
+
+SEARCH_CACHE_KEY_PREFIX = "search"
+SEARCH_CACHE_HITS_KEY = "search_cache_hits"
+SEARCH_CACHE_MISSES_KEY = "search_cache_misses"
+# Comma separated parameters whose order and case do not affect the results.
+LIST_PARAMS = {"type", "use_trigram", "include", "municipality", "organization"}
+
+
+def normalize_search_params(query_params):
+    params = []
+    for key in sorted(query_params.keys()):
+        values = query_params.getlist(key)
+        if key in ("q", "input"):
+            values = [" ".join(value.split()) for value in values]
+        elif key in LIST_PARAMS:
+            values = [
+                ",".join(sorted(item.strip().lower() for item in value.split(",")))
+                for value in values
+            ]
+        else:
+            values = [value.strip() for value in values]
+        params.append((key, values))
+    return params
+
+
+def get_search_cache_key(request):
+    """
+    Returns the cache key of the search request. Host is a part of the key as
+    the paginated responses contain absolute URLs.
+    """
+    key = json.dumps(
+        [
+            get_data_version(),
+            request.build_absolute_uri(request.path),
+            normalize_search_params(request.query_params),
+        ]
+    )
+    return f"{SEARCH_CACHE_KEY_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def _increment(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def record_search_cache_access(hit):
+    count = _increment(SEARCH_CACHE_HITS_KEY if hit else SEARCH_CACHE_MISSES_KEY)
+    logger.debug(f"Search cache {'hit' if hit else 'miss'}, total {count}.")
+
+
+def get_search_cache_stats():
+    hits = cache.get(SEARCH_CACHE_HITS_KEY, 0)
+    misses = cache.get(SEARCH_CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else None,
+    }
+
+
+def is_search_cache_enabled():
+    return settings.SEARCH_CACHE_TIMEOUT > 0 and is_cache_shared()
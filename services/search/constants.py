@@ -13,7 +13,7 @@ SEARCHABLE_MODEL_TYPE_NAMES = (
 QUERY_PARAM_TYPE_NAMES = [m.lower() for m in SEARCHABLE_MODEL_TYPE_NAMES]
 # None will slice to the end of list, i.e. no limit.
 DEFAULT_MODEL_LIMIT_VALUE = None
-# The limit value for the search query that search the search_view. "NULL" = no limit
+# The limit value for the search query that search the search_index. "NULL" = no limit
 DEFAULT_SEARCH_SQL_LIMIT_VALUE = "NULL"
 DEFAULT_TRIGRAM_THRESHOLD = 0.15
 DEFAULT_RANK_THRESHOLD = 0
@@ -0,0 +1,136 @@
+"""
+Hyphenation of finnish compound words with Voikko.
+
+A Voikko instance is mutated while hyphenating, thus a single instance can
+only hyphenate one word at a time. HyphenationPool hyphenates batches of
+words in worker processes, each having a Voikko instance of its own.
+
+This module must not import Django models, as it is imported by the workers.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import batched
+
+import libvoikko
+
+# Batches with fewer words are hyphenated in the calling process, as sending
+# them to the workers takes longer than hyphenating them.
+DEFAULT_MIN_PARALLEL_BATCH_SIZE = 500
+# Number of words sent to a worker at a time.
+DEFAULT_CHUNK_SIZE = 200
+
+_voikko = None
+
+
+def get_voikko():
+    """
+    Returns the Voikko instance of the current process.
+    """
+    global _voikko
+    if _voikko is None:
+        _voikko = libvoikko.Voikko("fi")
+        _voikko.setNoUglyHyphenation(True)
+    return _voikko
+
+
+def is_compound_word(word):
+    result = get_voikko().analyze(word)
+    if len(result) == 0:
+        return False
+    return True if result[0]["WORDBASES"].count("+") > 1 else False
+
+
+def hyphenate(word):
+    """
+    Returns a list of syllables of the word, if it is a compound word.
+    """
+    word = word.strip()
+    if is_compound_word(word):
+        voikko = get_voikko()
+        # By Setting the setMinHyphenatedWordLength to word_length,
+        # voikko returns the words that are in the compound word
+        voikko.setMinHyphenatedWordLength(len(word))
+        syllables = voikko.hyphenate(word)
+        return syllables.split("-")
+    else:
+        return [word]
+
+
+def get_words(column_contents):
+    """
+    Returns the words in the given column contents.
+    """
+    words = []
+    for row_content in column_contents:
+        if row_content:
+            # Rows might be of type str or Array, if str
+            # cast to array by splitting.
+            if isinstance(row_content, str):
+                row_content = row_content.split()
+            words.extend(row_content)
+    return words
+
+
+def _hyphenate_chunk(words):
+    return [hyphenate(word) for word in words]
+
+
+def hyphenate_words(words):
+    """
+    Returns a dict of the given words and their syllables. The words are
+    hyphenated in the calling process.
+    """
+    return {word: hyphenate(word) for word in set(words)}
+
+
+class HyphenationPool:
+    """
+    Hyphenates batches of words in a pool of worker processes. Use as a
+    context manager, the workers are stopped on exit:
+
+        with HyphenationPool() as pool:
+            syllables = pool.hyphenate(words)
+    """
+
+    def __init__(
+        self,
+        processes=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        min_parallel_batch_size=DEFAULT_MIN_PARALLEL_BATCH_SIZE,
+    ):
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel_batch_size = min_parallel_batch_size
+        self.executor = None
+
+    def __enter__(self):
+        if self.processes > 1:
+            # Spawn the workers, forking would share the database connections
+            # of the calling process with the workers.
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def hyphenate(self, words):
+        """
+        Returns a dict of the given words and their syllables.
+        """
+        words = list(set(words))
+        if self.executor is None or len(words) < self.min_parallel_batch_size:
+            return hyphenate_words(words)
+        chunks = list(batched(words, self.chunk_size))
+        hyphenated = {}
+        for chunk, syllables in zip(
+            chunks, self.executor.map(_hyphenate_chunk, chunks), strict=True
+        ):
+            hyphenated.update(zip(chunk, syllables, strict=True))
+        return hyphenated
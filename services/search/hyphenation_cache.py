@@ -0,0 +1,101 @@
+"""
+Persistent cache of hyphenated words.
+
+The syllables of a word only depend on the word and the Voikko dictionary,
+thus they are stored in the HyphenatedWord table keyed by the dictionary
+version, with an in-process LRU cache in front of it. Only the words missing
+from both are hyphenated.
+"""
+
+import logging
+from collections import OrderedDict
+
+import libvoikko
+
+from services.models import HyphenatedWord
+from services.search.hyphenation import hyphenate_words
+
+logger = logging.getLogger("search")
+
+DEFAULT_LRU_MAXSIZE = 100000
+
+
+def get_dictionary_version():
+    """
+    Returns the version of the Voikko library and the finnish dictionary.
+    """
+    descriptions = sorted(
+        f"{dictionary.variant} {dictionary.description}"
+        for dictionary in libvoikko.Voikko.listDicts()
+        if dictionary.language == "fi"
+    )
+    return "; ".join([libvoikko.Voikko.getVersion(), *descriptions])[:255]
+
+
+class HyphenationCache:
+    def __init__(self, lru_maxsize=DEFAULT_LRU_MAXSIZE):
+        self.lru_maxsize = lru_maxsize
+        self.lru = OrderedDict()
+        self._dictionary_version = None
+
+    @property
+    def dictionary_version(self):
+        if self._dictionary_version is None:
+            self._dictionary_version = get_dictionary_version()
+        return self._dictionary_version
+
+    def clear(self):
+        self.lru.clear()
+
+    def _add_to_lru(self, hyphenated):
+        self.lru.update(hyphenated)
+        while len(self.lru) > self.lru_maxsize:
+            self.lru.popitem(last=False)
+
+    def hyphenate(self, words, hyphenate_missing=hyphenate_words):
+        """
+        Returns a dict of the given words and their syllables. The words not
+        found from the cache are hyphenated with hyphenate_missing, which
+        takes an iterable of words and returns a dict, and stored to the cache.
+        """
+        hyphenated = {}
+        missing = set()
+        for word in set(words):
+            if word in self.lru:
+                self.lru.move_to_end(word)
+                hyphenated[word] = self.lru[word]
+            else:
+                missing.add(word)
+        if not missing:
+            return hyphenated
+
+        stored = dict(
+            HyphenatedWord.objects.filter(
+                dictionary_version=self.dictionary_version, word__in=missing
+            ).values_list("word", "syllables")
+        )
+        missing.difference_update(stored)
+        new = hyphenate_missing(missing) if missing else {}
+        if new:
+            HyphenatedWord.objects.bulk_create(
+                [
+                    HyphenatedWord(
+                        word=word,
+                        dictionary_version=self.dictionary_version,
+                        syllables=syllables,
+                    )
+                    for word, syllables in new.items()
+                    # Longer "words" are rare garbage, not worth storing.
+                    if len(word) <= 255
+                ],
+                ignore_conflicts=True,
+            )
+            logger.debug(f"Hyphenated {len(new)} new words.")
+        self._add_to_lru(stored)
+        self._add_to_lru(new)
+        hyphenated.update(stored)
+        hyphenated.update(new)
+        return hyphenated
+
+
+hyphenation_cache = HyphenationCache()
@@ -0,0 +1,169 @@
+"""
+Maintenance of the search_index table that the search endpoint queries.
+
+The table contains one row per searchable object (ServiceNodes with identical
+names and search columns are grouped into a single row) and is populated from
+the search_columns of the searchable models. Rows are refreshed by the
+post_save and post_delete signals for single objects and rebuilt as a whole by the
+index_search_columns management command.
+"""
+
+from django.db import connection, transaction
+from psycopg import sql
+
+SEARCH_INDEX_TABLE = "search_index"
+
+# The SELECT statements producing the rows of the search_index, by type name.
+# The {where} placeholder is replaced by an optional filter.
+SEARCH_INDEX_SOURCES = {
+    "Unit": """
+        SELECT concat('unit_', id), name_fi, name_sv, name_en,
+            search_column_fi, search_column_sv, search_column_en, 'Unit'
+        FROM services_unit WHERE is_active = true {where}
+    """,
+    "Service": """
+        SELECT concat('service_', id), name_fi, name_sv, name_en,
+            search_column_fi, search_column_sv, search_column_en, 'Service'
+        FROM services_service WHERE true {where}
+    """,
+    "ServiceNode": """
+        SELECT concat('servicenode_', string_agg(id::text, '_')), name_fi, name_sv,
+            name_en, search_column_fi, search_column_sv, search_column_en,
+            'ServiceNode'
+        FROM services_servicenode WHERE true {where} GROUP BY 2, 3, 4, 5, 6, 7
+    """,
+    "AdministrativeDivision": """
+        SELECT concat('administrativedivision_', id), name_fi, name_sv, name_en,
+            search_column_fi, search_column_sv, search_column_en,
+            'AdministrativeDivision'
+        FROM munigeo_administrativedivision WHERE true {where}
+    """,
+    "Address": """
+        SELECT concat('address_', id), full_name_fi, full_name_sv, full_name_en,
+            search_column_fi, search_column_sv, search_column_en, 'Address'
+        FROM munigeo_address WHERE true {where}
+    """,
+}
+
+# Prefix of the id column in the search_index, by type name.
+SEARCH_INDEX_ID_PREFIXES = {
+    "Unit": "unit_",
+    "Service": "service_",
+    "ServiceNode": "servicenode_",
+    "AdministrativeDivision": "administrativedivision_",
+    "Address": "address_",
+}
+
+
+# Filter matching the ServiceNodes whose names are in the given name arrays.
+SERVICE_NODE_NAMES_FILTER = """
+    AND EXISTS (
+        SELECT 1 FROM unnest(%s::text[], %s::text[], %s::text[])
+            AS names(name_fi, name_sv, name_en)
+        WHERE services_servicenode.name_fi IS NOT DISTINCT FROM names.name_fi
+            AND services_servicenode.name_sv IS NOT DISTINCT FROM names.name_sv
+            AND services_servicenode.name_en IS NOT DISTINCT FROM names.name_en
+    )
+"""
+
+
+def _get_source_query(type_name, where=""):
+    return sql.SQL(
+        "INSERT INTO {table} " + SEARCH_INDEX_SOURCES[type_name].format(where=where)
+    ).format(table=sql.Identifier(SEARCH_INDEX_TABLE))
+
+
+def rebuild_search_index(type_names=None):
+    """
+    Rebuilds the rows of the given types, or the whole search_index if no
+    types are given, with a single INSERT ... SELECT per type.
+    Returns a dict with the number of rows indexed by type name.
+    """
+    if type_names is None:
+        type_names = SEARCH_INDEX_SOURCES.keys()
+    num_indexed = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        for type_name in type_names:
+            cursor.execute(
+                sql.SQL("DELETE FROM {table} WHERE type_name = %s").format(
+                    table=sql.Identifier(SEARCH_INDEX_TABLE)
+                ),
+                [type_name],
+            )
+            cursor.execute(_get_source_query(type_name))
+            num_indexed[type_name] = cursor.rowcount
+    return num_indexed
+
+
+def update_search_index(type_name, ids):
+    """
+    Refreshes the search_index rows of the objects of the given type and ids.
+    """
+    if type_name not in SEARCH_INDEX_SOURCES:
+        return
+    ids = list(ids)
+    if not ids:
+        return
+    if type_name == "ServiceNode":
+        _update_service_node_search_index(ids)
+        return
+    prefix = SEARCH_INDEX_ID_PREFIXES[type_name]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("DELETE FROM {table} WHERE id = ANY(%s)").format(
+                table=sql.Identifier(SEARCH_INDEX_TABLE)
+            ),
+            [[f"{prefix}{id}" for id in ids]],
+        )
+        cursor.execute(_get_source_query(type_name, "AND id = ANY(%s)"), [ids])
+
+
+def _update_service_node_search_index(ids):
+    """
+    ServiceNodes are grouped into rows by their names, thus a change in a
+    ServiceNode affects both the group it belonged to and the group it now
+    belongs to. Both groups are rebuilt.
+    """
+    table = sql.Identifier(SEARCH_INDEX_TABLE)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            sql.SQL(
+                """
+                SELECT name_fi, name_sv, name_en FROM services_servicenode
+                WHERE id = ANY(%s)
+                UNION
+                SELECT name_fi, name_sv, name_en FROM {table}
+                WHERE type_name = 'ServiceNode'
+                    AND string_to_array(substr(id, 13), '_') && %s::text[]
+                """
+            ).format(table=table),
+            [ids, [str(id) for id in ids]],
+        )
+        names = cursor.fetchall()
+        if not names:
+            return
+        name_arrays = [list(column) for column in zip(*names, strict=True)]
+        cursor.execute(
+            sql.SQL(
+                """
+                DELETE FROM {table} USING
+                    unnest(%s::text[], %s::text[], %s::text[])
+                    AS names(name_fi, name_sv, name_en)
+                WHERE {table}.type_name = 'ServiceNode'
+                    AND {table}.name_fi IS NOT DISTINCT FROM names.name_fi
+                    AND {table}.name_sv IS NOT DISTINCT FROM names.name_sv
+                    AND {table}.name_en IS NOT DISTINCT FROM names.name_en
+                """
+            ).format(table=table),
+            name_arrays,
+        )
+        cursor.execute(
+            _get_source_query("ServiceNode", SERVICE_NODE_NAMES_FILTER), name_arrays
+        )
+
+
+def empty_search_index():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("TRUNCATE {table}").format(table=sql.Identifier(SEARCH_INDEX_TABLE))
+        )
@@ -0,0 +1,163 @@
+"""
+Queue of the objects whose syllables and search columns need reindexing.
+
+The post_save signals add the saved objects to the queue instead of updating
+them one by one. The queue is flushed when the transaction is committed or,
+inside a deferred() block, when the outermost block exits, e.g. at the end of
+an import. The objects queued by a rolled back transaction are discarded.
+Flushing updates the queued objects of a model in batches with one UPDATE per
+language and bumps the data version.
+"""
+
+import operator
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import reduce
+from itertools import batched
+
+from django.contrib.postgres.search import SearchVector
+from django.db import transaction
+from munigeo.models import Address, AdministrativeDivision
+
+from services.models import Service, ServiceNode, Unit
+from services.search.hyphenation import get_words
+from services.search.hyphenation_cache import hyphenation_cache
+from services.search.index import update_search_index
+from services.utils import bump_data_version
+
+LANGUAGES = ["fi", "sv", "en"]
+FLUSH_BATCH_SIZE = 5000
+# The reindexed models, in the order they are flushed.
+REINDEXED_MODELS = [Service, ServiceNode, Unit, AdministrativeDivision, Address]
+SYLLABLE_MODELS = [Service, ServiceNode, Unit]
+
+
+def get_search_vector(model, lang):
+    return reduce(
+        operator.add,
+        [
+            SearchVector(column[0], config=column[1], weight=column[2])
+            for column in model.get_search_column_indexing(lang)
+        ],
+    )
+
+
+def populate_service_keywords(ids):
+    services = (
+        Service.objects.filter(id__in=ids).only("id").prefetch_related("keywords")
+    )
+    for service in services:
+        keywords = {lang: [] for lang in LANGUAGES}
+        for keyword in service.keywords.all():
+            language = keyword.language if keyword.language in keywords else "en"
+            keywords[language].append(keyword.name)
+        for lang in LANGUAGES:
+            setattr(service, f"keyword_names_{lang}", keywords[lang])
+    Service.objects.bulk_update(
+        services, [f"keyword_names_{lang}" for lang in LANGUAGES]
+    )
+
+
+def generate_syllables(model, ids):
+    rows = model.objects.filter(id__in=ids).values_list(
+        "id", *model.get_syllable_fi_columns()
+    )
+    words = {row[0]: get_words(row[1:]) for row in rows}
+    hyphenated = hyphenation_cache.hyphenate(
+        word for row_words in words.values() for word in row_words
+    )
+    model.objects.bulk_update(
+        [
+            model(
+                id=id,
+                syllables_fi=[
+                    syllable for word in row_words for syllable in hyphenated[word]
+                ],
+            )
+            for id, row_words in words.items()
+        ],
+        ["syllables_fi"],
+    )
+
+
+def reindex(model, ids):
+    """
+    Populates the syllables, search columns and search_index rows of the
+    objects of the model with the given ids.
+    """
+    for batch in batched(sorted(ids), FLUSH_BATCH_SIZE):
+        if model == Service:
+            populate_service_keywords(batch)
+        if model in SYLLABLE_MODELS:
+            generate_syllables(model, batch)
+        qs = model.objects.filter(id__in=batch)
+        if model == ServiceNode:
+            # To avoid conflicts with Service names, only index if
+            # service_reference is None.
+            qs = qs.filter(service_reference__isnull=True)
+        for lang in LANGUAGES:
+            qs.update(**{f"search_column_{lang}": get_search_vector(model, lang)})
+        update_search_index(model.__name__, batch)
+
+
+class ReindexQueue(threading.local):
+    def __init__(self):
+        self.pending = defaultdict(set)
+        self.deferred_depth = 0
+
+    def add(self, obj):
+        if self.deferred_depth:
+            self.pending[obj._meta.model].add(obj.id)
+            return
+        flush_registered = self.is_flush_registered()
+        if not flush_registered:
+            # The objects of a rolled back transaction are not reindexed.
+            self.pending = defaultdict(set)
+        self.pending[obj._meta.model].add(obj.id)
+        if not flush_registered:
+            # Outside a transaction the queue is flushed immediately.
+            transaction.on_commit(self.flush)
+
+    def is_flush_registered(self):
+        """
+        Returns whether the flush is registered to run when the current
+        transaction is committed. The flush registered by a rolled back
+        transaction or savepoint is discarded with it.
+        """
+        connection = transaction.get_connection()
+        return any(func == self.flush for _, func, _ in connection.run_on_commit)
+
+    def flush(self):
+        pending, self.pending = self.pending, defaultdict(set)
+        if not pending:
+            return
+        for model in REINDEXED_MODELS:
+            if pending.get(model):
+                reindex(model, pending[model])
+        bump_data_version()
+
+    @contextmanager
+    def deferred(self):
+        """
+        Defers the reindexing of the saved objects until the outermost
+        deferred block exits without an exception.
+        """
+        if not self.deferred_depth and not self.is_flush_registered():
+            self.pending = defaultdict(set)
+        self.deferred_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self.deferred_depth == 1:
+                # The saves of the failed block are not flushed by a later,
+                # unrelated add().
+                self.pending = defaultdict(set)
+            raise
+        finally:
+            self.deferred_depth -= 1
+        if not self.deferred_depth:
+            self.flush()
+
+
+reindex_queue = ReindexQueue()
@@ -30,6 +30,7 @@ from services.models import (
     Unit,
     UnitAccessibilityShortcomings,
 )
+from services.search.index import rebuild_search_index
 
 
 @pytest.fixture
@@ -117,6 +118,7 @@ def units(
     update_service_counts()
     update_service_node_counts()
     Unit.objects.update(search_column_fi=get_search_column(Unit, "fi"))
+    rebuild_search_index(["Unit"])
     return Unit.objects.all().order_by("id")
 
 
@@ -168,6 +170,7 @@ def services():
         last_modified_time=now(),
     )
     Service.objects.update(search_column_fi=get_search_column(Service, "fi"))
+    rebuild_search_index(["Service"])
     return Service.objects.all()
 
 
@@ -191,6 +194,7 @@ def service_nodes(services):
     museums.related_services.add(2)
     museums.save()
     ServiceNode.objects.update(search_column_fi=get_search_column(ServiceNode, "fi"))
+    rebuild_search_index(["ServiceNode"])
     return ServiceNode.objects.all()
 
 
@@ -259,6 +263,7 @@ def addresses(streets, municipality):
     )
     generate_syllables(Address)
     Address.objects.update(search_column_fi=get_search_column(Address, "fi"))
+    rebuild_search_index(["Address"])
     return Address.objects.all()
 
 
@@ -284,6 +289,7 @@ def administrative_division(administrative_division_type):
     AdministrativeDivision.objects.update(
         search_column_fi=get_search_column(AdministrativeDivision, "fi")
     )
+    rebuild_search_index(["AdministrativeDivision"])
     return adm_div
 
 
@@ -1,5 +1,7 @@
 import pytest
 from django.contrib.gis.geos import Point, Polygon
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ParseError
 from rest_framework.reverse import reverse
 
@@ -381,6 +383,30 @@ def test_search_with_bbox_parameter(api_client, units):
     assert results[0]["name"]["fi"] == "Jäähalli"
 
 
+@pytest.mark.django_db
+def test_search_pagination(api_client, units, services, service_nodes):
+    url = reverse("search") + "?q=museo&type=unit,service,servicenode"
+    results = api_client.get(url).json()["results"]
+    assert len(results) == 3
+
+    paged_results = []
+    for page in range(1, 4):
+        response = api_client.get(url + f"&page_size=1&page={page}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 3
+        paged_results += data["results"]
+    assert paged_results == results
+
+
+@pytest.mark.django_db
+def test_search_estimated_count(api_client, units, services, service_nodes):
+    url = reverse("search") + "?q=museo&type=unit,service,servicenode"
+    response = api_client.get(url + "&count=estimate&page_size=1")
+    assert response.status_code == 200
+    assert response.json()["count"] == 3
+
+
 @pytest.mark.django_db
 def test_search_include_serializes_point_field(api_client, units):
     unit = units.get(id=2)
@@ -546,3 +572,18 @@ def test_search_serializer_null_geometry_does_not_crash(units):
     data = serializer.data
 
     assert data["geometry"] is None
+
+
+@pytest.mark.django_db
+def test_search_queries_only_requested_types(
+    api_client, units, streets, addresses, municipality
+):
+    url = reverse("search") + "?q=kurra&type=address"
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 1
+    queries = [query["sql"] for query in context.captured_queries]
+    assert not any("services_unit" in query for query in queries)
+    # The streets and municipalities of the addresses are not queried one by one.
+    assert not any(query.startswith('SELECT "munigeo_street"') for query in queries)
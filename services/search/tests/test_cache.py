@@ -0,0 +1,40 @@
+import pytest
+from django.http import QueryDict
+from rest_framework.reverse import reverse
+
+from services.models import Unit
+from services.search.cache import get_search_cache_stats, normalize_search_params
+from services.utils import bump_data_version
+
+
+def test_normalize_search_params():
+    assert normalize_search_params(
+        QueryDict("type=unit,Service&q=  biologinen   museo ")
+    ) == normalize_search_params(QueryDict("q=biologinen museo&type=service,unit"))
+
+
+@pytest.mark.django_db
+def test_search_cache(api_client, units, shared_cache):
+    url = reverse("search") + "?q=museo&type=unit"
+    response = api_client.get(url)
+    assert response["X-Cache"] == "MISS"
+    assert len(response.json()["results"]) == 1
+
+    Unit.objects.filter(id=2).delete()
+    response = api_client.get(url)
+    assert response["X-Cache"] == "HIT"
+    assert len(response.json()["results"]) == 1
+    assert get_search_cache_stats()["hits"] == 1
+
+    bump_data_version()
+    response = api_client.get(url)
+    assert response["X-Cache"] == "MISS"
+    assert len(response.json()["results"]) == 0
+    assert get_search_cache_stats() == {"hits": 1, "misses": 2, "hit_ratio": 1 / 3}
+
+
+@pytest.mark.django_db
+def test_search_cache_requires_shared_cache(api_client, units):
+    response = api_client.get(reverse("search") + "?q=museo&type=unit")
+    assert response.status_code == 200
+    assert "X-Cache" not in response
@@ -0,0 +1,47 @@
+import pytest
+
+from services.models import HyphenatedWord
+from services.search.hyphenation import HyphenationPool, hyphenate_words
+from services.search.hyphenation_cache import HyphenationCache
+
+WORDS = ["kirjastoauto", "uimahalli", "museo", "Kurrapolku", "museo"]
+
+
+def test_hyphenate_words():
+    hyphenated = hyphenate_words(WORDS)
+
+    assert len(hyphenated) == 4
+    assert hyphenated["museo"] == ["museo"]
+    assert "".join(hyphenated["kirjastoauto"]) == "kirjastoauto"
+
+
+def test_hyphenation_pool():
+    with HyphenationPool(processes=2, chunk_size=1, min_parallel_batch_size=1) as pool:
+        assert pool.executor is not None
+        assert pool.hyphenate(WORDS) == hyphenate_words(WORDS)
+    assert pool.executor is None
+
+
+@pytest.mark.django_db
+def test_hyphenation_cache():
+    cache = HyphenationCache()
+    hyphenated_words = []
+
+    def hyphenate_missing(words):
+        hyphenated_words.extend(words)
+        return hyphenate_words(words)
+
+    hyphenated = cache.hyphenate(WORDS, hyphenate_missing)
+
+    assert hyphenated == hyphenate_words(WORDS)
+    assert sorted(hyphenated_words) == sorted(set(WORDS))
+    assert HyphenatedWord.objects.filter(
+        dictionary_version=cache.dictionary_version
+    ).count() == len(set(WORDS))
+
+    # The words are found from the in-process cache.
+    assert cache.hyphenate(WORDS, hyphenate_missing) == hyphenated
+    # The words are found from the database.
+    cache.clear()
+    assert cache.hyphenate(WORDS, hyphenate_missing) == hyphenated
+    assert len(hyphenated_words) == len(set(WORDS))
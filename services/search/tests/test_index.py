@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection
+from django.utils.timezone import now
+
+from services.management.commands.index_search_columns import (
+    generate_syllables,
+    generate_syllables_bulk,
+    get_search_column,
+)
+from services.models import ServiceNode, Unit
+from services.search.index import (
+    empty_search_index,
+    rebuild_search_index,
+    update_search_index,
+)
+
+
+def get_search_index_rows(type_name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, name_fi FROM search_index WHERE type_name = %s ORDER BY id",
+            [type_name],
+        )
+        return cursor.fetchall()
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index(units, service_nodes):
+    empty_search_index()
+    assert get_search_index_rows("Unit") == []
+
+    num_indexed = rebuild_search_index(["Unit", "ServiceNode"])
+
+    assert num_indexed == {"Unit": 5, "ServiceNode": 2}
+    assert ("unit_2", "Biologinen museo") in get_search_index_rows("Unit")
+
+
+@pytest.mark.django_db
+def test_update_search_index_unit(units):
+    Unit.objects.filter(id=2).update(name_fi="Luonnontieteellinen museo")
+    Unit.objects.filter(id=3).update(is_active=False)
+
+    update_search_index("Unit", [2, 3])
+
+    rows = get_search_index_rows("Unit")
+    assert ("unit_2", "Luonnontieteellinen museo") in rows
+    assert "unit_3" not in [row[0] for row in rows]
+
+
+@pytest.mark.django_db
+def test_update_search_index_groups_service_nodes(service_nodes):
+    ServiceNode.objects.create(
+        id=3,
+        name="Museot",
+        name_sv="Museer",
+        name_en="Museums",
+        last_modified_time=now(),
+    )
+    ServiceNode.objects.filter(id=3).update(
+        search_column_fi=get_search_column(ServiceNode, "fi")
+    )
+
+    update_search_index("ServiceNode", [3])
+
+    ids = [row[0] for row in get_search_index_rows("ServiceNode")]
+    assert ids.count("servicenode_1") == 1
+    assert len([id for id in ids if id.startswith("servicenode_2")]) == 1
+    assert sorted(
+        next(id for id in ids if id.startswith("servicenode_2")).split("_")[1:]
+    ) == ["2", "3"]
+
+    ServiceNode.objects.filter(id=3).update(name_fi="Taidemuseot")
+    update_search_index("ServiceNode", [3])
+
+    rows = get_search_index_rows("ServiceNode")
+    assert ("servicenode_2", "Museot") in rows
+    assert ("servicenode_3", "Taidemuseot") in rows
+
+
+@pytest.mark.django_db
+def test_generate_syllables_bulk(units):
+    generate_syllables(Unit)
+    syllables = dict(Unit.objects.values_list("id", "syllables_fi"))
+    Unit.objects.update(syllables_fi=[])
+
+    assert generate_syllables_bulk(Unit, batch_size=2) == 5
+
+    assert dict(Unit.objects.values_list("id", "syllables_fi")) == syllables
@@ -0,0 +1,90 @@
+import pytest
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from services.models import ServiceNode, Unit
+from services.search.reindex_queue import reindex_queue
+
+
+def get_search_index_row(id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name_fi, search_column_fi FROM search_index WHERE id = %s", [id]
+        )
+        return cursor.fetchone()
+
+
+@pytest.mark.django_db
+def test_reindex_queue_deferred(units):
+    unit = Unit.objects.get(id=2)
+    with reindex_queue.deferred():
+        unit.name = unit.name_fi = "Luonnontieteellinen museo"
+        unit.save()
+        unit.save()
+        Unit.objects.get(id=3).save()
+        assert {2, 3} <= reindex_queue.pending[Unit]
+        assert get_search_index_row("unit_2")[0] == "Biologinen museo"
+
+    assert not reindex_queue.pending
+    name_fi, search_column_fi = get_search_index_row("unit_2")
+    assert name_fi == "Luonnontieteellinen museo"
+    assert "luonnontieteellin" in search_column_fi
+
+
+@pytest.mark.django_db
+def test_reindex_queue_deleted_objects(units, service_nodes):
+    ServiceNode.objects.create(
+        id=3,
+        name="Museot",
+        name_sv="Museer",
+        name_en="Museums",
+        last_modified_time=now(),
+    )
+    reindex_queue.flush()
+    assert get_search_index_row("unit_2") is not None
+
+    with reindex_queue.deferred():
+        Unit.objects.get(id=2).delete()
+        ServiceNode.objects.get(id=3).delete()
+
+    assert get_search_index_row("unit_2") is None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id FROM search_index WHERE type_name = 'ServiceNode'")
+        service_node_ids = [row[0] for row in cursor.fetchall()]
+    assert "servicenode_2" in service_node_ids
+    assert not any("3" in id.split("_") for id in service_node_ids)
+
+
+@pytest.mark.django_db
+def test_reindex_queue_deferred_exception(units):
+    with pytest.raises(ValueError):
+        with reindex_queue.deferred():
+            Unit.objects.get(id=2).save()
+            assert reindex_queue.pending
+            raise ValueError
+
+    assert not reindex_queue.pending
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reindex_queue_transactions(units):
+    def get_flushes():
+        return [
+            func
+            for _, func, _ in connection.run_on_commit
+            if func == reindex_queue.flush
+        ]
+
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            Unit.objects.get(id=2).save()
+            Unit.objects.get(id=3).save()
+            assert len(get_flushes()) == 1
+            raise ValueError
+    assert reindex_queue.pending[Unit] == {2, 3}
+
+    with transaction.atomic():
+        Unit.objects.get(id=3).save()
+        # The units of the rolled back transaction are not reindexed.
+        assert reindex_queue.pending[Unit] == {3}
+    assert not reindex_queue.pending
@@ -8,8 +8,15 @@ from munigeo.models import (
     Municipality,
 )
 
-from services.models import ServiceNode, Unit
-from services.search.utils import set_service_node_unit_count
+from services.models import ServiceNode, ServiceNodeUnitCount, Unit
+from services.search.utils import (
+    QuerySetChain,
+    get_preserved_order,
+    get_root_service_nodes,
+    get_service_node_unit_counts,
+    get_trigram_ids,
+    set_service_node_unit_count,
+)
 
 
 @pytest.fixture
@@ -129,3 +136,85 @@ def test_set_service_node_unit_count_only_valid_grouped_ids(
 
     assert representation["unit_count"]["total"] >= 2
     assert representation["unit_count"]["municipality"].get("helsinki", 0) >= 2
+
+
+@pytest.mark.django_db
+def test_get_service_node_unit_counts(
+    service_node_with_unit, second_service_node_with_unit, django_assert_num_queries
+):
+    ServiceNodeUnitCount.objects.create(
+        service_node=second_service_node_with_unit,
+        division_type_id=1,
+        division_id=1,
+        count=3,
+    )
+
+    with django_assert_num_queries(3):
+        unit_counts = get_service_node_unit_counts(
+            {"10": ["10", "11"], "11": ["11"], "12": ["12"]}
+        )
+
+    assert unit_counts == {
+        "10": {"municipality": {"helsinki": 2}, "total": 2},
+        "11": {"municipality": {"helsinki": 3}, "total": 3},
+        "12": {"municipality": {}, "total": 0},
+    }
+
+
+@pytest.mark.django_db
+def test_get_root_service_nodes(django_assert_num_queries):
+    root = ServiceNode.objects.create(id=1, name="Root", last_modified_time=now())
+    child = ServiceNode.objects.create(
+        id=2, name="Child", parent=root, last_modified_time=now()
+    )
+    grandchild = ServiceNode.objects.create(
+        id=3, name="Grandchild", parent=child, last_modified_time=now()
+    )
+
+    # The tree snapshot and its roots are loaded once per data version.
+    with django_assert_num_queries(2):
+        roots = get_root_service_nodes([root, grandchild])
+    assert roots == {1: root, 3: root}
+
+    with django_assert_num_queries(0):
+        assert get_root_service_nodes([child]) == {2: root}
+
+
+@pytest.mark.django_db
+def test_get_preserved_order(service_node_with_unit, second_service_node_with_unit):
+    ids = ["101", "100"]
+
+    qs = Unit.objects.filter(id__in=ids).order_by(get_preserved_order(ids))
+
+    assert list(qs.values_list("id", flat=True)) == [101, 100]
+
+
+@pytest.mark.django_db
+def test_query_set_chain(django_assert_num_queries):
+    for id in range(1, 6):
+        ServiceNode.objects.create(id=id, name=f"Node {id}", last_modified_time=now())
+    chain = QuerySetChain(
+        ServiceNode.objects.filter(id__lte=2).order_by("id"),
+        ServiceNode.objects.none(),
+        ServiceNode.objects.filter(id__gt=2).order_by("id"),
+    )
+
+    with django_assert_num_queries(2):
+        assert len(chain) == 5
+    assert chain.get_counts() == [2, 0, 3]
+    # Only the querysets on the page are fetched.
+    with django_assert_num_queries(1):
+        assert [node.id for node in chain[3:10]] == [4, 5]
+    with django_assert_num_queries(2):
+        assert [node.id for node in chain[1:3]] == [2, 3]
+    assert chain[0].id == 1
+
+
+@pytest.mark.django_db
+def test_get_trigram_ids(service_node_with_unit, second_service_node_with_unit):
+    results = get_trigram_ids("services_unit", "name_fi", "Test Unit", 0.3)
+
+    assert [row[0] for row in results] == [100, 101]
+    assert results[0][1] == 1
+    assert results[0][1] > results[1][1] >= 0.3
+    assert get_trigram_ids("services_unit", "name_fi", "Test Unit", 1.0) == [(100, 1)]
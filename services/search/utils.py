@@ -1,9 +1,10 @@
 import logging
 
-import libvoikko
-from django.db import connection
-from django.db.models import Case, When
-from django.db.models.functions import Lower
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Func, IntegerField, Value
+from django.db.models.functions import Cast, Lower
+from psycopg import sql
 from rest_framework.exceptions import ParseError
 
 from services.models import (
@@ -13,14 +14,13 @@ from services.models import (
     ServiceNodeUnitCount,
     Unit,
 )
+from services.models.hierarchy import get_tree_snapshot
 from services.search.constants import (
     DEFAULT_TRIGRAM_THRESHOLD,
     SEARCHABLE_MODEL_TYPE_NAMES,
 )
 
 logger = logging.getLogger("search")
-voikko = libvoikko.Voikko("fi")
-voikko.setNoUglyHyphenation(True)
 
 
 def get_foreign_key_attr(obj, field):
@@ -39,26 +39,88 @@ def get_foreign_key_attr(obj, field):
         return get_foreign_key_attr(getattr(obj, first_field), remaining_fields)
 
 
-def is_compound_word(word):
-    result = voikko.analyze(word)
-    if len(result) == 0:
-        return False
-    return True if result[0]["WORDBASES"].count("+") > 1 else False
+def get_service_node_unit_counts(service_node_ids):
+    """
+    Returns the unit counts of the service nodes by municipality, with a fixed
+    number of queries. service_node_ids is a dict of the grouped ids by the
+    first id, as returned by get_service_node_results. The counts of single
+    service nodes are read from the ServiceNodeUnitCounts, the counts of
+    grouped service nodes are the distinct units of the nodes and their
+    descendants.
+    """
+    unit_counts = {key: {} for key in service_node_ids}
+    single_ids = {ids[0]: key for key, ids in service_node_ids.items() if len(ids) == 1}
+    grouped_ids = {
+        key: [int(id) for id in ids]
+        for key, ids in service_node_ids.items()
+        if len(ids) > 1
+    }
+
+    service_node_counts = ServiceNodeUnitCount.objects.filter(
+        service_node_id__in=single_ids.keys(), division__isnull=False
+    ).values_list("service_node_id", "division__name_fi", "count")
+    for service_node_id, division_name, count in service_node_counts:
+        counts = unit_counts[single_ids[str(service_node_id)]]
+        division = division_name.lower()
+        counts[division] = counts.get(division, 0) + count
+
+    if grouped_ids:
+        keys, node_ids = [], []
+        for key, ids in grouped_ids.items():
+            keys += [key] * len(ids)
+            node_ids += ids
+        existing_ids = set(
+            ServiceNode.objects.filter(id__in=node_ids).values_list("id", flat=True)
+        )
+        for id in node_ids:
+            if id not in existing_ids:
+                logger.warning(
+                    f"ServiceNode with id={id} not found, "
+                    f"skipping in unit count aggregation."
+                )
+        query = sql.SQL("""
+            SELECT groups.key, unit.municipality_id, COUNT(DISTINCT unit.id)
+            FROM unnest(%s::text[], %s::int[]) AS groups(key, node_id)
+            JOIN {service_node} AS node ON node.id = groups.node_id
+            JOIN {service_node} AS descendant
+                ON descendant.tree_id = node.tree_id
+                AND descendant.lft BETWEEN node.lft AND node.rght
+            JOIN {unit_service_nodes} AS unit_service_node
+                ON unit_service_node.servicenode_id = descendant.id
+            JOIN {unit} AS unit ON unit.id = unit_service_node.unit_id
+            WHERE unit.public AND unit.is_active
+                AND unit.municipality_id IS NOT NULL
+            GROUP BY groups.key, unit.municipality_id
+        """).format(
+            service_node=sql.Identifier(ServiceNode._meta.db_table),
+            unit_service_nodes=sql.Identifier(
+                Unit.service_nodes.through._meta.db_table
+            ),
+            unit=sql.Identifier(Unit._meta.db_table),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(query, [keys, node_ids])
+            for key, municipality_id, count in cursor.fetchall():
+                unit_counts[key][municipality_id] = count
+
+    return {
+        key: {"municipality": counts, "total": sum(counts.values())}
+        for key, counts in unit_counts.items()
+    }
 
 
-def hyphenate(word):
+def get_root_service_nodes(service_nodes):
     """
-    Returns a list of syllables of the word, if it is a compound word.
+    Returns a dict of the root service nodes by the ids of the given service
+    nodes, resolved from the process-wide tree snapshot. The service nodes of
+    the trees missing from the snapshot are left out.
     """
-    word = word.strip()
-    if is_compound_word(word):
-        # By Setting the setMinHyphenatedWordLength to word_length,
-        # voikko returns the words that are in the compound word
-        voikko.setMinHyphenatedWordLength(len(word))
-        syllables = voikko.hyphenate(word)
-        return syllables.split("-")
-    else:
-        return [word]
+    roots = get_tree_snapshot(ServiceNode).get_roots()
+    return {
+        service_node.id: roots[service_node.tree_id]
+        for service_node in service_nodes
+        if service_node.tree_id in roots
+    }
 
 
 def set_service_node_unit_count(ids, representation):
@@ -66,49 +128,7 @@ def set_service_node_unit_count(ids, representation):
     As representation is a dict(mutable) passed by the serializer
     set the unit_counts for the service_node.
     """
-    unit_counts = {}
-    if len(ids) == 1:
-        service_node_count_qs = ServiceNodeUnitCount.objects.filter(
-            service_node_id=ids[0]
-        )
-        for service_node_count in service_node_count_qs:
-            if hasattr(service_node_count.division, "name"):
-                division = service_node_count.division.name_fi.lower()
-            else:
-                continue
-            count = service_node_count.count
-            if division in unit_counts:
-                unit_counts[division] += count
-            else:
-                unit_counts[division] = count
-
-    else:
-        # Handle grouped service_nodes
-        units_qs = Unit.objects.none()
-        for id in ids:
-            try:
-                service_node = ServiceNode.objects.get(id=id)
-            except ServiceNode.DoesNotExist:
-                logger.warning(
-                    f"ServiceNode with id={id} not found, "
-                    f"skipping in unit count aggregation."
-                )
-                continue
-            units_qs = units_qs | service_node.get_units_qs()
-        units_qs = units_qs.distinct()
-        for unit in units_qs:
-            division = unit.municipality_id
-            if not division:
-                continue
-            if division in unit_counts:
-                unit_counts[division] += 1
-            else:
-                unit_counts[division] = 1
-
-    representation["unit_count"] = {
-        "municipality": unit_counts,
-    }
-    representation["unit_count"]["total"] = sum(unit_counts.values())
+    representation["unit_count"] = get_service_node_unit_counts({ids[0]: ids})[ids[0]]
 
 
 def set_service_unit_count(obj, representation):
@@ -154,6 +174,18 @@ def set_address_fields(obj, representation):
     representation["street"] = street
 
 
+def get_unit_geometry_fields(geometry, include_fields):
+    """
+    Returns the geometry fields of the units serialized by the search.
+    """
+    fields = ["location"]
+    if geometry or "unit.geometry" in include_fields:
+        fields.append("geometry")
+    if "unit.geometry_3d" in include_fields:
+        fields.append("geometry_3d")
+    return fields
+
+
 def get_service_node_results(all_results):
     """
     Returns a dict with the aggregated ids. Key is the first id in the results.
@@ -193,51 +225,106 @@ def get_all_ids_from_sql_results(all_results):
     return ids
 
 
-def get_preserved_order(ids):
+class ArrayPosition(Func):
+    function = "array_position"
+    output_field = IntegerField()
+
+
+class NaturalSort(Func):
     """
-    Returns a Case expression that can be used in the order_by method,
-    ordering will be equal to the order of ids in the ids list.
+    The naturalsort function created by the munigeo migrations, orders
+    e.g. address numbers naturally.
     """
-    if ids:
-        return Case(*[When(id=id, then=pos) for pos, id in enumerate(ids)])
-    else:
-        return Case()
 
+    function = "naturalsort"
 
-# def get_trigram_results(model, field, q_val, threshold=0.1):
-#     trigm = (
-#         model.objects.annotate(
-#             similarity=TrigramSimilarity(field, q_val),
-#         )
-#         .filter(similarity__gt=threshold)
-#         .order_by("-similarity")
-#     )
-#     ids = trigm.values_list("id", flat=True)
-#     if ids:
-#         preserved = get_preserved_order(ids)
-#         return model.objects.filter(id__in=ids).order_by(preserved)
-#     else:
-#         return model.objects.none()
 
+class QuerySetChain:
+    """
+    The results of the querysets one after another as a sequence for the
+    paginator. The querysets are counted one by one and only the slices of
+    them on the requested page are fetched, thus the cost of a page does not
+    grow with the number of results. The querysets must be ordered
+    deterministically for the pages to be consistent.
+    """
 
-def get_trigram_results(
-    model, model_name, field, q_val, threshold=DEFAULT_TRIGRAM_THRESHOLD
-):
-    sql = f"""SELECT id, similarity({field}, %s) AS sml
-        FROM {model_name}
-        WHERE  similarity({field}, %s) >= {threshold}
-        ORDER BY sml DESC;
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def get_counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return self._counts
+
+    def count(self):
+        return sum(self.get_counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key : key + 1][0]
+        start, stop, _ = key.indices(self.count())
+        results = []
+        offset = 0
+        for queryset, count in zip(self.querysets, self.get_counts()):
+            if start < offset + count and stop > offset:
+                results.extend(queryset[max(start - offset, 0) : stop - offset])
+            offset += count
+        return results
+
+
+def get_preserved_order(ids, field="id"):
     """
-    cursor = connection.cursor()
+    Returns an expression that can be used in the order_by method,
+    ordering will be equal to the order of ids in the ids list.
+    The position of the row is looked up with array_position, thus the size
+    of the query does not grow with the number of ids as with a Case
+    expression having a When branch per id.
+    """
+    return ArrayPosition(
+        Value([int(id) for id in ids], output_field=ArrayField(BigIntegerField())),
+        Cast(field, BigIntegerField()),
+    )
+
+
+def get_trigram_ids(table, field, q_val, threshold=DEFAULT_TRIGRAM_THRESHOLD):
+    """
+    Returns the ids and similarities of the rows whose field is similar to
+    q_val, the most similar first. The similarity threshold is set for the
+    transaction only, so that the % operator can use the trigram indexes of
+    the field. The indexes are GIN indexes, which only serve the % filter, the
+    matching rows are sorted by the distance after it.
+    """
+    query = sql.SQL("""
+        SELECT id, similarity({field}, %s) AS sml FROM {table}
+        WHERE {field} %% %s
+        ORDER BY {field} <-> %s, id
+    """).format(field=sql.Identifier(field), table=sql.Identifier(table))
     try:
-        cursor.execute(sql, [q_val, q_val])
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                [str(threshold)],
+            )
+            cursor.execute(query, [q_val, q_val, q_val])
+            return cursor.fetchall()
     except Exception as e:
         logger.error(f"Error in similarity query: {e}")
         raise ParseError("Similarity query failed.")
-    all_results = cursor.fetchall()
-    ids = [row[0] for row in all_results]
-    objs = model.objects.filter(id__in=ids)
-    return objs
+
+
+def get_trigram_results(
+    model, model_name, field, q_val, threshold=DEFAULT_TRIGRAM_THRESHOLD
+):
+    """
+    Returns a queryset of the objects whose field is similar to q_val,
+    ordered by similarity.
+    """
+    ids = [row[0] for row in get_trigram_ids(model_name, field, q_val, threshold)]
+    return model.objects.filter(id__in=ids).order_by(get_preserved_order(ids))
 
 
 def get_search_exclusions(q):
@@ -1,107 +1,128 @@
-import operator
-from functools import reduce
-
-from django.contrib.postgres.search import SearchVector
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from munigeo.models import Address, AdministrativeDivision
-
-from services.models import Service, ServiceNode, Unit
-from services.search.utils import hyphenate
+from munigeo.models import (
+    Address,
+    AdministrativeDivision,
+)
+
+from observations.models import AllowedValue, ObservableProperty, UnitLatestObservation
+from services.api_cache import response_cache_invalidation_queue
+from services.models import (
+    Announcement,
+    Department,
+    ErrorMessage,
+    MobilityServiceNode,
+    Service,
+    ServiceNode,
+    Unit,
+)
+from services.models.hierarchy import clear_tree_snapshot
+from services.models.unit_node_ancestor import update_unit_node_ancestors
+from services.search.reindex_queue import reindex_queue
+from services.utils import bump_data_version
 
 
 @receiver(post_save, sender=Unit)
-def unit_on_save(sender, **kwargs):
-    obj = kwargs["instance"]
-    generate_syllables(obj)
-    # Do transaction after successful commit.
-    transaction.on_commit(populate_search_column(obj))
-
-
 @receiver(post_save, sender=Service)
-def service_on_save(sender, **kwargs):
-    obj = kwargs["instance"]
-    populate_service_keywords(obj)
-    generate_syllables(obj)
-    transaction.on_commit(populate_search_column(obj))
-
-
 @receiver(post_save, sender=ServiceNode)
-def servicenode_on_save(sender, **kwargs):
-    obj = kwargs["instance"]
-    generate_syllables(obj)
-    # To avoid conflicts with Service names, only index if service_reference is None
-    if not obj.service_reference:
-        transaction.on_commit(populate_search_column(obj))
-
-
 @receiver(post_save, sender=Address)
-def address_on_save(sender, **kwargs):
-    obj = kwargs["instance"]
-    transaction.on_commit(populate_search_column(obj))
-
-
 @receiver(post_save, sender=AdministrativeDivision)
-def administrative_division_on_save(sender, **kwargs):
-    obj = kwargs["instance"]
-    transaction.on_commit(populate_search_column(obj))
-
-
-def generate_syllables(obj):
-    model = obj._meta.model
-    syllables_fi = []
-    for column in obj.get_syllable_fi_columns():
-        row_content = getattr(obj, column, None)
-        if row_content:
-            if isinstance(row_content, str):
-                row_content = row_content.split()
-            for word in row_content:
-                syllables = hyphenate(word)
-                for s in syllables:
-                    syllables_fi.append(s)
-    # Use update instead of save. Save triggers the post_save signal and MPTT building.
-    model.objects.filter(id=obj.id).update(syllables_fi=syllables_fi)
-
-
-def populate_service_keywords(obj):
-    keywords = obj.keywords.all()
-    keywords_fi, keywords_sv, keywords_en = [], [], []
-    for keyword in keywords:
-        if keyword.language == "fi":
-            keywords_fi.append(keyword.name)
-        elif keyword.language == "sv":
-            keywords_sv.append(keyword.name)
-        else:
-            keywords_en.append(keyword.name)
-    Service.objects.filter(id=obj.id).update(
-        keyword_names_fi=keywords_fi,
-        keyword_names_sv=keywords_sv,
-        keyword_names_en=keywords_en,
-    )
+def reindex_on_save(sender, **kwargs):
+    # The syllables, search columns and search_index row of the object are
+    # populated when the reindex queue is flushed, after a successful commit.
+    reindex_queue.add(kwargs["instance"])
 
 
-def populate_search_column(obj):
-    # Get the information of columns and weights to be added to search from the model
-    columns = {}
-    columns["fi"] = obj.get_search_column_indexing("fi")
-    columns["sv"] = obj.get_search_column_indexing("sv")
-    columns["en"] = obj.get_search_column_indexing("en")
-    id = obj.id
+@receiver(post_delete, sender=Unit)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ServiceNode)
+@receiver(post_delete, sender=Address)
+@receiver(post_delete, sender=AdministrativeDivision)
+def reindex_on_delete(sender, **kwargs):
+    # Reindexing a deleted object removes its search_index row, or rebuilds
+    # the row of the remaining ServiceNodes with the same names.
+    reindex_queue.add(kwargs["instance"])
 
-    def on_commit():
-        search_vectors = {}
-        for lang in ["fi", "sv", "en"]:
-            search_vectors[lang] = []
-            for column in columns[lang]:
-                search_vectors[lang].append(
-                    SearchVector(column[0], config=column[1], weight=column[2])
-                )
 
-            # Add all SearchVectors in search_vectors list to search_column.
-            key = f"search_column_{lang}"
-            obj.__class__.objects.filter(id=id).update(
-                **{key: reduce(operator.add, search_vectors[lang])}
-            )
-
-    return on_commit
+@receiver(post_save, sender=ServiceNode)
+@receiver(post_save, sender=MobilityServiceNode)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=ServiceNode)
+@receiver(post_delete, sender=MobilityServiceNode)
+@receiver(post_delete, sender=Department)
+def clear_tree_snapshot_on_change(sender, **kwargs):
+    # The snapshots of the other processes expire with the data version.
+    clear_tree_snapshot(sender)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=MobilityServiceNode)
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=ErrorMessage)
+@receiver(post_save, sender=UnitLatestObservation)
+@receiver(post_save, sender=ObservableProperty)
+@receiver(post_save, sender=AllowedValue)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=MobilityServiceNode)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=ErrorMessage)
+@receiver(post_delete, sender=UnitLatestObservation)
+@receiver(post_delete, sender=ObservableProperty)
+@receiver(post_delete, sender=AllowedValue)
+def bump_data_version_on_change(sender, **kwargs):
+    # The changes of the reindexed models bump the data version when the
+    # reindex queue is flushed.
+    transaction.on_commit(bump_data_version)
+
+
+# The namespaces of the cached responses serializing the models.
+RESPONSE_CACHE_NAMESPACES_BY_MODEL = {
+    AllowedValue: ("service",),
+    Announcement: ("announcement",),
+    Department: ("department",),
+    ErrorMessage: ("error_message",),
+    MobilityServiceNode: ("mobility",),
+    ObservableProperty: ("service",),
+    Service: ("service", "service_node"),
+    ServiceNode: ("service", "service_node"),
+}
+
+
+@receiver(post_save, sender=AllowedValue)
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=ErrorMessage)
+@receiver(post_save, sender=MobilityServiceNode)
+@receiver(post_save, sender=ObservableProperty)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=ServiceNode)
+@receiver(post_delete, sender=AllowedValue)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=ErrorMessage)
+@receiver(post_delete, sender=MobilityServiceNode)
+@receiver(post_delete, sender=ObservableProperty)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ServiceNode)
+def invalidate_response_cache_on_change(sender, **kwargs):
+    response_cache_invalidation_queue.add(*RESPONSE_CACHE_NAMESPACES_BY_MODEL[sender])
+
+
+@receiver(m2m_changed, sender=Unit.service_nodes.through)
+@receiver(m2m_changed, sender=Unit.mobility_service_nodes.through)
+def update_unit_node_ancestors_on_change(sender, instance, action, reverse, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if sender == Unit.mobility_service_nodes.through:
+        node_model = MobilityServiceNode
+    else:
+        node_model = ServiceNode
+    if not reverse:
+        unit_ids = [instance.pk]
+    elif action == "post_clear":
+        # The units of a cleared node are not known anymore.
+        unit_ids = None
+    else:
+        unit_ids = kwargs["pk_set"]
+    update_unit_node_ancestors(node_model, unit_ids)
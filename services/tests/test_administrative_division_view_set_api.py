@@ -3,6 +3,7 @@ from unittest.mock import patch
 import pytest
 from django.conf import settings
 from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.core.management import call_command
 from django.urls import reverse
 from django.utils import timezone
 from munigeo.models import (
@@ -14,8 +15,12 @@ from munigeo.models import (
 from rest_framework.test import APIClient
 
 from services.api import make_muni_ocd_id
-from services.models import Unit
+from services.models import SimplifiedDivisionGeometry, Unit
+from services.models.simplified_division_geometry import (
+    update_simplified_division_geometries,
+)
 from services.tests.utils import get
+from services.utils import get_data_version
 
 
 def create_administrative_divisions():
@@ -245,3 +250,141 @@ def test_translations(api_client):
 
     assert response.data["results"][0]["name"]["fi"] == "Eteläinen"
     assert response.data["results"][0]["name"]["sv"] == "Södra"
+
+
+@pytest.mark.django_db
+def test_boundary_geojson_precision(api_client):
+    create_administrative_divisions()
+    division = AdministrativeDivision.objects.get(name="helsinki")
+    AdministrativeDivisionGeometry.objects.create(
+        division=division, boundary=create_test_area()
+    )
+
+    response = get(
+        api_client,
+        reverse("administrativedivision-list"),
+        data={"municipality": "helsinki", "geometry": "true", "geometry_precision": 3},
+    )
+
+    boundary = response.data["results"][0]["boundary"]
+    assert boundary["type"] == "MultiPolygon"
+    ring = boundary["coordinates"][0][0]
+    assert ring[0] == pytest.approx([24.928, 60.178])
+    for x, y in ring:
+        assert round(x, 3) == x
+        assert round(y, 3) == y
+
+
+@pytest.mark.django_db
+def test_boundary_geojson_tolerance_simplifies(api_client):
+    create_administrative_divisions()
+    division = AdministrativeDivision.objects.get(name="helsinki")
+    AdministrativeDivisionGeometry.objects.create(
+        division=division, boundary=create_test_area()
+    )
+
+    response = get(
+        api_client,
+        reverse("administrativedivision-list"),
+        data={
+            "municipality": "helsinki",
+            "geometry": "true",
+            "geometry_tolerance": 10000,
+        },
+    )
+
+    # The test area is smaller than the tolerance, leaving the minimal ring.
+    ring = response.data["results"][0]["boundary"]["coordinates"][0][0]
+    assert len(ring) == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params", [{"geometry_precision": "-1"}, {"geometry_tolerance": "x"}]
+)
+def test_invalid_geojson_options(api_client, params):
+    response = api_client.get(
+        reverse("administrativedivision-list"), data={"geometry": "true", **params}
+    )
+    assert response.status_code == 400
+
+
+def create_round_area():
+    """
+    Create a round area of a thousand vertices in Helsinki center.
+    """
+    center = Point(385500, 6672000, srid=settings.DEFAULT_SRID)
+    return MultiPolygon(center.buffer(2000, quadsegs=250), srid=settings.DEFAULT_SRID)
+
+
+@pytest.mark.django_db
+def test_update_simplified_division_geometries():
+    create_administrative_divisions()
+    division = AdministrativeDivision.objects.get(name="helsinki")
+    geometry = AdministrativeDivisionGeometry.objects.create(
+        division=division, boundary=create_round_area()
+    )
+    assert not SimplifiedDivisionGeometry.objects.filter(division=division).exists()
+    data_version = get_data_version()
+
+    call_command("update_simplified_division_geometries")
+    assert get_data_version() != data_version
+    simplified = SimplifiedDivisionGeometry.objects.get(division=division)
+    assert (
+        geometry.boundary.num_points
+        > simplified.boundary_10.num_points
+        > simplified.boundary_50.num_points
+        > simplified.boundary_250.num_points
+    )
+
+    geometry.boundary = create_test_area()
+    geometry.save()
+    call_command("update_simplified_division_geometries")
+    simplified.refresh_from_db()
+    assert simplified.boundary_10.num_points == 5
+
+    geometry.delete()
+    call_command("update_simplified_division_geometries")
+    assert not SimplifiedDivisionGeometry.objects.filter(division=division).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params,expected_field",
+    [
+        ({}, None),
+        ({"simplify": 60}, "boundary_50"),
+        ({"zoom": 8}, "boundary_250"),
+        ({"zoom": 14}, None),
+    ],
+)
+def test_simplified_boundary_parameters(api_client, params, expected_field):
+    create_administrative_divisions()
+    division = AdministrativeDivision.objects.get(name="helsinki")
+    geometry = AdministrativeDivisionGeometry.objects.create(
+        division=division, boundary=create_round_area()
+    )
+    update_simplified_division_geometries()
+    if expected_field is None:
+        expected = geometry.boundary
+    else:
+        simplified = SimplifiedDivisionGeometry.objects.get(division=division)
+        expected = getattr(simplified, expected_field)
+
+    response = get(
+        api_client,
+        reverse("administrativedivision-list"),
+        data={"municipality": "helsinki", "geometry": "true", **params},
+    )
+
+    boundary = response.data["results"][0]["boundary"]
+    assert len(boundary["coordinates"][0][0]) == expected.num_points
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{"simplify": "-1"}, {"zoom": "x"}])
+def test_invalid_simplified_boundary_parameters(api_client, params):
+    response = api_client.get(
+        reverse("administrativedivision-list"), data={"geometry": "true", **params}
+    )
+    assert response.status_code == 400
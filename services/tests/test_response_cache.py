@@ -0,0 +1,109 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from services.api_cache import invalidate_response_cache
+from services.management.commands.services_import.services import update_service_counts
+from services.models import Service
+from services.tests.test_service_node_view_set_api import create_municipality
+from services.tests.test_service_view_set_api import create_services
+from services.tests.utils import get
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.mark.django_db
+def test_response_is_cached(api_client, shared_cache, django_assert_num_queries):
+    create_services()
+    url = reverse("service-list")
+    response = get(api_client, url)
+    assert response["X-Cache"] == "MISS"
+
+    with django_assert_num_queries(0):
+        cached_response = get(api_client, url)
+    assert cached_response["X-Cache"] == "HIT"
+    assert cached_response.data == response.data
+
+    response = get(api_client, url, data={"id": "2,3"})
+    assert response["X-Cache"] == "MISS"
+    response = api_client.get(url, HTTP_ACCEPT="text/html")
+    assert response["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_response_cache_namespace_invalidation(api_client, shared_cache):
+    create_services()
+    url = reverse("service-list")
+    get(api_client, url)
+
+    invalidate_response_cache("department")
+    assert get(api_client, url)["X-Cache"] == "HIT"
+    invalidate_response_cache("service")
+    assert get(api_client, url)["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_response_cache_is_invalidated_on_save(
+    api_client, shared_cache, django_capture_on_commit_callbacks
+):
+    create_services()
+    url = reverse("service-detail", kwargs={"pk": 1})
+    get(api_client, url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Service.objects.filter(pk=1).first().save()
+    response = get(api_client, url)
+    assert response["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_purge_response_cache(api_client, shared_cache):
+    create_services()
+    url = reverse("service-list")
+    get(api_client, url)
+
+    call_command("purge_response_cache", "service_node")
+    assert get(api_client, url)["X-Cache"] == "HIT"
+    call_command("purge_response_cache")
+    assert get(api_client, url)["X-Cache"] == "MISS"
+
+    with pytest.raises(CommandError):
+        call_command("purge_response_cache", "unknown")
+
+
+@pytest.mark.django_db
+def test_response_cache_is_invalidated_on_count_update(
+    api_client, shared_cache, django_capture_on_commit_callbacks
+):
+    create_services()
+    create_municipality()
+    url = reverse("service-list")
+    get(api_client, url)
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        update_service_counts()
+        # The responses are invalidated only when the counts are committed.
+        assert get(api_client, url)["X-Cache"] == "HIT"
+    assert callbacks
+    assert get(api_client, url)["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+def test_response_cache_disabled(api_client, shared_cache):
+    create_services()
+    response = get(api_client, reverse("service-list"))
+    assert "X-Cache" not in response
+
+
+@pytest.mark.django_db
+def test_response_cache_requires_shared_cache(api_client):
+    create_services()
+    response = get(api_client, reverse("service-list"))
+    assert "X-Cache" not in response
@@ -1,6 +1,8 @@
 from datetime import UTC, datetime
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from munigeo.models import (
     AdministrativeDivision,
@@ -122,3 +124,44 @@ def test_service_node_fields(api_client):
     assert response.data["root"] == 1400
     assert response.data["unit_count"]["municipality"] == {"helsinki": 1}
     assert response.data["unit_count"]["total"] == 1
+
+
+@pytest.mark.django_db
+def test_service_node_ancestors(api_client):
+    create_service_nodes()
+    response = get(
+        api_client,
+        reverse("servicenode-detail", kwargs={"pk": 11}),
+        {"include": "ancestors"},
+    )
+    ancestors = response.data["ancestors"]
+    assert [ancestor["id"] for ancestor in ancestors] == [8, 1400]
+    assert ancestors[0]["name"]["fi"] == "Vuokra-asuminen"
+    assert ancestors[0]["root"] == 1400
+    assert ancestors[0]["period_enabled"] is False
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params", [{"ancestor": 1400}, {"ancestor": 1400, "include": "ancestors"}]
+)
+def test_service_node_list_query_count_is_independent_of_page_size(api_client, params):
+    create_service_nodes()
+    for id in range(100, 105):
+        ServiceNode.objects.create(
+            id=id, name=f"Palvelu {id}", parent_id=11, last_modified_time=MODIFIED_TIME
+        )
+    # Load the tree snapshot, which is queried once per data version.
+    get(api_client, reverse("servicenode-list"), params)
+
+    query_counts = []
+    for page_size in (1, 8):
+        with CaptureQueriesContext(connection) as context:
+            get(
+                api_client,
+                reverse("servicenode-list"),
+                {**params, "page_size": page_size},
+            )
+        query_counts.append(len(context.captured_queries))
+
+    assert query_counts[0] == query_counts[1]
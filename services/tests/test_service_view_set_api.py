@@ -8,6 +8,7 @@ from services.management.commands.services_import.services import update_service
 from services.models import Service, ServiceNode, Unit
 from services.tests.test_service_node_view_set_api import create_municipality
 from services.tests.utils import get
+from services.utils import bump_data_version
 
 MODIFIED_TIME = datetime(
     year=2023, month=1, day=1, hour=1, minute=1, second=1, tzinfo=UTC
@@ -82,3 +83,39 @@ def test_id_filter(api_client):
     assert response.data["count"] == 2
     assert response.data["results"][0]["id"] == 3
     assert response.data["results"][1]["id"] == 2
+
+
+@pytest.mark.django_db
+def test_conditional_get(api_client, shared_cache, django_assert_num_queries):
+    create_services()
+    url = reverse("service-list")
+    response = get(api_client, url)
+    etag = response["ETag"]
+    last_modified = response["Last-Modified"]
+
+    with django_assert_num_queries(0):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    with django_assert_num_queries(0):
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+
+    response = get(api_client, url, data={"id": "2,3"})
+    assert response["ETag"] != etag
+
+    bump_data_version()
+    response = get(api_client, url)
+    assert response["ETag"] != etag
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_conditional_get_requires_shared_cache(api_client):
+    create_services()
+    response = get(api_client, reverse("service-list"))
+    assert "ETag" not in response
+    assert "Last-Modified" not in response
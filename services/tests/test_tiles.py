@@ -0,0 +1,197 @@
+from datetime import datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.test import override_settings
+from django.urls import reverse
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionGeometry,
+    AdministrativeDivisionType,
+)
+from rest_framework.test import APIClient
+
+from services.models import Unit
+from services.models.simplified_division_geometry import (
+    update_simplified_division_geometries,
+)
+from services.tests.test_administrative_division_view_set_api import (
+    create_test_area,
+)
+from services.tests.utils import get, get_test_location
+from services.tiles import (
+    MVT_CONTENT_TYPE,
+    MVT_EXTENT,
+    WEB_MERCATOR_SRID,
+    get_tile_bounds,
+)
+
+# The zoom level 10 tile of the Helsinki center.
+TILE = {"z": 10, "x": 582, "y": 296}
+# A tile in the Pacific Ocean.
+EMPTY_TILE = {"z": 10, "x": 0, "y": 0}
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def units():
+    now = datetime.now(ZoneInfo("UTC"))
+    Unit.objects.create(
+        id=1,
+        name_fi="Keskusta",
+        last_modified_time=now,
+        location=get_test_location(24.94, 60.17, 4326),
+    )
+    Unit.objects.create(id=2, name_fi="Ei sijaintia", last_modified_time=now)
+
+
+@pytest.fixture
+def division():
+    division_type = AdministrativeDivisionType.objects.create(type="district")
+    division = AdministrativeDivision.objects.create(
+        type=division_type, name="Kluuvi", ocd_id="ocd-division/test/kluuvi"
+    )
+    AdministrativeDivisionGeometry.objects.create(
+        division=division, boundary=create_test_area()
+    )
+    update_simplified_division_geometries()
+    return division
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def read_fields(data):
+    """
+    Yields the field numbers and the values of a protocol buffers message,
+    the varints as integers and the length-delimited fields as bytes.
+    """
+    pos = 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        wire_type = key & 0x7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 2:
+            length, pos = read_varint(data, pos)
+            value, pos = data[pos : pos + length], pos + length
+        else:
+            pos += 8 if wire_type == 1 else 4
+            continue
+        yield key >> 3, value
+
+
+def decode_tile_points(tile):
+    """
+    Returns the tile coordinates of the point features of a vector tile.
+    """
+    points = []
+    for field, layer in read_fields(tile):
+        if field != 3:
+            continue
+        for field, feature in read_fields(layer):
+            if field != 2:
+                continue
+            geometry = dict(read_fields(feature))[4]
+            pos, commands = 0, []
+            while pos < len(geometry):
+                value, pos = read_varint(geometry, pos)
+                commands.append(value)
+            # A single MoveTo command with zigzag encoded coordinates.
+            assert commands[0] == 9
+            x, y = ((v >> 1) ^ -(v & 1) for v in commands[1:3])
+            points.append((x, y))
+    return points
+
+
+def tile_url(layer, tile):
+    return reverse("tile", kwargs={"layer": layer, **tile})
+
+
+@pytest.mark.django_db
+def test_unit_tile(api_client, units):
+    response = get(api_client, tile_url("unit", TILE))
+    assert response["Content-Type"] == MVT_CONTENT_TYPE
+    assert len(response.content) > 0
+    assert b"Keskusta" in response.content
+
+    response = get(api_client, tile_url("unit", EMPTY_TILE))
+    assert response.content == b""
+
+
+@pytest.mark.django_db
+def test_unit_tile_coordinates(api_client, units):
+    response = get(api_client, tile_url("unit", TILE))
+    [(x, y)] = decode_tile_points(response.content)
+
+    location = Point(24.94, 60.17, srid=4326)
+    location.transform(WEB_MERCATOR_SRID)
+    left, bottom, right, top = get_tile_bounds(**TILE).extent
+    # The y axis of the tile coordinates points down.
+    assert abs(x - (location.x - left) / (right - left) * MVT_EXTENT) <= 1
+    assert abs(y - (top - location.y) / (top - bottom) * MVT_EXTENT) <= 1
+
+
+@pytest.mark.django_db
+def test_unit_tile_is_filtered_like_unit_list(api_client, units):
+    response = get(api_client, tile_url("unit", TILE), data={"id": "2"})
+    assert response.content == b""
+
+
+@pytest.mark.django_db
+def test_division_tile(api_client, division):
+    response = get(api_client, tile_url("division", TILE), data={"type": "district"})
+    assert response["Content-Type"] == MVT_CONTENT_TYPE
+    assert b"Kluuvi" in response.content
+
+    response = get(api_client, tile_url("division", TILE), data={"type": "muni"})
+    assert response.content == b""
+
+
+@pytest.mark.django_db
+def test_division_tile_requires_type(api_client, division):
+    response = api_client.get(tile_url("division", TILE))
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_invalid_tile(api_client):
+    response = api_client.get(tile_url("unknown", TILE))
+    assert response.status_code == 404
+    response = api_client.get(tile_url("unit", {"z": 1, "x": 2, "y": 0}))
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+@override_settings(TILE_CACHE_TIMEOUT=60)
+def test_tile_is_cached(api_client, units, shared_cache):
+    url = tile_url("unit", TILE)
+    response = get(api_client, url)
+    with patch("services.tiles.render_tile") as render_tile:
+        cached_response = get(api_client, url)
+    render_tile.assert_not_called()
+    assert cached_response.content == response.content
+
+
+@pytest.mark.django_db
+@override_settings(TILE_CACHE_TIMEOUT=60)
+def test_tile_cache_requires_shared_cache(api_client, units):
+    url = tile_url("unit", TILE)
+    get(api_client, url)
+    with patch("services.tiles.render_tile", return_value=b"") as render_tile:
+        get(api_client, url)
+    render_tile.assert_called_once()
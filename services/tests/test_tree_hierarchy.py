@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+
+from services.models import ServiceNode
+from services.models.hierarchy import clear_tree_snapshot, get_tree_snapshot
+
+MODIFIED_TIME = datetime.datetime(
+    year=2023, month=1, day=1, hour=1, minute=1, second=1, tzinfo=datetime.UTC
+)
+
+
+@pytest.fixture
+def service_nodes():
+    clear_tree_snapshot(ServiceNode)
+    for id, parent_id in [
+        (1, None),
+        (2, 1),
+        (3, 2),
+        (4, 3),
+        (5, 1),
+        (6, None),
+        (7, 6),
+    ]:
+        ServiceNode.objects.create(
+            id=id,
+            name_fi=f"Palvelu {id}",
+            parent_id=parent_id,
+            last_modified_time=MODIFIED_TIME,
+        )
+    return ServiceNode.objects.all()
+
+
+@pytest.mark.django_db
+def test_by_ancestors(service_nodes):
+    def descendant_ids(ancestors):
+        return set(
+            ServiceNode.objects.all()
+            .by_ancestors(ancestors)
+            .values_list("id", flat=True)
+        )
+
+    assert descendant_ids([1]) == {2, 3, 4, 5}
+    assert descendant_ids(["2"]) == {3, 4}
+    assert descendant_ids([ServiceNode.objects.get(id=3), 6]) == {4, 7}
+    assert descendant_ids([4]) == set()
+    assert descendant_ids([]) == set()
+
+
+@pytest.mark.django_db
+def test_tree_snapshot_ancestors(service_nodes, django_assert_num_queries):
+    snapshot = get_tree_snapshot(ServiceNode)
+    with django_assert_num_queries(0):
+        assert get_tree_snapshot(ServiceNode) is snapshot
+        assert snapshot.get_ancestor_ids(4) == [3, 2, 1]
+        assert snapshot.get_ancestor_ids("7") == [6]
+        assert snapshot.get_ancestor_ids(999) is None
+
+    # Saving a node clears the snapshot of the process.
+    ServiceNode.objects.create(
+        id=8, name_fi="Palvelu 8", parent_id=4, last_modified_time=MODIFIED_TIME
+    )
+    assert get_tree_snapshot(ServiceNode).get_ancestor_ids(8) == [4, 3, 2, 1]
+
+
+@pytest.mark.django_db
+def test_tree_snapshot_roots(service_nodes, django_assert_num_queries):
+    snapshot = get_tree_snapshot(ServiceNode)
+    root_tree_ids = {
+        node.id: node.tree_id for node in service_nodes if node.parent_id is None
+    }
+    assert snapshot.root_ids == {tree_id: id for id, tree_id in root_tree_ids.items()}
+    assert snapshot.get_root_id(4) == 1
+    assert snapshot.get_root_id("7") == 6
+    assert snapshot.get_root_id(999) is None
+
+    with django_assert_num_queries(1):
+        roots = snapshot.get_roots()
+        assert {root.id for root in roots.values()} == {1, 6}
+        assert snapshot.get_roots() is roots
@@ -7,6 +7,7 @@ from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
 from services.models import AccessibilityVariable, Unit, UnitAccessibilityProperty
+from services.utils import get_data_version
 from services.utils.accessibility_shortcoming_calculator import OperatorError
 
 
@@ -113,8 +114,10 @@ def create_rule(ruleset):
 @pytest.mark.django_db
 def test_calculate_shortcomings_no_properties(unit, patch_rules):
     patch_rules({"1": create_rule(("EQ", 0, None))}, ["message"])
+    data_version = get_data_version()
 
     call_command("calculate_accessibility_shortcomings")
+    assert get_data_version() != data_version
 
     shortcomings = Unit.objects.get(id=unit.id).accessibility_shortcomings
     assert shortcomings.accessibility_shortcoming_count == {}
@@ -0,0 +1,48 @@
+import datetime
+
+import pytest
+
+from services.models import ServiceNode, Unit, UnitServiceNodeAncestor
+from services.models.unit_node_ancestor import update_unit_node_ancestors
+
+MODIFIED_TIME = datetime.datetime(
+    year=2023, month=1, day=1, hour=1, minute=1, second=1, tzinfo=datetime.UTC
+)
+
+
+def get_ancestor_rows():
+    return set(
+        UnitServiceNodeAncestor.objects.values_list("unit_id", "service_node_id")
+    )
+
+
+@pytest.fixture
+def service_nodes():
+    for id, parent_id in [(1, None), (2, 1), (3, 2), (4, None)]:
+        ServiceNode.objects.create(
+            id=id,
+            name_fi=f"Palvelu {id}",
+            parent_id=parent_id,
+            last_modified_time=MODIFIED_TIME,
+        )
+    return ServiceNode.objects.all()
+
+
+@pytest.mark.django_db
+def test_unit_service_node_ancestors(service_nodes):
+    unit_1 = Unit.objects.create(id=1, last_modified_time=MODIFIED_TIME)
+    unit_2 = Unit.objects.create(id=2, last_modified_time=MODIFIED_TIME)
+
+    # Changing the service nodes of a unit updates its ancestors.
+    unit_1.service_nodes.add(3)
+    unit_2.service_nodes.add(2, 4)
+    assert get_ancestor_rows() == {(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (2, 4)}
+    unit_2.service_nodes.remove(4)
+    assert get_ancestor_rows() == {(1, 1), (1, 2), (1, 3), (2, 1), (2, 2)}
+
+    # Moving a node is only reflected after a refresh.
+    ServiceNode.objects.filter(id=3).update(parent=None)
+    ServiceNode.objects.rebuild()
+    assert update_unit_node_ancestors(ServiceNode) == (2, 0)
+    assert get_ancestor_rows() == {(1, 3), (2, 1), (2, 2)}
+    assert update_unit_node_ancestors(ServiceNode) == (0, 0)
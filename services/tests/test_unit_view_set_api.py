@@ -1,8 +1,12 @@
+import json
+import re
+from collections import OrderedDict
 from datetime import datetime
+from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
 import pytest
-from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Point, Polygon
 from django.db import connection
 from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
@@ -10,13 +14,16 @@ from munigeo import api as munigeo_api
 from munigeo.api import DEFAULT_SRS
 from munigeo.models import (
     AdministrativeDivision,
+    AdministrativeDivisionGeometry,
     AdministrativeDivisionType,
     Municipality,
 )
 from pytest_django.asserts import assertNumQueries
 from rest_framework.test import APIClient
 
+from services import fast_serializer
 from services.api import make_muni_ocd_id
+from services.api_pagination import estimate_count
 from services.models import (
     Department,
     Keyword,
@@ -24,6 +31,7 @@ from services.models import (
     Service,
     ServiceNode,
     Unit,
+    UnitAccessibilityShortcomings,
     UnitAlias,
     UnitConnection,
     UnitEntrance,
@@ -31,6 +39,7 @@ from services.models import (
 )
 from services.models.unit import PROJECTION_SRID
 from services.tests.utils import get
+from services.utils import bump_data_version
 
 UTC_TIMEZONE = ZoneInfo("UTC")
 
@@ -855,8 +864,6 @@ def _populate_units_with_relations():
         unit.municipality = municipality
         unit.displayed_service_owner_type = "MUNICIPAL_SERVICE"
         unit.save()
-        # Both units must share the same service node tree, otherwise the root
-        # node lookup legitimately costs one query per distinct tree.
         unit.service_nodes.add(service_nodes[0], service_nodes[1])
         unit.keywords.add(keyword)
         unit.services.add(service)
@@ -898,6 +905,9 @@ def test_unit_list_query_count_is_independent_of_page_size(api_client, params):
     trigger a query of its own.
     """
     _populate_units_with_relations()
+    # Load the process-wide lookups, e.g. the service node tree snapshot,
+    # which are queried once per data version, not once per request.
+    get(api_client, reverse("unit-list"), data=params)
 
     query_counts = []
     for page_size in (1, 5):
@@ -934,3 +944,328 @@ def test_unit_list_only_parameter_limits_returned_fields(api_client):
     assert results
     for result in results:
         assert set(result.keys()) == {"id", "name", "street_address"}
+
+
+@pytest.mark.django_db
+def test_unit_list_kml_is_streamed(api_client):
+    create_units()
+    Unit.objects.filter(id=1).update(name_fi="Yksikkö", street_address_fi="Katu 1")
+
+    response = api_client.get(reverse("unit-list"), data={"format": "kml"})
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Disposition"] == "attachment; filename=palvelukartta.kml"
+    content = b"".join(response.streaming_content).decode()
+    assert content.startswith("<?xml")
+    assert content.rstrip().endswith("</kml>")
+    placemark_ids = re.findall(r'<Placemark id="(\d+)">', content)
+    assert sorted(placemark_ids) == ["1", "2", "3", "4", "7"]
+    assert "<name>Yksikkö</name>" in content
+
+
+@pytest.mark.django_db
+def test_unit_list_kml_invalid_language(api_client):
+    create_units()
+    response = api_client.get(
+        reverse("unit-list"), data={"format": "kml", "language": "de"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("format", ["kml", "geojson"])
+def test_unit_list_streaming_invalid_parameter(api_client, format):
+    create_units()
+    response = api_client.get(
+        reverse("unit-list"), data={"format": format, "municipality": "nonexistent"}
+    )
+    assert response.status_code == 400
+    assert not response.streaming
+
+
+@pytest.mark.django_db
+def test_unit_list_geojson_is_streamed(api_client):
+    create_units()
+    Unit.objects.filter(id=1).update(
+        location=Point(385000, 6672000, srid=PROJECTION_SRID), name_fi="Yksikkö"
+    )
+
+    response = api_client.get(reverse("unit-list"), data={"format": "geojson"})
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/geo+json"
+    collection = json.loads(b"".join(response.streaming_content))
+    assert collection["type"] == "FeatureCollection"
+    features = {feature["id"]: feature for feature in collection["features"]}
+    assert sorted(features) == [1, 2, 3, 4, 7]
+    feature = features[1]
+    assert feature["type"] == "Feature"
+    assert feature["geometry"]["type"] == "Point"
+    assert feature["properties"]["name"] == {"fi": "Yksikkö"}
+    assert "location" not in feature["properties"]
+
+
+@pytest.mark.django_db
+def test_unit_retrieve_geojson(api_client):
+    create_units()
+    response = api_client.get(
+        reverse("unit-detail", kwargs={"pk": 1}), data={"format": "geojson"}
+    )
+    assert response.status_code == 200
+    feature = json.loads(response.content)
+    assert feature["type"] == "Feature"
+    assert feature["id"] == 1
+
+
+FAST_SERIALIZER_QUERY_SHAPES = [
+    {},
+    {"only": "name,street_address"},
+    {
+        "only": "street_address,location,name,municipality,department,"
+        "root_department,accessibility_shortcoming_count,contract_type,"
+        "organizer_type,provider_type,root_service_nodes,picture_url",
+        "geometry": "true",
+    },
+    {"only": "name,location", "lat": "60.17", "lon": "24.94", "srid": "3067"},
+    {"only": "name,extensions,created_time", "accessibility_description": "true"},
+    {"only": "name,services"},
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", FAST_SERIALIZER_QUERY_SHAPES)
+def test_unit_list_fast_serializer_output_is_identical(api_client, params):
+    _populate_units_with_relations()
+    Unit.objects.filter(id=1).update(
+        location=Point(385000, 6672000, srid=PROJECTION_SRID),
+        name_fi="Yksikkö",
+        name_sv="Enhet",
+        root_service_nodes="513,600",
+        extensions={"maintenance_group": "kaikki"},
+    )
+    UnitAccessibilityShortcomings.objects.update_or_create(
+        unit_id=1, defaults={"accessibility_shortcoming_count": {"rollator": 2}}
+    )
+
+    responses = [
+        get(
+            api_client,
+            reverse("unit-list"),
+            data={**params, "fast_serializer": fast_serializer},
+        )
+        for fast_serializer in ("false", "true")
+    ]
+    assert responses[0].content == responses[1].content
+
+
+@pytest.mark.django_db
+def test_unit_list_field_plans_are_bounded(api_client, monkeypatch):
+    create_units()
+    field_plans = OrderedDict()
+    monkeypatch.setattr(fast_serializer, "_field_plans", field_plans)
+    monkeypatch.setattr(fast_serializer, "FIELD_PLAN_CACHE_SIZE", 2)
+
+    # Unknown and repeated names of the only parameter share the plan.
+    for only in ("name", "name,unknown", "name,name"):
+        get(
+            api_client,
+            reverse("unit-list"),
+            data={"only": only, "fast_serializer": "true"},
+        )
+    assert len(field_plans) == 1
+
+    for only in ("name,street_address", "street_address", "name"):
+        get(
+            api_client,
+            reverse("unit-list"),
+            data={"only": only, "fast_serializer": "true"},
+        )
+    assert len(field_plans) == 2
+    assert set(list(field_plans)[-1][0]) == {"id", "name"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("srid", [None, "3067"])
+def test_unit_list_geometries_are_transformed_in_query(api_client, srid):
+    create_units()
+    location = Point(385000, 6672000, srid=PROJECTION_SRID)
+    geometry = GEOSGeometry(
+        "LINESTRING (385000 6672000, 385100 6672100)", srid=PROJECTION_SRID
+    )
+    Unit.objects.filter(id=1).update(location=location, geometry=geometry)
+    params = {"id": "1", "geometry": "true"}
+    srs = DEFAULT_SRS
+    if srid:
+        params["srid"] = srid
+        srs = munigeo_api.srid_to_srs(srid)
+
+    response = get(api_client, reverse("unit-list"), data=params)
+    unit = response.json()["results"][0]
+    assert unit["location"] == munigeo_api.geom_to_json(location, srs)
+    expected_geometry = munigeo_api.geom_to_json(geometry, srs)
+    assert unit["geometry"]["type"] == expected_geometry["type"]
+    for coords, expected_coords in zip(
+        unit["geometry"]["coordinates"], expected_geometry["coordinates"]
+    ):
+        assert coords == pytest.approx(expected_coords)
+
+
+@pytest.mark.django_db
+def test_division_filter(api_client):
+    create_units()
+    division_type = AdministrativeDivisionType.objects.create(type="district")
+    for name, x in ("west", 384000), ("east", 386000):
+        division = AdministrativeDivision.objects.create(
+            type=division_type,
+            name=name,
+            ocd_id=make_muni_ocd_id("helsinki", f"district:{name}"),
+        )
+        AdministrativeDivisionGeometry.objects.create(
+            division=division,
+            boundary=MultiPolygon(
+                Polygon.from_bbox((x, 6671000, x + 1000, 6672000)),
+                srid=PROJECTION_SRID,
+            ),
+        )
+    Unit.objects.filter(id=1).update(
+        location=Point(384500, 6671500, srid=PROJECTION_SRID)
+    )
+    Unit.objects.filter(id=3).update(
+        location=Point(386500, 6671500, srid=PROJECTION_SRID)
+    )
+    Unit.objects.filter(id=4).update(
+        location=Point(385500, 6671500, srid=PROJECTION_SRID)
+    )
+
+    response = get(
+        api_client, reverse("unit-list"), data={"division": "helsinki/district:west"}
+    )
+    assert [unit["id"] for unit in response.data["results"]] == [1]
+    response = get(
+        api_client,
+        reverse("unit-list"),
+        data={"division": "helsinki/district:west,helsinki/district:east"},
+    )
+    assert sorted(unit["id"] for unit in response.data["results"]) == [1, 3]
+
+
+@pytest.mark.django_db
+def test_unit_list_cursor_pagination(api_client):
+    create_units()
+    expected_ids = sorted(
+        Unit.objects.filter(public=True, is_active=True).values_list("id", flat=True)
+    )
+
+    ids = []
+    url = reverse("unit-list") + "?pagination=cursor&page_size=1"
+    while url:
+        data = get(api_client, url).json()
+        assert "count" not in data
+        ids += [unit["id"] for unit in data["results"]]
+        url = data["next"]
+    assert ids == expected_ids
+
+
+@pytest.mark.django_db
+def test_unit_list_cursor_pagination_by_distance(api_client):
+    create_units()
+    for unit_id, latitude in ((1, 60.17), (2, 60.2), (3, 60.18)):
+        unit = Unit.objects.get(id=unit_id)
+        unit.location = Point(24.94, latitude, srid=4326)
+        unit.location.transform(PROJECTION_SRID)
+        unit.save()
+
+    ids = []
+    url = reverse("unit-list") + (
+        "?pagination=cursor&page_size=1&lat=60.17&lon=24.94&distance=10000"
+    )
+    while url:
+        data = get(api_client, url).json()
+        ids += [unit["id"] for unit in data["results"]]
+        url = data["next"]
+    assert ids == [1, 3, 2]
+
+
+@pytest.mark.django_db
+def test_unit_list_without_count(api_client):
+    create_units()
+    unit_count = Unit.objects.filter(public=True, is_active=True).count()
+
+    params = {"count": "false", "page_size": 1}
+    data = get(api_client, reverse("unit-list"), data=params).json()
+    assert data["count"] is None
+    assert data["next"] is not None
+    data = get(
+        api_client, reverse("unit-list"), data={**params, "page": unit_count}
+    ).json()
+    assert len(data["results"]) == 1
+    assert data["next"] is None
+
+    response = api_client.get(
+        reverse("unit-list"), data={**params, "page": unit_count + 1}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_unit_list_invalid_pagination(api_client):
+    response = api_client.get(reverse("unit-list"), data={"pagination": "offset"})
+    assert response.status_code == 400
+    response = api_client.get(reverse("unit-list"), data={"count": "maybe"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_unit_list_count_is_cached(api_client, shared_cache):
+    create_units()
+    params = {"municipality": "helsinki", "page_size": 1}
+
+    def count_queries():
+        with CaptureQueriesContext(connection) as context:
+            response = get(api_client, reverse("unit-list"), data=params)
+        queries = [query["sql"] for query in context.captured_queries]
+        return response.data["count"], sum("__count" in sql for sql in queries)
+
+    count, queries = count_queries()
+    assert queries == 1
+    # The count is cached regardless of the page.
+    params["page"] = 2
+    assert count_queries() == (count, 0)
+
+    bump_data_version()
+    assert count_queries() == (count, 1)
+
+
+@pytest.mark.django_db
+def test_unit_list_estimated_count(api_client):
+    create_units()
+    unit_count = Unit.objects.filter(public=True, is_active=True).count()
+    params = {"count": "estimate"}
+
+    # Small lists are counted exactly.
+    response = get(api_client, reverse("unit-list"), data=params)
+    assert response.data["count"] == unit_count
+
+    with patch("services.api_pagination.estimate_count", return_value=5000):
+        response = get(api_client, reverse("unit-list"), data=params)
+    assert response.data["count"] == 5000
+
+
+@pytest.mark.django_db
+def test_estimate_count():
+    create_units()
+    estimate = estimate_count(Unit.objects.filter(public=True))
+    assert isinstance(estimate, int)
+    assert estimate >= 0
+
+
+@pytest.mark.django_db
+def test_unit_list_conditional_get_excludes_observations(api_client, shared_cache):
+    create_units()
+    response = get(api_client, reverse("unit-list"))
+    assert "ETag" in response
+
+    # The expired observations are left out without a data version change.
+    response = get(api_client, reverse("unit-list"), data={"include": "observations"})
+    assert "ETag" not in response
+    assert "Last-Modified" not in response
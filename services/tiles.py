@@ -0,0 +1,186 @@
+"""
+Mapbox vector tiles of the units and the administrative divisions.
+
+The tiles are generated by PostGIS with ST_AsMVT from the same querysets the
+list endpoints use, and cached by the tile, the query parameters and the data
+version, thus bumping the data version invalidates all the cached tiles. The
+tiles are cached only when the default cache is shared by the processes.
+"""
+
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import GeoFunc, Transform
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BinaryField, F
+from django.http import HttpResponse
+from munigeo import api as munigeo_api
+from munigeo.models import AdministrativeDivision
+from psycopg import sql
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.views import APIView
+
+from services.api import UnitViewSet
+from services.models.simplified_division_geometry import (
+    get_simplified_boundary_field,
+    get_zoom_tolerance,
+)
+from services.utils import get_data_version, is_cache_shared
+
+TILE_CACHE_KEY_PREFIX = "tile"
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_EXTENT = 4096
+# The features are selected from and clipped to the tile extended by the
+# buffer, in the tile coordinates, so that the features on the tile edges are
+# drawn whole.
+MVT_BUFFER = 64
+MAX_TILE_ZOOM = 22
+WEB_MERCATOR_SRID = 3857
+# Half of the width of the Web Mercator world in meters.
+WEB_MERCATOR_BOUND = 20037508.342789244
+
+
+class AsMVTGeom(GeoFunc):
+    geom_param_pos = (0, 1)
+    template = f"%(function)s(%(expressions)s, {MVT_EXTENT}, {MVT_BUFFER})"
+    # The geometry in the tile coordinates is only selected by ST_AsMVT, it is
+    # never loaded by Django.
+    output_field = BinaryField()
+
+
+def get_tile_bounds(z, x, y, buffer=0):
+    """
+    Returns the bounds of the tile in Web Mercator, extended by the buffer
+    given in the tile coordinates.
+    """
+    size = 2 * WEB_MERCATOR_BOUND / 2**z
+    buffer = size * buffer / MVT_EXTENT
+    left = -WEB_MERCATOR_BOUND + x * size
+    top = WEB_MERCATOR_BOUND - y * size
+    bounds = Polygon.from_bbox(
+        (left - buffer, top - size - buffer, left + size + buffer, top + buffer)
+    )
+    bounds.srid = WEB_MERCATOR_SRID
+    return bounds
+
+
+def is_tile_cache_enabled():
+    # The data version keying the tiles is not shared by a local cache.
+    return settings.TILE_CACHE_TIMEOUT > 0 and is_cache_shared()
+
+
+def get_tile_cache_key(request, layer, z, x, y):
+    params = sorted(
+        (key, request.query_params.getlist(key)) for key in request.query_params
+    )
+    key = json.dumps([get_data_version(), layer, z, x, y, params])
+    return f"{TILE_CACHE_KEY_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def get_unit_features(request, envelope, bounds):
+    """
+    Returns the units within the bounds filtered like the unit list, with the
+    geometries in the coordinates of the tile of the envelope.
+    """
+    srs = munigeo_api.srid_to_srs(request.query_params.get("srid"))
+    viewset = UnitViewSet(request=request, srs=srs)
+    queryset = viewset.filter_units(UnitViewSet.queryset.all())
+    return queryset.filter(location__intersects=bounds).values(
+        "id",
+        "name_fi",
+        "name_sv",
+        "name_en",
+        "municipality_id",
+        mvt_geom=AsMVTGeom(Transform("location", WEB_MERCATOR_SRID), envelope),
+    )
+
+
+def get_division_features(request, z, envelope, bounds):
+    """
+    Returns the administrative divisions within the bounds of the types given
+    by the type parameter, with the boundaries simplified for the zoom level
+    in the coordinates of the tile of the envelope.
+    """
+    types = [t for t in request.query_params.get("type", "").strip().split(",") if t]
+    if not types:
+        raise ParseError("'type' is required for the division layer")
+    queryset = AdministrativeDivision.objects.all()
+    if all(re.match(r"^[\d]+$", t) for t in types):
+        queryset = queryset.filter(type__in=types)
+    else:
+        queryset = queryset.filter(type__type__in=types)
+    field_name = get_simplified_boundary_field(get_zoom_tolerance(z))
+    if field_name is None:
+        boundary_field = "geometry__boundary"
+    else:
+        boundary_field = f"simplified_geometry__{field_name}"
+    return queryset.filter(**{f"{boundary_field}__intersects": bounds}).values(
+        "id",
+        "ocd_id",
+        "origin_id",
+        "name_fi",
+        "name_sv",
+        "name_en",
+        "municipality_id",
+        division_type=F("type__type"),
+        mvt_geom=AsMVTGeom(Transform(boundary_field, WEB_MERCATOR_SRID), envelope),
+    )
+
+
+def render_tile(layer, features):
+    query, params = features.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("""
+                SELECT ST_AsMVT(tile, {layer}, {extent}, 'mvt_geom')
+                FROM ({query}) AS tile
+                WHERE tile.mvt_geom IS NOT NULL
+            """).format(
+                layer=sql.Literal(layer),
+                extent=sql.Literal(MVT_EXTENT),
+                query=sql.SQL(query),
+            ),
+            params,
+        )
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile is not None else b""
+
+
+class TileView(APIView):
+    """
+    Vector tile of the unit layer, filtered by the parameters of the unit
+    list, or of the division layer, filtered by the division type.
+    """
+
+    layers = ("unit", "division")
+
+    def get(self, request, layer, z, x, y):
+        z, x, y = int(z), int(x), int(y)
+        if layer not in self.layers:
+            raise NotFound(f"Unknown layer '{layer}'")
+        if z > MAX_TILE_ZOOM or x >= 2**z or y >= 2**z:
+            raise NotFound("Tile out of range")
+
+        cache_key = None
+        if is_tile_cache_enabled():
+            cache_key = get_tile_cache_key(request, layer, z, x, y)
+            tile = cache.get(cache_key)
+            if tile is not None:
+                return HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
+
+        # ST_AsMVTGeom takes the exact envelope of the tile and the buffer
+        # separately, the buffered bounds only select the features.
+        envelope = get_tile_bounds(z, x, y)
+        bounds = get_tile_bounds(z, x, y, MVT_BUFFER)
+        if layer == "unit":
+            features = get_unit_features(request, envelope, bounds)
+        else:
+            features = get_division_features(request, z, envelope, bounds)
+        tile = render_tile(layer, features)
+        if cache_key is not None:
+            cache.set(cache_key, tile, settings.TILE_CACHE_TIMEOUT)
+        return HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
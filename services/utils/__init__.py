@@ -1,11 +1,21 @@
 from .accessibility_shortcoming_calculator import AccessibilityShortcomingCalculator
+from .data_version import (
+    bump_data_version,
+    get_data_modified_time,
+    get_data_version,
+    is_cache_shared,
+)
 from .models import check_valid_concrete_field
 from .translator import get_translated
 from .types import strtobool
 
 __all__ = [
     "AccessibilityShortcomingCalculator",
+    "bump_data_version",
     "check_valid_concrete_field",
+    "get_data_modified_time",
+    "get_data_version",
     "get_translated",
+    "is_cache_shared",
     "strtobool",
 ]
@@ -0,0 +1,73 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+DATA_VERSION_CACHE_KEY = "data_version"
+DATA_MODIFIED_TIME_CACHE_KEY = "data_modified_time"
+# The cache backends whose contents are not seen by the other processes.
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+)
+
+
+def is_cache_shared(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Returns whether the cache is shared by the processes serving the API. The
+    data version in a local cache is not changed by the imports and the saves
+    of the other processes, thus the caches keyed by it are only enabled with
+    a shared default cache.
+    """
+    return settings.CACHES[alias]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def get_data_version():
+    """
+    Returns the version of the data served by the API. The version changes
+    whenever the data is changed by an import or a save, thus it can be used
+    in cache keys to invalidate the cached responses.
+
+    The initial version is a timestamp, so that a version lost from the cache
+    never returns to a previously used value.
+    """
+    version = cache.get(DATA_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        version = cache.get(DATA_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_data_version():
+    """
+    Changes the data version, invalidating the responses cached with the
+    previous version.
+    """
+    try:
+        version = cache.incr(DATA_VERSION_CACHE_KEY)
+    except ValueError:
+        # The version is not in the cache.
+        version = time.time_ns()
+        cache.set(DATA_VERSION_CACHE_KEY, version, timeout=None)
+    # HTTP dates have a resolution of a second, thus the modification time
+    # is advanced by at least a second on every change.
+    previous_time = cache.get(DATA_MODIFIED_TIME_CACHE_KEY, 0)
+    cache.set(
+        DATA_MODIFIED_TIME_CACHE_KEY,
+        max(math.ceil(time.time()), previous_time + 1),
+        timeout=None,
+    )
+    return version
+
+
+def get_data_modified_time():
+    """
+    Returns the time of the last change of the data version as seconds since
+    the epoch, for the Last-Modified header of the responses.
+    """
+    modified_time = cache.get(DATA_MODIFIED_TIME_CACHE_KEY)
+    if modified_time is None:
+        cache.add(DATA_MODIFIED_TIME_CACHE_KEY, math.ceil(time.time()), timeout=None)
+        modified_time = cache.get(DATA_MODIFIED_TIME_CACHE_KEY)
+    return modified_time
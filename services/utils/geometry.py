@@ -0,0 +1,135 @@
+"""
+Geometry output in the spatial reference system requested by the client.
+
+munigeo's geom_to_json transforms the geometries one at a time with GDAL. The
+viewsets instead annotate their querysets with the geometries transformed by
+PostGIS, so that all the geometries of a page are transformed by the query
+fetching the page, and the serializers only convert them to GeoJSON.
+
+Large geometries can also be converted to GeoJSON by PostGIS with a limited
+number of decimal digits and optionally simplified, see annotate_geojson, so
+that they are never loaded as GEOS geometries.
+"""
+
+import json
+
+from django.contrib.gis import gdal
+from django.contrib.gis.db.models.functions import (
+    AsGeoJSON,
+    GeomOutputGeoFunc,
+    Transform,
+)
+from django.db.models.constants import LOOKUP_SEP
+from munigeo import api as munigeo_api
+
+TRANSFORMED_GEOMETRY_PREFIX = "transformed_"
+GEOJSON_PREFIX = "geojson_"
+
+
+class SimplifyPreserveTopology(GeomOutputGeoFunc):
+    arity = 2
+
+
+def get_transformed_name(field_path):
+    """
+    Returns the name of the annotation of the transformed `field_path`.
+    """
+    return TRANSFORMED_GEOMETRY_PREFIX + field_path.replace(LOOKUP_SEP, "_")
+
+
+def get_geojson_name(field_path):
+    """
+    Returns the name of the annotation of the GeoJSON of `field_path`.
+    """
+    return GEOJSON_PREFIX + field_path.replace(LOOKUP_SEP, "_")
+
+
+def get_field_srid(model, field_path):
+    *relations, field_name = field_path.split(LOOKUP_SEP)
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(field_name).srid
+
+
+def annotate_transformed_geometries(queryset, field_paths, srs):
+    """
+    Annotates the queryset with the geometries of `field_paths` transformed to
+    `srs` in the database. The fields stored in `srs` are not annotated.
+    """
+    annotations = {
+        get_transformed_name(field_path): Transform(field_path, srs.srid)
+        for field_path in field_paths
+        if get_field_srid(queryset.model, field_path) != srs.srid
+    }
+    if not annotations:
+        return queryset
+    return queryset.annotate(**annotations)
+
+
+def annotate_geojson(queryset, field_paths, srs, precision=None, tolerance=None):
+    """
+    Annotates the queryset with the GeoJSON of the geometries of `field_paths`
+    transformed to `srs`, generated in the database with at most `precision`
+    decimal digits. The geometries are simplified with `tolerance`, in the
+    units of the stored geometries, before the transformation if given.
+
+    The precision defaults to the one munigeo uses for points.
+    """
+    if precision is None:
+        precision = 2 if srs.projected else 7
+    annotations = {}
+    for field_path in field_paths:
+        expression = field_path
+        if tolerance:
+            expression = SimplifyPreserveTopology(expression, tolerance)
+        if get_field_srid(queryset.model, field_path) != srs.srid:
+            expression = Transform(expression, srs.srid)
+        annotations[get_geojson_name(field_path)] = AsGeoJSON(
+            expression, precision=precision
+        )
+    return queryset.annotate(**annotations)
+
+
+def get_geometry(obj, field_path):
+    """
+    Returns the transformed geometry of `field_path` if the object was
+    annotated by annotate_transformed_geometries, otherwise the stored one.
+    """
+    try:
+        return getattr(obj, get_transformed_name(field_path))
+    except AttributeError:
+        pass
+    value = obj
+    for name in field_path.split(LOOKUP_SEP):
+        value = getattr(value, name, None)
+        if value is None:
+            return None
+    return value
+
+
+def geometry_to_json(geom, srs):
+    """
+    Same as munigeo's geom_to_json, without the coordinate transformation
+    of the geometries already in `srs`.
+    """
+    if geom.srid != srs.srid:
+        return munigeo_api.geom_to_json(geom, srs)
+    if geom.geom_type.lower() == "point":
+        digits = 2 if srs.projected else 7
+        coords = [round(n, digits) for n in [geom.x, geom.y]]
+        return {"type": "Point", "coordinates": coords}
+    return json.loads(gdal.OGRGeometry(geom.wkb, srs).json)
+
+
+def get_geometry_json(obj, field_path, srs):
+    """
+    Returns the GeoJSON of the geometry of `field_path` as a dict, using the
+    GeoJSON generated by the database if the object was annotated by
+    annotate_geojson.
+    """
+    try:
+        geojson = getattr(obj, get_geojson_name(field_path))
+    except AttributeError:
+        geom = get_geometry(obj, field_path)
+        return None if geom is None else geometry_to_json(geom, srs)
+    return None if geojson is None else json.loads(geojson)
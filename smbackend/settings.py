@@ -22,6 +22,13 @@ env = Env(
     LANGUAGES=(list, ["fi", "sv", "en"]),
     DATABASE_URL=(str, "postgis:///servicemap"),
     DATABASE_PASSWORD=(str, ""),
+    CACHE_URL=(str, "locmemcache://"),
+    SEARCH_CACHE_TIMEOUT=(int, 300),
+    UNIT_FAST_SERIALIZER=(bool, False),
+    TILE_CACHE_TIMEOUT=(int, 3600),
+    COUNT_CACHE_TIMEOUT=(int, 300),
+    RESPONSE_CACHE_URL=(str, ""),
+    RESPONSE_CACHE_TIMEOUT=(int, 3600),
     SECRET_KEY=(str, ""),
     TRUST_X_FORWARDED_HOST=(bool, False),
     SECURE_PROXY_SSL_HEADER=(tuple, None),
@@ -91,6 +98,11 @@ GEO_SEARCH_API_KEY = env("GEO_SEARCH_API_KEY")
 DJANGO_LOG_LEVEL = env("DJANGO_LOG_LEVEL")
 IMPORT_LOG_LEVEL = env("IMPORT_LOG_LEVEL")
 SEARCH_LOG_LEVEL = env("SEARCH_LOG_LEVEL")
+SEARCH_CACHE_TIMEOUT = env("SEARCH_CACHE_TIMEOUT")
+UNIT_FAST_SERIALIZER = env("UNIT_FAST_SERIALIZER")
+TILE_CACHE_TIMEOUT = env("TILE_CACHE_TIMEOUT")
+COUNT_CACHE_TIMEOUT = env("COUNT_CACHE_TIMEOUT")
+RESPONSE_CACHE_TIMEOUT = env("RESPONSE_CACHE_TIMEOUT")
 EMAIL_USE_TLS = env("EMAIL_USE_TLS")
 EMAIL_HOST = env("EMAIL_HOST")
 EMAIL_PORT = env("EMAIL_PORT")
@@ -174,6 +186,19 @@ CONN_MAX_AGE = 120
 
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
+# Cache
+# The local memory cache is per process, use a shared cache, e.g. Redis, in
+# production. The data version bumped by the imports and the saves is kept in
+# the default cache, thus the caches keyed by it are disabled with a local
+# default cache.
+CACHES = {"default": env.cache()}
+# The responses of the read-only viewsets are cached in a separate cache if
+# one is configured.
+RESPONSE_CACHE_ALIAS = "default"
+if env("RESPONSE_CACHE_URL"):
+    CACHES["response"] = env.cache("RESPONSE_CACHE_URL")
+    RESPONSE_CACHE_ALIAS = "response"
+
 
 def gettext(s):
     return s
@@ -338,6 +363,7 @@ logging.config.dictConfig(LOGGING)
 
 KML_TRANSLATABLE_FIELDS = ["name", "street_address", "www"]
 KML_REGEXP = r"application/vnd.google-earth\.kml"
+UNIT_STREAMING_CHUNK_SIZE = 500
 
 LOCALE_PATHS = (str(BASE_DIR / "locale"),)
 
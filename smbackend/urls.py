@@ -13,6 +13,7 @@ from observations.views import obtain_auth_token
 from services import views
 from services.api import all_views as services_views
 from services.search.api import SearchViewSet
+from services.tiles import TileView
 from shortcutter import urls as shortcutter_urls
 
 router = routers.DefaultRouter()
@@ -34,6 +35,11 @@ for view in all_api_views:
 
 urlpatterns = [
     re_path(r"^v2/search", SearchViewSet.as_view(), name="search"),
+    re_path(
+        r"^v2/tiles/(?P<layer>\w+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.mvt$",
+        TileView.as_view(),
+        name="tile",
+    ),
     re_path(r"^admin/", admin.site.urls),
     re_path(r"^open311", views.post_service_request, name="open311"),
     re_path(r"^stats", views.post_statistic, name="stats"),